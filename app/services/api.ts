@@ -25,6 +25,9 @@ api.interceptors.request.use((config) => {
   return config;
 });
 
+// Requests already replayed after a token refresh
+const retried = new WeakSet<object>();
+
 // Response interceptor to handle errors
 api.interceptors.response.use(
   (response) => {
@@ -35,17 +38,51 @@ api.interceptors.response.use(
     });
     return response;
   },
-  (error) => {
+  async (error) => {
     console.error('API Error:', {
       url: error.config?.url,
       status: error.response?.status,
       data: error.response?.data,
       message: error.message,
     });
+    // An expired access token is renewed once with the refresh token instead of forcing a new login
+    const original = error.config;
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (error.response?.status === 401 && refreshToken && original && !retried.has(original) && original.url !== '/refresh') {
+      retried.add(original);
+      try {
+        await refreshTokens(refreshToken);
+        return api(original);
+      } catch {
+        authService.logout();
+      }
+    }
     return Promise.reject(error);
   }
 );
 
+let pendingRefresh: Promise<void> | null = null;
+
+// Concurrent 401s share one /refresh call
+const refreshTokens = (refreshToken: string) => {
+  if (!pendingRefresh) {
+    pendingRefresh = api
+      .post('/refresh', { refresh_token: refreshToken })
+      .then((response) => storeTokens(response.data))
+      .finally(() => {
+        pendingRefresh = null;
+      });
+  }
+  return pendingRefresh;
+};
+
+const storeTokens = ({ access_token, refresh_token }: { access_token: string; refresh_token?: string }) => {
+  localStorage.setItem('token', access_token);
+  if (refresh_token) {
+    localStorage.setItem('refresh_token', refresh_token);
+  }
+};
+
 // Auth services
 export const authService = {
   login: async (username: string, password: string) => {
@@ -57,8 +94,7 @@ export const authService = {
         'Content-Type': 'application/x-www-form-urlencoded',
       },
     });
-    const { access_token } = response.data;
-    localStorage.setItem('token', access_token);
+    storeTokens(response.data);
     return response.data;
   },
 
@@ -69,6 +105,7 @@ export const authService = {
 
   logout: () => {
     localStorage.removeItem('token');
+    localStorage.removeItem('refresh_token');
   },
 
   getProfile: async () => {
@@ -136,4 +173,27 @@ export const todoService = {
     const response = await api.get(`/todos/tags/${tagName}`);
     return response.data;
   },
+};
+
+export type TodoChange = {
+  seq: number;
+  upserted: number[];
+  deleted: number[];
+};
+
+// Change feed: replaces polling. EventSource reconnects on its own and resumes
+// from the last event id; on 'reset' the client missed events and should refetch.
+export const subscribeToChanges = (
+  onChange: (change: TodoChange) => void,
+  onReset: () => void,
+) => {
+  const token = localStorage.getItem('token');
+  const source = new EventSource(
+    `${API_URL}/todos/stream?access_token=${encodeURIComponent(token ?? '')}`,
+  );
+  source.addEventListener('change', (event) => {
+    onChange(JSON.parse((event as MessageEvent).data));
+  });
+  source.addEventListener('reset', onReset);
+  return () => source.close();
 }; 
\ No newline at end of file
@@ -1,19 +1,139 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from ..utils.config import settings
-
-SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
-
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-Base = declarative_base()
-
-# Dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close() 
\ No newline at end of file
+import threading
+import time
+from typing import Any, Dict, Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import Session, sessionmaker
+from ..utils.config import settings
+from ..utils.metrics import record_query, record_rows
+
+SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+
+# Async driver used for each sync backend when ASYNC_DATABASE_URL is not set
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+def get_async_database_url() -> str:
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    url = make_url(SQLALCHEMY_DATABASE_URL)
+    return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()]).render_as_string(hide_password=False)
+
+ASYNC_DATABASE_URL = get_async_database_url()
+
+def _is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+def get_engine_options(url: str) -> Dict[str, Any]:
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        # In-memory SQLite uses a single-connection pool that takes no sizing arguments
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    cursor.close()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    written = max(cursor.rowcount, 0) if context.isinsert or context.isupdate or context.isdelete else 0
+    record_query(statement, elapsed, written)
+
+def configure_engine(bind: Engine, url: str) -> None:
+    if _is_sqlite(url):
+        event.listen(bind, "connect", _set_sqlite_pragmas)
+    # Per-request query count and time for the metrics middleware
+    event.listen(bind, "before_cursor_execute", _before_cursor_execute)
+    event.listen(bind, "after_cursor_execute", _after_cursor_execute)
+
+# Engines are built on first use (normally in the app lifespan), so importing the app opens nothing
+# and forked workers never inherit a parent's connections
+_engine: Optional[Engine] = None
+_async_engine: Optional[AsyncEngine] = None
+_engine_lock = threading.Lock()
+_session_factory = sessionmaker(autocommit=False, autoflush=False)
+# Objects must stay readable after commit: response serialization happens outside the session's greenlet
+_async_session_factory = async_sessionmaker(class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+def get_engine() -> Engine:
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                bind = create_engine(SQLALCHEMY_DATABASE_URL, **get_engine_options(SQLALCHEMY_DATABASE_URL))
+                configure_engine(bind, SQLALCHEMY_DATABASE_URL)
+                _session_factory.configure(bind=bind)
+                _engine = bind
+    return _engine
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is None:
+        with _engine_lock:
+            if _async_engine is None:
+                try:
+                    bind = create_async_engine(ASYNC_DATABASE_URL, **get_engine_options(ASYNC_DATABASE_URL))
+                except ModuleNotFoundError as e:
+                    raise RuntimeError(
+                        f"The async driver for {make_url(ASYNC_DATABASE_URL).drivername} is not installed "
+                        f"(missing module {e.name!r}); install it or set ASYNC_DATABASE_URL to a driver you have"
+                    ) from e
+                configure_engine(bind.sync_engine, ASYNC_DATABASE_URL)
+                _async_session_factory.configure(bind=bind)
+                _async_engine = bind
+    return _async_engine
+
+def SessionLocal() -> Session:
+    get_engine()
+    return _session_factory()
+
+def AsyncSessionLocal() -> AsyncSession:
+    get_async_engine()
+    return _async_session_factory()
+
+async def dispose_engines() -> None:
+    global _engine, _async_engine
+    with _engine_lock:
+        engines, _engine, _async_engine = (_engine, _async_engine), None, None
+    sync_engine, async_engine = engines
+    if async_engine is not None:
+        await async_engine.dispose()
+    if sync_engine is not None:
+        sync_engine.dispose()
+
+Base = declarative_base()
+
+@event.listens_for(Base, "load", propagate=True)
+def _count_loaded_row(target, context):
+    record_rows(1)
+
+# Dependency
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,53 @@
+import os
+import re
+from typing import Optional, Set
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+ALEMBIC_INI = os.path.join(BACKEND_DIR, "alembic.ini")
+VERSIONS_DIR = os.path.join(BACKEND_DIR, "migrations", "versions")
+
+_REVISION = re.compile(r"^(down_revision|revision)\s*=\s*(.+)$", re.MULTILINE)
+_QUOTED = re.compile(r"[\"']([^\"']+)[\"']")
+
+# Schema that create_all produced before migrations existed; unversioned databases with tables start here
+BASELINE_REVISION = "0001"
+
+def _head_revisions() -> Set[str]:
+    """Revisions no other revision builds on, read straight from the version files"""
+    revisions, parents = set(), set()
+    for name in os.listdir(VERSIONS_DIR):
+        if not name.endswith(".py"):
+            continue
+        with open(os.path.join(VERSIONS_DIR, name)) as source:
+            for key, value in _REVISION.findall(source.read()):
+                (revisions if key == "revision" else parents).update(_QUOTED.findall(value))
+    return revisions - parents
+
+def _current_revision(bind: Engine) -> Optional[str]:
+    with bind.connect() as conn:
+        if not inspect(conn).has_table("alembic_version"):
+            return None
+        return conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+
+def upgrade_schema(bind: Engine) -> None:
+    """Apply pending Alembic migrations; an up-to-date database costs one version lookup"""
+    # Loading Alembic costs more than the rest of startup, so only do it when there is work to do
+    if _head_revisions() == {_current_revision(bind)}:
+        return
+    from alembic import command
+    from alembic.config import Config
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    config = Config(ALEMBIC_INI)
+    head = ScriptDirectory.from_config(config).get_current_head()
+    with bind.begin() as conn:
+        current = MigrationContext.configure(conn).get_current_revision()
+        if current == head:
+            return
+        config.attributes["connection"] = conn
+        if current is None and inspect(conn).has_table("users"):
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, "head")
@@ -0,0 +1,28 @@
+import importlib
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+def _dialect_module(name: str):
+    # Loaded on demand: importing every dialect up front adds tens of milliseconds to worker start
+    return importlib.import_module(f"sqlalchemy.dialects.{name}")
+
+def insert_ignore(db: Session, model):
+    """INSERT that silently skips rows conflicting with a unique constraint"""
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        return _dialect_module(dialect).insert(model).on_conflict_do_nothing()
+    if dialect == "mysql":
+        return _dialect_module(dialect).insert(model).prefix_with("IGNORE")
+    return insert(model)
+
+def supports_upsert_returning(db: Session) -> bool:
+    return db.get_bind().dialect.name in ("sqlite", "postgresql")
+
+def upsert_returning(db: Session, model, conflict_column, *returning):
+    """INSERT ... ON CONFLICT DO UPDATE (no-op) RETURNING, so existing rows come back too"""
+    dialect = db.get_bind().dialect.name
+    stmt = _dialect_module("sqlite" if dialect == "sqlite" else "postgresql").insert(model)
+    return stmt.on_conflict_do_update(
+        index_elements=[conflict_column],
+        set_={conflict_column.key: getattr(stmt.excluded, conflict_column.key)},
+    ).returning(*returning)
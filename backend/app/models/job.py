@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from datetime import datetime
+
+from ..database.base import Base
+
+class JobWatermark(Base):
+    """How far a background job has processed; advanced with compare-and-set so one worker claims each window"""
+    __tablename__ = "job_watermarks"
+
+    name = Column(String(50), primary_key=True)
+    position = Column(DateTime, nullable=False)
+
+class CacheInvalidation(Base):
+    """Shared log of what each commit changed, tailed by every worker to keep its in-process caches coherent"""
+    __tablename__ = "cache_invalidations"
+    # Ids must never be reused once old rows are purged, or tailers would skip the new ones
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(20), nullable=False)
+    user_id = Column(Integer, nullable=False)
+    version = Column(Integer, nullable=True)
+    payload = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
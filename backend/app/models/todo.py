@@ -1,71 +1,124 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Enum
-from sqlalchemy.orm import relationship
-from datetime import datetime
-import enum
-
-from ..database.base import Base
-
-class StageEnum(str, enum.Enum):
-    todo = "todo"
-    in_progress = "in_progress"
-    done = "done"
-
-class PriorityEnum(str, enum.Enum):
-    low = "low"
-    medium = "medium"
-    high = "high"
-
-class CategoryEnum(str, enum.Enum):
-    work = "work"
-    personal = "personal"
-    shopping = "shopping"
-    health = "health"
-    other = "other"
-
-class Todo(Base):
-    __tablename__ = "todos"
-
-    id = Column(Integer, primary_key=True, index=True)
-    text = Column(String(500), nullable=False)
-    description = Column(String(1000), nullable=True)
-    completed = Column(Boolean, default=False)
-    stage = Column(Enum(StageEnum), default=StageEnum.todo)
-    category = Column(Enum(CategoryEnum), default=CategoryEnum.other)
-    priority = Column(Enum(PriorityEnum), default=PriorityEnum.medium)
-    due_date = Column(DateTime, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    user_id = Column(Integer, ForeignKey("users.id"))
-    
-    # Relationships
-    user = relationship("User", back_populates="todos")
-    subtasks = relationship("SubTask", back_populates="todo", cascade="all, delete-orphan")
-    tags = relationship("Tag", secondary="todo_tags", back_populates="todos")
-
-class SubTask(Base):
-    __tablename__ = "subtasks"
-
-    id = Column(Integer, primary_key=True, index=True)
-    text = Column(String(500), nullable=False)
-    completed = Column(Boolean, default=False)
-    todo_id = Column(Integer, ForeignKey("todos.id"))
-    created_at = Column(DateTime, default=datetime.utcnow)
-    
-    # Relationship
-    todo = relationship("Todo", back_populates="subtasks")
-
-class Tag(Base):
-    __tablename__ = "tags"
-
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(50), unique=True, index=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    
-    # Relationship
-    todos = relationship("Todo", secondary="todo_tags", back_populates="tags")
-
-class TodoTags(Base):
-    __tablename__ = "todo_tags"
-
-    todo_id = Column(Integer, ForeignKey("todos.id"), primary_key=True)
-    tag_id = Column(Integer, ForeignKey("tags.id"), primary_key=True) 
\ No newline at end of file
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Enum, Index
+from sqlalchemy.orm import relationship
+from datetime import datetime
+import enum
+
+from ..database.base import Base
+
+class StageEnum(str, enum.Enum):
+    todo = "todo"
+    in_progress = "in_progress"
+    done = "done"
+
+class PriorityEnum(str, enum.Enum):
+    low = "low"
+    medium = "medium"
+    high = "high"
+
+class CategoryEnum(str, enum.Enum):
+    work = "work"
+    personal = "personal"
+    shopping = "shopping"
+    health = "health"
+    other = "other"
+
+class Todo(Base):
+    __tablename__ = "todos"
+
+    id = Column(Integer, primary_key=True, index=True)
+    text = Column(String(500), nullable=False)
+    description = Column(String(1000), nullable=True)
+    completed = Column(Boolean, default=False)
+    stage = Column(Enum(StageEnum), default=StageEnum.todo)
+    category = Column(Enum(CategoryEnum), default=CategoryEnum.other)
+    priority = Column(Enum(PriorityEnum), default=PriorityEnum.medium)
+    due_date = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    # users.todo_version as of the last commit that touched this todo, its subtasks or tags
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+    # Position within its stage column as a lexicographic key (utils.ranking); "" until first ranked
+    rank = Column(String(64), nullable=False, default="", server_default="")
+    
+    # Relationships
+    user = relationship("User", back_populates="todos")
+    subtasks = relationship("SubTask", back_populates="todo", cascade="all, delete-orphan")
+    tags = relationship("Tag", secondary="todo_tags", back_populates="todos")
+
+    # Composite indexes backing the list filters and keyset sort orders
+    __table_args__ = (
+        Index("ix_todos_user_id_id", "user_id", "id"),
+        Index("ix_todos_user_id_created_at", "user_id", "created_at", "id"),
+        Index("ix_todos_user_id_updated_at", "user_id", "updated_at", "id"),
+        Index("ix_todos_user_id_due_date", "user_id", "due_date", "id"),
+        Index("ix_todos_user_id_stage", "user_id", "stage", "id"),
+        # Board columns in drag-and-drop order, and the neighbour lookups of a move
+        Index("ix_todos_user_id_stage_rank", "user_id", "stage", "rank"),
+        Index("ix_todos_user_id_priority", "user_id", "priority", "id"),
+        Index("ix_todos_user_id_category", "user_id", "category", "id"),
+        Index("ix_todos_user_id_completed", "user_id", "completed", "id"),
+        # Overdue / due-soon range counts for the stats endpoint
+        Index("ix_todos_user_id_completed_due_date", "user_id", "completed", "due_date"),
+        # Delta sync reads a user's todos changed after a version
+        Index("ix_todos_user_id_version", "user_id", "version", "id"),
+        # Due-date sweeps walk open todos across all users in (due_date, id) order
+        Index("ix_todos_completed_due_date", "completed", "due_date", "id"),
+    )
+
+class SubTask(Base):
+    __tablename__ = "subtasks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    text = Column(String(500), nullable=False)
+    completed = Column(Boolean, default=False)
+    todo_id = Column(Integer, ForeignKey("todos.id"), index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Relationship
+    todo = relationship("Todo", back_populates="subtasks")
+
+class Tag(Base):
+    __tablename__ = "tags"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(50), unique=True, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Relationship
+    todos = relationship("Todo", secondary="todo_tags", back_populates="tags")
+
+class TodoTags(Base):
+    __tablename__ = "todo_tags"
+
+    todo_id = Column(Integer, ForeignKey("todos.id"), primary_key=True)
+    tag_id = Column(Integer, ForeignKey("tags.id"), primary_key=True)
+    # Denormalized owner of todo_id so per-user tag lookups never scan other users' links
+    user_id = Column(Integer, ForeignKey("users.id"))
+
+    __table_args__ = (
+        Index("ix_todo_tags_tag_id_user_id_todo_id", "tag_id", "user_id", "todo_id"),
+    ) 
+
+class TodoStat(Base):
+    """Per-user todo count for one field value, kept current by deltas applied at commit"""
+    __tablename__ = "todo_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    field = Column(String(20), primary_key=True)
+    value = Column(String(20), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class TodoTombstone(Base):
+    """A deleted todo id, kept so delta sync can report the delete"""
+    __tablename__ = "todo_tombstones"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    todo_id = Column(Integer, nullable=False)
+    version = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    __table_args__ = (
+        Index("ix_todo_tombstones_user_id_version", "user_id", "version"),
+    )
\ No newline at end of file
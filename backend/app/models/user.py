@@ -1,18 +1,23 @@
-from sqlalchemy import Column, Integer, String, DateTime
-from sqlalchemy.orm import relationship
-from datetime import datetime
-
-from ..database.base import Base
-
-class User(Base):
-    __tablename__ = "users"
-
-    id = Column(Integer, primary_key=True, index=True)
-    email = Column(String(255), unique=True, index=True, nullable=False)
-    username = Column(String(50), unique=True, index=True, nullable=False)
-    hashed_password = Column(String(255), nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-
-    # Relationships
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.orm import relationship
+from datetime import datetime
+
+from ..database.base import Base
+
+class User(Base):
+    __tablename__ = "users"
+
+    id = Column(Integer, primary_key=True, index=True)
+    email = Column(String(255), unique=True, index=True, nullable=False)
+    username = Column(String(50), unique=True, index=True, nullable=False)
+    hashed_password = Column(String(255), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Delta sync: last version stamped on this user's todos, and the newest one whose tombstones were purged
+    todo_version = Column(Integer, nullable=False, default=0, server_default="0")
+    todo_purged_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # Bumped when the password is changed (not when its hash is upgraded); refresh tokens carry it
+    password_version = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # Relationships
     todos = relationship("Todo", back_populates="user", cascade="all, delete-orphan") 
\ No newline at end of file
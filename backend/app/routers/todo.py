@@ -1,114 +1,449 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from ..database.base import get_db
-from ..services.todo_service import TodoService
-from ..schemas.todo import Todo, TodoCreate, TodoUpdate, SubTaskCreate, TagCreate
-from ..utils.auth import get_current_user
-from ..schemas.user import User
-
-router = APIRouter(prefix="/todos", tags=["todos"])
-
-@router.get("/", response_model=List[Todo])
-def get_todos(
-    skip: int = Query(0, ge=0),
-    limit: int = Query(100, ge=1),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Get all todos for the current user"""
-    return TodoService.get_todos(db, current_user.id, skip, limit)
-
-@router.post("/", response_model=Todo)
-def create_todo(
-    todo: TodoCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Create a new todo"""
-    return TodoService.create_todo(db, todo, current_user.id)
-
-@router.get("/{todo_id}", response_model=Todo)
-def get_todo(
-    todo_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Get a specific todo by ID"""
-    todo = TodoService.get_todo(db, todo_id, current_user.id)
-    if todo is None:
-        raise HTTPException(status_code=404, detail="Todo not found")
-    return todo
-
-@router.put("/{todo_id}", response_model=Todo)
-def update_todo(
-    todo_id: int,
-    todo_update: TodoUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Update a todo"""
-    todo = TodoService.update_todo(db, todo_id, todo_update, current_user.id)
-    if todo is None:
-        raise HTTPException(status_code=404, detail="Todo not found")
-    return todo
-
-@router.delete("/{todo_id}")
-def delete_todo(
-    todo_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Delete a todo"""
-    success = TodoService.delete_todo(db, todo_id, current_user.id)
-    if not success:
-        raise HTTPException(status_code=404, detail="Todo not found")
-    return {"message": "Todo deleted successfully"}
-
-@router.post("/{todo_id}/subtasks", response_model=Todo)
-def create_subtask(
-    todo_id: int,
-    subtask: SubTaskCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Add a subtask to a todo"""
-    result = TodoService.create_subtask(db, todo_id, subtask, current_user.id)
-    if result is None:
-        raise HTTPException(status_code=404, detail="Todo not found")
-    return TodoService.get_todo(db, todo_id, current_user.id)
-
-@router.post("/{todo_id}/tags")
-def add_tag_to_todo(
-    todo_id: int,
-    tag: TagCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Add a tag to a todo"""
-    result = TodoService.add_tag_to_todo(db, todo_id, tag, current_user.id)
-    if result is None:
-        raise HTTPException(status_code=404, detail="Todo not found")
-    return {"message": "Tag added successfully"}
-
-@router.delete("/{todo_id}/tags/{tag_id}")
-def remove_tag_from_todo(
-    todo_id: int,
-    tag_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Remove a tag from a todo"""
-    success = TodoService.remove_tag_from_todo(db, todo_id, tag_id, current_user.id)
-    if not success:
-        raise HTTPException(status_code=404, detail="Todo or tag not found")
-    return {"message": "Tag removed successfully"}
-
-@router.get("/tags/{tag_name}", response_model=List[Todo])
-def get_todos_by_tag(
-    tag_name: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Get all todos with a specific tag"""
-    return TodoService.get_todos_by_tag(db, tag_name, current_user.id) 
\ No newline at end of file
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import datetime
+from ..database.base import get_async_db
+from ..services.changes import todo_versions
+from ..services.events import change_broker
+from ..services.stats import AsyncStatsService
+from ..services.todo_service import AsyncTodoService
+from ..schemas.todo import (
+    Todo, TodoCreate, TodoUpdate, TodoMove, SubTask, SubTaskCreate, SubTaskUpdate, TagCreate, TagBulkUpdate,
+    TodoFilter, TodoSortEnum, SortOrderEnum, StageEnum, PriorityEnum, CategoryEnum,
+    TodoBatchCreate, TodoBatchUpdate, TodoBatchDelete, BatchResult, BatchItemResult, BatchItemStatusEnum,
+    ExportFormatEnum, TodoImport, ImportIssue, ImportResult, TodoStats, TodoChanges, TodoBoard,
+)
+from ..utils.config import settings
+from ..utils.encoding import encode_json
+from ..utils.http_cache import compute_etag, conditional_response
+from ..utils.metrics import serialization_timer
+from ..utils.pagination import encode_cursor
+from ..utils.todo_io import dumps, format_csv, format_ndjson, parse_csv, parse_ndjson
+from ..utils.auth import get_current_user, get_stream_user
+from ..schemas.user import User
+
+router = APIRouter(prefix="/todos", tags=["todos"])
+
+async def todo_etag(request: Request, user_id: int, db: AsyncSession) -> str:
+    # Read the version before querying so a concurrent write can only make the ETag older, never newer
+    return compute_etag(request, user_id, todo_versions.epoch, await todo_versions.current(user_id, db))
+
+def sse_message(event: str, seq: int, data: dict) -> str:
+    return f"event: {event}\nid: {todo_versions.epoch}-{seq}\ndata: {dumps(data)}\n\n"
+
+def check_batch_size(size: int):
+    if size > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch exceeds the maximum of {settings.BATCH_MAX_ITEMS} items"
+        )
+
+@router.get("/", response_model=List[Todo])
+async def get_todos(
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous X-Next-Cursor header"),
+    sort: TodoSortEnum = TodoSortEnum.id,
+    order: SortOrderEnum = SortOrderEnum.asc,
+    stage: Optional[StageEnum] = None,
+    priority: Optional[PriorityEnum] = None,
+    category: Optional[CategoryEnum] = None,
+    completed: Optional[bool] = None,
+    due_after: Optional[datetime] = None,
+    due_before: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get todos for the current user, filtered and paginated by offset or cursor"""
+    filters = TodoFilter(
+        stage=stage,
+        priority=priority,
+        category=category,
+        completed=completed,
+        due_after=due_after,
+        due_before=due_before,
+    )
+
+    async def build():
+        try:
+            todos = await AsyncTodoService.get_todos(db, current_user.id, skip, limit, filters, sort, order, cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        headers = {}
+        if len(todos) == limit:
+            last = todos[-1]
+            headers["X-Next-Cursor"] = encode_cursor(
+                sort.value, order.value, last[sort.value], last["id"]
+            )
+        with serialization_timer():
+            body = encode_json(todos)
+        return body, headers
+
+    return await conditional_response(request, await todo_etag(request, current_user.id, db), build)
+
+@router.post("/", response_model=Todo)
+async def create_todo(
+    todo: TodoCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Create a new todo"""
+    return await AsyncTodoService.create_todo(db, todo, current_user.id)
+
+@router.post("/batch", response_model=BatchResult)
+async def create_todos(
+    batch: TodoBatchCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Create many todos in a single transaction"""
+    check_batch_size(len(batch.items))
+    ids = await AsyncTodoService.create_todos(db, batch.items, current_user.id)
+    return BatchResult(results=[
+        BatchItemResult(index=index, id=todo_id, status=BatchItemStatusEnum.created)
+        for index, todo_id in enumerate(ids)
+    ])
+
+@router.patch("/batch", response_model=BatchResult)
+async def update_todos(
+    batch: TodoBatchUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Update many todos in a single transaction"""
+    check_batch_size(len(batch.items))
+    updated = await AsyncTodoService.update_todos(db, batch.items, current_user.id)
+    return BatchResult(results=[
+        BatchItemResult(
+            index=index,
+            id=item.id,
+            status=BatchItemStatusEnum.updated if ok else BatchItemStatusEnum.not_found,
+        )
+        for index, (item, ok) in enumerate(zip(batch.items, updated))
+    ])
+
+@router.delete("/batch", response_model=BatchResult)
+async def delete_todos(
+    batch: TodoBatchDelete,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Delete many todos in a single transaction"""
+    check_batch_size(len(batch.ids))
+    deleted = await AsyncTodoService.delete_todos(db, batch.ids, current_user.id)
+    return BatchResult(results=[
+        BatchItemResult(
+            index=index,
+            id=todo_id,
+            status=BatchItemStatusEnum.deleted if todo_id in deleted else BatchItemStatusEnum.not_found,
+        )
+        for index, todo_id in enumerate(batch.ids)
+    ])
+
+@router.get("/search", response_model=List[Todo])
+async def search_todos(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    prefix: bool = Query(True, description="Match the last term as a prefix (search-as-you-type)"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Full-text search over todo text, description and subtasks, best matches first"""
+    return await AsyncTodoService.search_todos(db, current_user.id, q, limit, offset, prefix)
+
+@router.get("/stats", response_model=TodoStats)
+async def get_todo_stats(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Dashboard counts by stage, priority and category, plus overdue and due within 7 days"""
+    return await AsyncStatsService.get_stats(db, current_user.id)
+
+@router.get("/board", response_model=TodoBoard)
+async def get_todo_board(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Every todo as compact per-stage column arrays for rendering a kanban board"""
+
+    async def build():
+        board = await AsyncTodoService.get_board(db, current_user.id)
+        with serialization_timer():
+            body = encode_json(board)
+        return body, {}
+
+    return await conditional_response(request, await todo_etag(request, current_user.id, db), build)
+
+@router.get("/changes", response_model=TodoChanges)
+async def get_todo_changes(
+    since: int = Query(0, ge=0, description="version from the last completed sync; 0 for a full snapshot"),
+    limit: int = Query(500, ge=1, le=5000),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page of the same sync"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Todos created or updated and ids deleted since a version; keep the returned version once next_cursor is null"""
+    try:
+        changes = await AsyncTodoService.get_changes(db, current_user.id, since, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if changes is None:
+        raise HTTPException(status_code=410, detail="Changes since this version are no longer available; sync from 0")
+    return changes
+
+@router.get("/stream")
+async def stream_changes(
+    request: Request,
+    last_event_id: Optional[str] = Query(None, description="Resume after this event id; defaults to the Last-Event-ID header"),
+    current_user: User = Depends(get_stream_user)
+):
+    """Server-sent events naming the todos changed by each commit, resumable by event id"""
+    user_id = current_user.id
+    resume = last_event_id or request.headers.get("last-event-id")
+    last_seq = None
+    if resume:
+        epoch, _, seq = resume.partition("-")
+        # Ids from before a restart can't be resumed; last_seq=-1 forces a reset
+        last_seq = int(seq) if epoch == todo_versions.epoch and seq.isdigit() else -1
+    subscription = change_broker.subscribe(user_id, await todo_versions.current(user_id), last_seq)
+
+    async def events():
+        try:
+            yield "retry: 3000\n\n"
+            if last_seq is None:
+                yield sse_message("ready", subscription.last_seq, {"seq": subscription.last_seq})
+            while True:
+                pending = subscription.pending()
+                if pending is None:
+                    # Missed more than the history holds: the client should refetch, then follow on
+                    subscription.reset()
+                    yield sse_message("reset", subscription.last_seq, {"seq": subscription.last_seq})
+                    continue
+                for event in pending:
+                    yield sse_message("change", event.seq, event.to_dict())
+                if not await subscription.wait(settings.STREAM_HEARTBEAT_SECONDS):
+                    yield ": keepalive\n\n"
+        finally:
+            change_broker.unsubscribe(user_id, subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/export")
+async def export_todos(
+    format: ExportFormatEnum = ExportFormatEnum.ndjson,
+    current_user: User = Depends(get_current_user)
+):
+    """Stream every todo of the current user, with subtasks and tags inline"""
+    async def body():
+        header = format == ExportFormatEnum.csv
+        async for records in AsyncTodoService.iter_todo_records(current_user.id, settings.EXPORT_CHUNK_SIZE):
+            with serialization_timer():
+                if format == ExportFormatEnum.csv:
+                    chunk = format_csv(records, header=header)
+                    header = False
+                else:
+                    chunk = format_ndjson(records)
+            yield chunk
+        if header:
+            yield format_csv([], header=True)
+
+    media_type = "text/csv" if format == ExportFormatEnum.csv else "application/x-ndjson"
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="todos.{format.value}"'},
+    )
+
+@router.post("/import", response_model=ImportResult)
+async def import_todos(
+    request: Request,
+    format: ExportFormatEnum = ExportFormatEnum.ndjson,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Import todos from a streamed NDJSON or CSV body, committing in chunks"""
+    parse = parse_csv if format == ExportFormatEnum.csv else parse_ndjson
+    imported = 0
+    errors: List[ImportIssue] = []
+    chunk: List[TodoImport] = []
+    async for line, record in parse(request.stream(), settings.IMPORT_MAX_LINE_LENGTH):
+        try:
+            if isinstance(record, Exception):
+                raise record
+            chunk.append(TodoImport.model_validate(record))
+        except ValidationError as e:
+            if len(errors) < settings.IMPORT_MAX_ERRORS:
+                detail = "; ".join(
+                    f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()
+                )
+                errors.append(ImportIssue(line=line, error=detail))
+            continue
+        except ValueError as e:
+            if len(errors) < settings.IMPORT_MAX_ERRORS:
+                errors.append(ImportIssue(line=line, error=str(e)))
+            continue
+        if len(chunk) >= settings.IMPORT_CHUNK_SIZE:
+            imported += await AsyncTodoService.import_todos(db, chunk, current_user.id)
+            chunk = []
+    if chunk:
+        imported += await AsyncTodoService.import_todos(db, chunk, current_user.id)
+    return ImportResult(imported=imported, errors=errors)
+
+@router.get("/{todo_id}", response_model=Todo)
+async def get_todo(
+    request: Request,
+    todo_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get a specific todo by ID"""
+    async def build():
+        todo = await AsyncTodoService.get_todo(db, todo_id, current_user.id)
+        if todo is None:
+            raise HTTPException(status_code=404, detail="Todo not found")
+        with serialization_timer():
+            body = Todo.model_validate(todo).model_dump_json().encode()
+        return body, {}
+
+    return await conditional_response(request, await todo_etag(request, current_user.id, db), build)
+
+@router.put("/{todo_id}", response_model=Todo)
+async def update_todo(
+    todo_id: int,
+    todo_update: TodoUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Update a todo"""
+    todo = await AsyncTodoService.update_todo(db, todo_id, todo_update, current_user.id)
+    if todo is None:
+        raise HTTPException(status_code=404, detail="Todo not found")
+    return todo
+
+@router.post("/{todo_id}/move", response_model=Todo)
+async def move_todo(
+    todo_id: int,
+    move: TodoMove,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Move a todo to a position in a stage column, writing only its own row"""
+    try:
+        db_todo = await AsyncTodoService.move_todo(db, todo_id, move, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if db_todo is None:
+        raise HTTPException(status_code=404, detail="Todo not found")
+    return db_todo
+
+@router.delete("/{todo_id}")
+async def delete_todo(
+    todo_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Delete a todo"""
+    success = await AsyncTodoService.delete_todo(db, todo_id, current_user.id)
+    if not success:
+        raise HTTPException(status_code=404, detail="Todo not found")
+    return {"message": "Todo deleted successfully"}
+
+@router.post("/{todo_id}/subtasks", response_model=Todo)
+async def create_subtask(
+    todo_id: int,
+    subtask: SubTaskCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Add a subtask to a todo"""
+    result = await AsyncTodoService.create_subtask(db, todo_id, subtask, current_user.id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Todo not found")
+    return await AsyncTodoService.get_todo(db, todo_id, current_user.id)
+
+@router.patch("/{todo_id}/subtasks/{subtask_id}", response_model=SubTask)
+async def update_subtask(
+    todo_id: int,
+    subtask_id: int,
+    subtask_update: SubTaskUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Update a subtask's text or completion"""
+    subtask = await AsyncTodoService.update_subtask(db, todo_id, subtask_id, subtask_update, current_user.id)
+    if subtask is None:
+        raise HTTPException(status_code=404, detail="Subtask not found")
+    return subtask
+
+@router.post("/{todo_id}/subtasks/{subtask_id}/toggle", response_model=SubTask)
+async def toggle_subtask(
+    todo_id: int,
+    subtask_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Flip a subtask between done and not done"""
+    subtask = await AsyncTodoService.toggle_subtask(db, todo_id, subtask_id, current_user.id)
+    if subtask is None:
+        raise HTTPException(status_code=404, detail="Subtask not found")
+    return subtask
+
+@router.post("/{todo_id}/tags")
+async def add_tag_to_todo(
+    todo_id: int,
+    tag: TagCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Add a tag to a todo"""
+    result = await AsyncTodoService.add_tag_to_todo(db, todo_id, tag, current_user.id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Todo not found")
+    return {"message": "Tag added successfully"}
+
+@router.patch("/{todo_id}/tags", response_model=Todo)
+async def update_todo_tags(
+    todo_id: int,
+    tags: TagBulkUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Attach tags by name and detach tags by ID in a single call"""
+    result = await AsyncTodoService.update_tags(db, todo_id, tags.add, tags.remove, current_user.id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Todo not found")
+    return await AsyncTodoService.get_todo(db, todo_id, current_user.id)
+
+@router.delete("/{todo_id}/tags/{tag_id}")
+async def remove_tag_from_todo(
+    todo_id: int,
+    tag_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Remove a tag from a todo"""
+    success = await AsyncTodoService.remove_tag_from_todo(db, todo_id, tag_id, current_user.id)
+    if not success:
+        raise HTTPException(status_code=404, detail="Todo or tag not found")
+    return {"message": "Tag removed successfully"}
+
+@router.get("/tags/{tag_name}", response_model=List[Todo])
+async def get_todos_by_tag(
+    tag_name: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get all todos with a specific tag"""
+    todos = await AsyncTodoService.get_todos_by_tag(db, tag_name, current_user.id)
+    with serialization_timer():
+        body = encode_json(todos)
+    return Response(content=body, media_type="application/json") 
\ No newline at end of file
@@ -1,82 +1,83 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from datetime import timedelta
-from typing import Any
-
-from ..database.base import get_db
-from ..services.user_service import UserService
-from ..schemas.user import User, UserCreate, UserUpdate, Token
-from ..utils.config import settings
-from ..utils.auth import get_current_user
-
-router = APIRouter(tags=["users"])
-
-@router.post("/register", response_model=User)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    """Register a new user"""
-    db_user = UserService.get_user_by_email(db, user.email)
-    if db_user:
-        raise HTTPException(
-            status_code=400,
-            detail="Email already registered"
-        )
-    
-    db_user = UserService.get_user_by_username(db, user.username)
-    if db_user:
-        raise HTTPException(
-            status_code=400,
-            detail="Username already taken"
-        )
-    
-    return UserService.create_user(db, user)
-
-@router.post("/login", response_model=Token)
-def login(
-    form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
-):
-    """Login to get access token"""
-    user = UserService.authenticate_user(db, form_data.username, form_data.password)
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect username or password",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = UserService.create_access_token(
-        data={"sub": user.username},
-        expires_delta=access_token_expires
-    )
-    
-    return {"access_token": access_token, "token_type": "bearer"}
-
-@router.get("/me", response_model=User)
-def read_users_me(current_user: User = Depends(get_current_user)):
-    """Get current user information"""
-    return current_user
-
-@router.put("/me", response_model=User)
-def update_user_me(
-    user_update: UserUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Update current user information"""
-    if user_update.email and user_update.email != current_user.email:
-        if UserService.get_user_by_email(db, user_update.email):
-            raise HTTPException(
-                status_code=400,
-                detail="Email already registered"
-            )
-    
-    if user_update.username and user_update.username != current_user.username:
-        if UserService.get_user_by_username(db, user_update.username):
-            raise HTTPException(
-                status_code=400,
-                detail="Username already taken"
-            )
-    
-    return UserService.update_user(db, current_user.id, user_update) 
\ No newline at end of file
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any
+
+from ..database.base import get_async_db
+from ..services.user_service import UserService, AsyncUserService
+from ..schemas.user import User, UserCreate, UserUpdate, Token, TokenRefresh
+from ..utils.auth import credentials_exception, get_current_user
+
+router = APIRouter(tags=["users"])
+
+@router.post("/register", response_model=User)
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    """Register a new user"""
+    db_user = await AsyncUserService.get_user_by_email(db, user.email)
+    if db_user:
+        raise HTTPException(
+            status_code=400,
+            detail="Email already registered"
+        )
+    
+    db_user = await AsyncUserService.get_user_by_username(db, user.username)
+    if db_user:
+        raise HTTPException(
+            status_code=400,
+            detail="Username already taken"
+        )
+    
+    return await AsyncUserService.create_user(db, user)
+
+@router.post("/login", response_model=Token)
+async def login(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Login to get access token"""
+    user = await AsyncUserService.authenticate_user(db, form_data.username, form_data.password)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    return UserService.issue_tokens(user)
+
+@router.post("/refresh", response_model=Token)
+async def refresh_token(body: TokenRefresh, db: AsyncSession = Depends(get_async_db)):
+    """Exchange a refresh token for a new access/refresh token pair"""
+    user = await AsyncUserService.authenticate_refresh_token(db, body.refresh_token)
+    if not user:
+        raise credentials_exception()
+    
+    return UserService.issue_tokens(user)
+
+@router.get("/me", response_model=User)
+async def read_users_me(current_user: User = Depends(get_current_user)):
+    """Get current user information"""
+    return current_user
+
+@router.put("/me", response_model=User)
+async def update_user_me(
+    user_update: UserUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Update current user information"""
+    if user_update.email and user_update.email != current_user.email:
+        if await AsyncUserService.get_user_by_email(db, user_update.email):
+            raise HTTPException(
+                status_code=400,
+                detail="Email already registered"
+            )
+    
+    if user_update.username and user_update.username != current_user.username:
+        if await AsyncUserService.get_user_by_username(db, user_update.username):
+            raise HTTPException(
+                status_code=400,
+                detail="Username already taken"
+            )
+    
+    return await AsyncUserService.update_user(db, current_user.id, user_update) 
\ No newline at end of file
@@ -1,87 +1,204 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List
-from datetime import datetime
-from enum import Enum
-
-class PriorityEnum(str, Enum):
-    low = "low"
-    medium = "medium"
-    high = "high"
-
-class StageEnum(str, Enum):
-    todo = "todo"
-    in_progress = "in_progress"
-    done = "done"
-
-class CategoryEnum(str, Enum):
-    work = "work"
-    personal = "personal"
-    shopping = "shopping"
-    health = "health"
-    other = "other"
-
-class TagBase(BaseModel):
-    name: str
-
-class TagCreate(TagBase):
-    pass
-
-class Tag(TagBase):
-    id: int
-    created_at: datetime
-
-    class Config:
-        from_attributes = True
-
-class SubTaskBase(BaseModel):
-    text: str
-    completed: bool = False
-
-class SubTaskCreate(SubTaskBase):
-    pass
-
-class SubTask(SubTaskBase):
-    id: int
-    todo_id: int
-    created_at: datetime
-
-    class Config:
-        from_attributes = True
-
-class TodoBase(BaseModel):
-    text: str
-    description: Optional[str] = None
-    category: CategoryEnum
-    priority: PriorityEnum = PriorityEnum.medium
-    stage: StageEnum = StageEnum.todo
-    due_date: Optional[datetime] = None
-
-class TodoCreate(TodoBase):
-    pass
-
-class TodoUpdate(BaseModel):
-    text: Optional[str] = None
-    description: Optional[str] = None
-    completed: Optional[bool] = None
-    category: Optional[CategoryEnum] = None
-    priority: Optional[PriorityEnum] = None
-    stage: Optional[StageEnum] = None
-    due_date: Optional[datetime] = None
-
-class Todo(TodoBase):
-    id: int
-    completed: bool
-    created_at: datetime
-    updated_at: datetime
-    user_id: int
-    subtasks: List[SubTask] = []
-    tags: List[Tag] = []
-
-    class Config:
-        from_attributes = True
-
-class TodoWithUser(Todo):
-    user: "UserBase"
-
-    class Config:
+from pydantic import BaseModel, Field, field_validator
+from typing import Dict, Optional, List
+from datetime import datetime
+from enum import Enum
+
+class PriorityEnum(str, Enum):
+    low = "low"
+    medium = "medium"
+    high = "high"
+
+class StageEnum(str, Enum):
+    todo = "todo"
+    in_progress = "in_progress"
+    done = "done"
+
+class CategoryEnum(str, Enum):
+    work = "work"
+    personal = "personal"
+    shopping = "shopping"
+    health = "health"
+    other = "other"
+
+class TodoSortEnum(str, Enum):
+    id = "id"
+    created_at = "created_at"
+    updated_at = "updated_at"
+    due_date = "due_date"
+    # Drag-and-drop order; with a stage filter, one board column top to bottom
+    rank = "rank"
+
+class SortOrderEnum(str, Enum):
+    asc = "asc"
+    desc = "desc"
+
+class TagBase(BaseModel):
+    name: str
+
+class TagCreate(TagBase):
+    pass
+
+class Tag(TagBase):
+    id: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class TagBulkUpdate(BaseModel):
+    add: List[str] = []
+    remove: List[int] = []
+
+class SubTaskBase(BaseModel):
+    text: str
+    completed: bool = False
+
+class SubTaskCreate(SubTaskBase):
+    pass
+
+class SubTaskUpdate(BaseModel):
+    text: Optional[str] = None
+    completed: Optional[bool] = None
+
+class SubTask(SubTaskBase):
+    id: int
+    todo_id: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class TodoBase(BaseModel):
+    text: str
+    description: Optional[str] = None
+    category: CategoryEnum
+    priority: PriorityEnum = PriorityEnum.medium
+    stage: StageEnum = StageEnum.todo
+    due_date: Optional[datetime] = None
+
+class TodoCreate(TodoBase):
+    pass
+
+class TodoUpdate(BaseModel):
+    text: Optional[str] = None
+    description: Optional[str] = None
+    completed: Optional[bool] = None
+    category: Optional[CategoryEnum] = None
+    priority: Optional[PriorityEnum] = None
+    stage: Optional[StageEnum] = None
+    due_date: Optional[datetime] = None
+
+    @field_validator("text", "completed", "category", "priority", "stage")
+    @classmethod
+    def reject_null(cls, value):
+        # Omit a field to leave it unchanged; only description and due_date can be cleared with null
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
+
+class TodoMove(BaseModel):
+    # Target column; defaults to the todo's current stage
+    stage: Optional[StageEnum] = None
+    # The card to drop it right after, or right before; with neither it goes to the bottom
+    after_id: Optional[int] = None
+    before_id: Optional[int] = None
+
+class TodoFilter(BaseModel):
+    stage: Optional[StageEnum] = None
+    priority: Optional[PriorityEnum] = None
+    category: Optional[CategoryEnum] = None
+    completed: Optional[bool] = None
+    due_after: Optional[datetime] = None
+    due_before: Optional[datetime] = None
+
+class Todo(TodoBase):
+    id: int
+    completed: bool
+    created_at: datetime
+    updated_at: datetime
+    user_id: int
+    rank: str = ""
+    subtasks: List[SubTask] = []
+    tags: List[Tag] = []
+
+    class Config:
+        from_attributes = True
+
+class TodoBatchCreate(BaseModel):
+    items: List[TodoCreate] = Field(..., min_length=1)
+
+class TodoBatchUpdateItem(TodoUpdate):
+    id: int
+
+class TodoBatchUpdate(BaseModel):
+    items: List[TodoBatchUpdateItem] = Field(..., min_length=1)
+
+class TodoBatchDelete(BaseModel):
+    ids: List[int] = Field(..., min_length=1)
+
+class BatchItemStatusEnum(str, Enum):
+    created = "created"
+    updated = "updated"
+    deleted = "deleted"
+    not_found = "not_found"
+
+class BatchItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    status: BatchItemStatusEnum
+
+class BatchResult(BaseModel):
+    results: List[BatchItemResult]
+
+class ExportFormatEnum(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+class TodoImport(TodoCreate):
+    completed: bool = False
+    subtasks: List[SubTaskCreate] = []
+    tags: List[str] = []
+
+class ImportIssue(BaseModel):
+    line: int
+    error: str
+
+class ImportResult(BaseModel):
+    imported: int
+    errors: List[ImportIssue] = []
+
+class TodoChanges(BaseModel):
+    version: int
+    todos: List[Todo]
+    deleted: List[int]
+    next_cursor: Optional[str] = None
+
+class BoardColumn(BaseModel):
+    # Parallel arrays, one entry per card in board order
+    ids: List[int]
+    texts: List[str]
+    priorities: List[PriorityEnum]
+    due_dates: List[Optional[datetime]]
+    tags: List[List[int]]
+    subtasks_done: List[int]
+    subtasks_total: List[int]
+
+class TodoBoard(BaseModel):
+    columns: Dict[StageEnum, BoardColumn]
+    # Tag names; BoardColumn.tags holds indexes into this list
+    tags: List[str]
+
+class TodoStats(BaseModel):
+    total: int
+    completed: int
+    by_stage: Dict[str, int]
+    by_priority: Dict[str, int]
+    by_category: Dict[str, int]
+    overdue: int
+    due_this_week: int
+
+class TodoWithUser(Todo):
+    user: "UserBase"
+
+    class Config:
         from_attributes = True 
\ No newline at end of file
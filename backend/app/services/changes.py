@@ -0,0 +1,150 @@
+import os
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, Optional, Set
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..database.base import AsyncSessionLocal
+from ..models.user import User
+from .channel import invalidation_channel
+from .events import change_broker
+from .search import search_index
+from .stats import StatsService
+from .sync import SyncService
+
+class VersionRegistry:
+    """Per-user counters bumped whenever a user's todo data changes.
+
+    With one worker they live in this process. Shared across workers, they are
+    the users.todo_version values stamped at commit, learned from commits and
+    the invalidation channel, and read from the database when it must be current.
+    """
+
+    def __init__(self, shared: bool = False):
+        self.shared = shared
+        # Local counters restart with the process, so a random epoch keeps old ETags and event ids from
+        # matching; shared versions are durable and mean the same thing in every worker
+        self.epoch = "db" if shared else os.urandom(4).hex()
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> int:
+        return self._versions.get(user_id, 0)
+
+    def bump(self, user_id: int) -> int:
+        with self._lock:
+            version = self._versions.get(user_id, 0) + 1
+            self._versions[user_id] = version
+            return version
+
+    def advance(self, user_id: int, version: int) -> None:
+        with self._lock:
+            if version > self._versions.get(user_id, 0):
+                self._versions[user_id] = version
+
+    async def current(self, user_id: int, db: Optional[AsyncSession] = None) -> int:
+        """The latest version, including commits made by other workers; without db, uses a short-lived session"""
+        if not self.shared:
+            return self.get(user_id)
+        query = select(User.todo_version).where(User.id == user_id)
+        if db is None:
+            async with AsyncSessionLocal() as session:
+                version = await session.scalar(query)
+        else:
+            version = await db.scalar(query)
+        self.advance(user_id, version or 0)
+        return version or 0
+
+todo_versions = VersionRegistry(shared=invalidation_channel.enabled)
+_publish_lock = threading.Lock()
+
+def record_change(db: Session, user_id: int, todo_ids: Iterable[int] = (), deleted: bool = False) -> None:
+    """Mark todos of user_id as changed; derived state is updated when the session commits"""
+    changes = db.info.setdefault("todo_changes", {})
+    change = changes.setdefault(user_id, {"upserted": set(), "deleted": set()})
+    todo_ids = set(todo_ids)
+    if deleted:
+        change["upserted"] -= todo_ids
+        change["deleted"] |= todo_ids
+    else:
+        change["upserted"] |= todo_ids
+
+@contextmanager
+def savepoint(db: Session) -> Iterator[None]:
+    """SAVEPOINT whose rollback also forgets the changes and stat deltas recorded inside it"""
+    changes = {
+        user_id: {kind: set(ids) for kind, ids in change.items()}
+        for user_id, change in db.info.get("todo_changes", {}).items()
+    }
+    stat_deltas = {user_id: Counter(deltas) for user_id, deltas in db.info.get("todo_stat_deltas", {}).items()}
+    try:
+        with db.begin_nested():
+            yield
+    except Exception:
+        # Forget what was recorded inside the savepoint; the outer transaction's changes still apply
+        db.info["todo_changes"] = changes
+        db.info["todo_stat_deltas"] = stat_deltas
+        raise
+
+@event.listens_for(Session, "before_commit")
+def _index_changes(session: Session) -> None:
+    if session.in_nested_transaction():
+        # Releasing a SAVEPOINT; derived state is written once, by the outermost commit
+        return
+    changes: Dict[int, Dict[str, Set[int]]] = session.info.get("todo_changes")
+    stat_deltas = session.info.pop("todo_stat_deltas", None)
+    if changes or stat_deltas:
+        # Runs inside the committing transaction, so derived state commits atomically with the data
+        session.flush()
+    if changes:
+        versions = SyncService.stamp_changes(session, changes)
+        session.info["todo_stamped_versions"] = versions
+        search_index.apply(session, changes)
+        for user_id, version in versions.items():
+            change = changes[user_id]
+            invalidation_channel.append(session, invalidation_channel.TODOS, user_id, {
+                "upserted": sorted(change["upserted"]), "deleted": sorted(change["deleted"]),
+            }, version)
+    if stat_deltas:
+        StatsService.apply_deltas(session, stat_deltas)
+
+@event.listens_for(Session, "after_commit")
+def _apply_changes(session: Session) -> None:
+    if session.in_nested_transaction():
+        return
+    changes = session.info.pop("todo_changes", None)
+    versions = session.info.pop("todo_stamped_versions", None)
+    if not changes:
+        return
+    if todo_versions.shared:
+        for user_id, version in (versions or {}).items():
+            todo_versions.advance(user_id, version)
+        search_index.committed(changes)
+        # Feeds are published by the channel tailer, in log order across every worker's commits
+        invalidation_channel.wake()
+        return
+    with _publish_lock:
+        # Versions double as feed sequence numbers, so bump and publish in the same order
+        for user_id, change in changes.items():
+            version = todo_versions.bump(user_id)
+            change_broker.publish(user_id, version, sorted(change["upserted"]), sorted(change["deleted"]))
+    search_index.committed(changes)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session: Session) -> None:
+    if session.in_nested_transaction():
+        # A SAVEPOINT rollback; savepoint() restores what was recorded before it
+        return
+    session.info.pop("todo_changes", None)
+    session.info.pop("todo_stat_deltas", None)
+    session.info.pop("todo_stamped_versions", None)
+
+def _apply_logged_changes(user_id: int, version: Optional[int], payload: Dict[str, list]) -> None:
+    todo_versions.advance(user_id, version)
+    change_broker.publish(user_id, version, payload["upserted"], payload["deleted"])
+    search_index.committed({user_id: {"upserted": set(payload["upserted"]), "deleted": set(payload["deleted"])}})
+
+invalidation_channel.on(invalidation_channel.TODOS, _apply_logged_changes)
@@ -0,0 +1,130 @@
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+from sqlalchemy import delete, func, insert, or_, select
+from sqlalchemy.orm import Session
+
+from ..database.base import AsyncSessionLocal
+from ..models.job import CacheInvalidation
+from ..utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+# handler(user_id, version, payload), called in id order for every row, including this worker's own;
+# a row that commits after one with a higher id is handed over when it shows up
+InvalidationHandler = Callable[[int, Optional[int], Dict[str, Any]], None]
+
+class InvalidationChannel:
+    """Keeps per-process state coherent across workers that share one database.
+
+    A commit that changes cached data appends a row to cache_invalidations in
+    the same transaction; every worker tails the table and hands each row to
+    the handler registered for its kind. Rows only become visible once their
+    transaction commits, and ids need not follow commit order where writers
+    run concurrently (PostgreSQL, MySQL): a tailer that reads id 7 may find
+    id 6 committed only later. Ids skipped over are kept as gaps and fetched
+    again on every poll until they show up or `gap_seconds` pass, which also
+    retires ids that rolled back and will never appear.
+    Disabled (CACHE_CHANNEL="local"), append() is a no-op and nothing polls.
+    """
+
+    TODOS = "todos"
+    PRINCIPAL = "principal"
+
+    def __init__(self, enabled: bool, poll_ms: int, gap_seconds: int):
+        self.enabled = enabled
+        self.poll_interval = poll_ms / 1000
+        self.gap_seconds = gap_seconds
+        self._handlers: Dict[str, InvalidationHandler] = {}
+        self._last_id: Optional[int] = None
+        # Ids below _last_id not seen yet, each with the monotonic time to stop waiting for it
+        self._gaps: Dict[int, float] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def on(self, kind: str, handler: InvalidationHandler) -> None:
+        self._handlers[kind] = handler
+
+    def append(self, db: Session, kind: str, user_id: int, payload: Dict[str, Any], version: Optional[int] = None) -> None:
+        """Log a change in db's transaction; every worker applies it once the transaction commits"""
+        if not self.enabled:
+            return
+        db.execute(insert(CacheInvalidation.__table__).values(
+            kind=kind, user_id=user_id, version=version, payload=json.dumps(payload), created_at=datetime.utcnow(),
+        ))
+
+    def wake(self) -> None:
+        """Poll now rather than at the next tick; safe to call from any thread"""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def poll(self, db: Session, limit: int = 1000) -> int:
+        """Apply rows appended since the last poll; returns how many"""
+        if self._last_id is None:
+            # Start from now: this worker's caches are empty, so nothing earlier can be stale in them
+            self._last_id = db.scalar(select(func.max(CacheInvalidation.id))) or 0
+            return 0
+        now = time.monotonic()
+        self._gaps = {gap: until for gap, until in self._gaps.items() if until > now}
+        condition = CacheInvalidation.id > self._last_id
+        if self._gaps:
+            condition = or_(condition, CacheInvalidation.id.in_(list(self._gaps)))
+        rows = db.execute(
+            select(CacheInvalidation.id, CacheInvalidation.kind, CacheInvalidation.user_id,
+                   CacheInvalidation.version, CacheInvalidation.payload)
+            .where(condition)
+            .order_by(CacheInvalidation.id)
+            .limit(limit)
+        ).all()
+        for row in rows:
+            if row.id > self._last_id:
+                for gap in range(self._last_id + 1, row.id):
+                    self._gaps[gap] = now + self.gap_seconds
+                self._last_id = row.id
+            else:
+                del self._gaps[row.id]
+            handler = self._handlers.get(row.kind)
+            if handler is None:
+                continue
+            try:
+                handler(row.user_id, row.version, json.loads(row.payload))
+            except Exception:
+                logger.exception("Applying cache invalidation %s failed", row.id)
+        return len(rows)
+
+    async def run(self) -> None:
+        """Tail the log until cancelled"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        while True:
+            self._wakeup.clear()
+            try:
+                async with AsyncSessionLocal() as db:
+                    while await db.run_sync(self.poll) > 0:
+                        pass
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Polling cache invalidations failed")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    @staticmethod
+    def purge(db: Session, older_than: datetime) -> int:
+        purged = db.execute(delete(CacheInvalidation).where(CacheInvalidation.created_at < older_than)).rowcount
+        db.commit()
+        return purged
+
+invalidation_channel = InvalidationChannel(
+    settings.CACHE_CHANNEL == "database", settings.CACHE_CHANNEL_POLL_MS, settings.CACHE_CHANNEL_GAP_SECONDS,
+)
+
+async def purge_cache_invalidations() -> None:
+    older_than = datetime.utcnow() - timedelta(seconds=settings.CACHE_CHANNEL_RETENTION_SECONDS)
+    async with AsyncSessionLocal() as db:
+        await db.run_sync(InvalidationChannel.purge, older_than)
@@ -0,0 +1,116 @@
+import asyncio
+import contextvars
+import logging
+from typing import Any, Callable, List, Optional, Tuple
+from sqlalchemy.orm import Session
+
+from ..database.base import AsyncSessionLocal
+from ..utils.config import settings
+from .changes import savepoint
+
+logger = logging.getLogger(__name__)
+
+class _PendingWrite:
+    __slots__ = ("write", "args", "future", "queued_at")
+
+    def __init__(self, write: Callable[..., Any], args: Tuple[Any, ...], future: asyncio.Future, queued_at: float):
+        self.write = write
+        self.args = args
+        self.future = future
+        self.queued_at = queued_at
+
+class WriteCoalescer:
+    """Group commit for small, independent writes.
+
+    Writes submitted within `window_ms` of the oldest queued one run in a
+    single transaction, each inside its own SAVEPOINT: a write that raises
+    is rolled back alone and its caller gets the exception, the rest commit
+    together and their callers get their own return values. One batch
+    commits at a time; writes arriving meanwhile form the next batch.
+
+    A write is `write(db, *args)` on a sync Session that must not commit.
+    Its return value is handed back detached once the batch commits, so it
+    has to be fully loaded when the write returns. A caller that goes away
+    does not cancel its write.
+    """
+
+    def __init__(self, window_ms: int, max_batch: int):
+        self.window = window_ms / 1000
+        self.max_batch = max(1, max_batch)
+        self._pending: List[_PendingWrite] = []
+        self._full: Optional[asyncio.Event] = None
+        self._drainer: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    async def submit(self, write: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(_PendingWrite(write, args, future, loop.time()))
+        if self._drainer is None or self._drainer.done():
+            self._full = asyncio.Event()
+            # A fresh context, so the batch's queries are not billed to whichever request started it
+            self._drainer = loop.create_task(self._drain(), context=contextvars.Context())
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+        return await future
+
+    async def close(self) -> None:
+        """Wait for queued writes to commit"""
+        if self._drainer is not None:
+            self._full.set()
+            await self._drainer
+
+    async def _drain(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            delay = self._pending[0].queued_at + self.window - loop.time()
+            if delay > 0 and not self._full.is_set():
+                try:
+                    await asyncio.wait_for(self._full.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+            batch = self._pending[:self.max_batch]
+            del self._pending[:len(batch)]
+            if len(self._pending) < self.max_batch:
+                self._full.clear()
+            await self._commit(batch)
+
+    async def _commit(self, batch: List[_PendingWrite]) -> None:
+        try:
+            async with AsyncSessionLocal() as db:
+                outcomes = await db.run_sync(self._apply, batch)
+        except Exception as exc:
+            logger.warning("Coalesced commit of %d writes failed: %s", len(batch), exc)
+            outcomes = [(False, exc)] * len(batch)
+        for pending, (ok, value) in zip(batch, outcomes):
+            if pending.future.done():
+                continue
+            if ok:
+                pending.future.set_result(value)
+            else:
+                pending.future.set_exception(value)
+
+    @staticmethod
+    def _apply(db: Session, batch: List[_PendingWrite]) -> List[Tuple[bool, Any]]:
+        outcomes = []
+        if db.get_bind().dialect.name == "sqlite":
+            # pysqlite opens no transaction before a SAVEPOINT, which then starts one that its RELEASE
+            # commits; open the batch's transaction first so every write commits with db.commit().
+            # IMMEDIATE takes the write lock now, waiting out other writers instead of failing later.
+            db.connection().exec_driver_sql("BEGIN IMMEDIATE")
+        for pending in batch:
+            try:
+                with savepoint(db):
+                    outcomes.append((True, pending.write(db, *pending.args)))
+            except Exception as exc:
+                outcomes.append((False, exc))
+            # Detach what this write loaded: its result is a snapshot of its own write, and the
+            # next write of the same row loads a fresh copy instead of mutating the one handed out
+            db.expunge_all()
+        db.commit()
+        return outcomes
+
+write_coalescer = WriteCoalescer(settings.WRITE_COALESCE_WINDOW_MS, settings.WRITE_COALESCE_MAX_BATCH)
@@ -0,0 +1,141 @@
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Set
+
+from ..utils.config import settings
+
+class ChangeEvent:
+    __slots__ = ("seq", "upserted", "deleted")
+
+    def __init__(self, seq: int, upserted: List[int], deleted: List[int]):
+        self.seq = seq
+        self.upserted = upserted
+        self.deleted = deleted
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"seq": self.seq, "upserted": self.upserted, "deleted": self.deleted}
+
+class Subscription:
+    """One listener's position in a user's feed; woken on publish, reads from the shared history"""
+
+    def __init__(self, channel: "_Channel", last_seq: int):
+        self._channel = channel
+        self.last_seq = last_seq
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+
+    def _notify(self) -> None:
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._wakeup.set()
+        else:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def pending(self) -> Optional[List[ChangeEvent]]:
+        """Events after last_seq, or None if some of them already fell out of the history"""
+        events = self._channel.since(self.last_seq)
+        if events is None:
+            return None
+        if events:
+            self.last_seq = events[-1].seq
+        return events
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait until something was published since the last call; False on timeout"""
+        self._wakeup.clear()
+        if self._channel.last_seq > self.last_seq:
+            return True
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def reset(self) -> None:
+        self.last_seq = self._channel.last_seq
+
+class _Channel:
+    def __init__(self, history: int):
+        self.events: Deque[ChangeEvent] = deque(maxlen=history)
+        self.subscribers: Set[Subscription] = set()
+        self.last_seq = 0
+        self.lock = threading.Lock()
+
+    def since(self, seq: int) -> Optional[List[ChangeEvent]]:
+        with self.lock:
+            if seq >= self.last_seq:
+                return []
+            if not self.events or self.events[0].seq > seq + 1:
+                return None
+            return [event for event in self.events if event.seq > seq]
+
+class ChangeBroker:
+    """In-process per-user change feed.
+
+    Publishing appends to a bounded per-user history and sets each
+    subscriber's wakeup flag; it never blocks on or buffers for a slow
+    subscriber. Subscribers read from the shared history at their own pace
+    and are told to resynchronize if they fall further behind than it holds.
+    """
+
+    def __init__(self, history: int, max_channels: int):
+        self._history = history
+        self._max_channels = max_channels
+        self._channels: "OrderedDict[int, _Channel]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _channel(self, user_id: int) -> _Channel:
+        with self._lock:
+            channel = self._channels.get(user_id)
+            if channel is None:
+                channel = self._channels[user_id] = _Channel(self._history)
+                self._evict()
+            else:
+                self._channels.move_to_end(user_id)
+            return channel
+
+    def _evict(self) -> None:
+        # Drop the least recently used feeds nobody is listening to; resuming those asks for a resync
+        for user_id in list(self._channels):
+            if len(self._channels) <= self._max_channels:
+                break
+            if not self._channels[user_id].subscribers:
+                del self._channels[user_id]
+
+    def publish(self, user_id: int, seq: int, upserted: List[int], deleted: List[int]) -> None:
+        channel = self._channel(user_id)
+        with channel.lock:
+            if seq <= channel.last_seq:
+                return
+            channel.events.append(ChangeEvent(seq, upserted, deleted))
+            channel.last_seq = seq
+            subscribers = list(channel.subscribers)
+        for subscription in subscribers:
+            subscription._notify()
+
+    def subscribe(self, user_id: int, current_seq: int, last_seq: Optional[int] = None) -> Subscription:
+        """Start listening after last_seq (default: now); current_seq is the user's latest version"""
+        channel = self._channel(user_id)
+        with channel.lock:
+            # Versions bumped before this channel existed were never recorded in its history
+            channel.last_seq = max(channel.last_seq, current_seq)
+            subscription = Subscription(channel, channel.last_seq if last_seq is None else last_seq)
+            channel.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, user_id: int, subscription: Subscription) -> None:
+        with self._lock:
+            channel = self._channels.get(user_id)
+        if channel is not None:
+            with channel.lock:
+                channel.subscribers.discard(subscription)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(channel.subscribers) for channel in self._channels.values())
+
+change_broker = ChangeBroker(settings.STREAM_HISTORY_SIZE, settings.STREAM_MAX_CHANNELS)
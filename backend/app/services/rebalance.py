@@ -0,0 +1,81 @@
+import asyncio
+import contextvars
+import logging
+from typing import List, Optional, Set, Tuple
+from sqlalchemy import bindparam, select
+from sqlalchemy.orm import Session
+
+from ..database.base import AsyncSessionLocal
+from ..models.todo import Todo
+from ..utils.config import settings
+from ..utils.ranking import spread_keys
+from .changes import record_change
+
+logger = logging.getLogger(__name__)
+
+class RankRebalancer:
+    """Respreads board columns whose rank keys have grown long.
+
+    A move writes only the moved todo, with a key between its neighbours'
+    keys, so repeated drops into one gap lengthen keys by about a character
+    every five moves. Once a move leaves a key over `max_length`, its column
+    is rewritten with short, evenly spaced keys in a background task, off
+    the request path; the order of the column does not change.
+    """
+
+    def __init__(self, max_length: int):
+        self.max_length = max_length
+        self._pending: Set[Tuple[int, str]] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def needed(self, rank: str) -> bool:
+        return self.max_length > 0 and len(rank) > self.max_length
+
+    def schedule(self, user_id: int, stage: str) -> None:
+        self._pending.add((user_id, stage))
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(), context=contextvars.Context())
+
+    async def close(self) -> None:
+        """Finish queued rebalances"""
+        if self._task is not None:
+            await self._task
+
+    async def _run(self) -> None:
+        while self._pending:
+            user_id, stage = self._pending.pop()
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.run_sync(self.rebalance, user_id, stage)
+            except Exception:
+                # The next long key schedules the column again
+                logger.exception("Rebalancing ranks of user %s, stage %s failed", user_id, stage)
+
+    @staticmethod
+    def respread(db: Session, user_id: int, stage: str) -> List[int]:
+        """Give one user's stage column evenly spaced keys in its current order, without committing;
+        returns the ids in that order"""
+        todos = Todo.__table__
+        ids = list(db.scalars(
+            select(todos.c.id)
+            .where(todos.c.user_id == user_id, todos.c.stage == stage)
+            .order_by(todos.c.rank, todos.c.id)
+        ))
+        if ids:
+            db.execute(
+                todos.update()
+                .where(todos.c.id == bindparam("todo_id"))
+                .values(rank=bindparam("new_rank"), updated_at=todos.c.updated_at),
+                [{"todo_id": todo_id, "new_rank": rank} for todo_id, rank in zip(ids, spread_keys(len(ids)))],
+            )
+            # Ranks are part of every todo record, so synced clients need the new ones
+            record_change(db, user_id, ids)
+        return ids
+
+    @staticmethod
+    def rebalance(db: Session, user_id: int, stage: str) -> int:
+        respread = len(RankRebalancer.respread(db, user_id, stage))
+        db.commit()
+        return respread
+
+rank_rebalancer = RankRebalancer(settings.TODO_RANK_REBALANCE_LENGTH)
@@ -0,0 +1,135 @@
+import importlib
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm import Session
+
+from ..database.base import AsyncSessionLocal
+from ..database.upsert import insert_ignore
+from ..models.job import JobWatermark
+from ..models.todo import Todo
+from ..utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+WATERMARK = "due_dates"
+
+class DueEvent:
+    __slots__ = ("kind", "todo_id", "user_id", "text", "due_date")
+
+    REMINDER = "reminder"
+    OVERDUE = "overdue"
+
+    def __init__(self, kind: str, todo_id: int, user_id: int, text: str, due_date: datetime):
+        self.kind = kind
+        self.todo_id = todo_id
+        self.user_id = user_id
+        self.text = text
+        self.due_date = due_date
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "todo_id": self.todo_id,
+            "user_id": self.user_id,
+            "text": self.text,
+            "due_date": self.due_date.isoformat(),
+        }
+
+# A sink receives each batch of events; it is awaited before the next batch is read
+DueSink = Callable[[List[DueEvent]], Awaitable[None]]
+
+class LogSink:
+    async def __call__(self, events: List[DueEvent]) -> None:
+        for event in events:
+            logger.info("Todo %s of user %s is %s (due %s)", event.todo_id, event.user_id, event.kind, event.due_date)
+
+class MemorySink:
+    """Collects events in a list; the stand-in for tests and local runs"""
+
+    def __init__(self):
+        self.events: List[DueEvent] = []
+
+    async def __call__(self, events: List[DueEvent]) -> None:
+        self.events.extend(events)
+
+def create_due_sink() -> DueSink:
+    sink = settings.DUE_EVENT_SINK
+    if sink == "log":
+        return LogSink()
+    if sink == "memory":
+        return MemorySink()
+    module, _, factory = sink.partition(":")
+    return getattr(importlib.import_module(module), factory)()
+
+class DueDateService:
+    @staticmethod
+    def claim_window(db: Session, now: datetime) -> Optional[Tuple[datetime, datetime]]:
+        """Advance the sweep watermark to now and return the (start, now] window it covered
+
+        The first sweep only records its start, so a fresh deployment does not replay history.
+        The conditional UPDATE lets exactly one of several concurrent workers claim a window.
+        """
+        start = db.execute(select(JobWatermark.position).where(JobWatermark.name == WATERMARK)).scalar()
+        if start is None:
+            db.execute(insert_ignore(db, JobWatermark).values(name=WATERMARK, position=now))
+            db.commit()
+            return None
+        if start >= now:
+            return None
+        claimed = db.execute(
+            update(JobWatermark)
+            .where(JobWatermark.name == WATERMARK, JobWatermark.position == start)
+            .values(position=now)
+        ).rowcount
+        db.commit()
+        return (start, now) if claimed else None
+
+    @staticmethod
+    def due_between(
+        db: Session, start: datetime, end: datetime,
+        after: Optional[Tuple[datetime, int]] = None, limit: int = 1000,
+    ) -> List[Tuple[int, int, str, datetime]]:
+        """Open todos due in (start, end], in (due_date, id) keyset pages over ix_todos_completed_due_date"""
+        query = select(Todo.id, Todo.user_id, Todo.text, Todo.due_date).where(
+            Todo.completed == False, Todo.due_date > start, Todo.due_date <= end
+        )
+        if after is not None:
+            after_due, after_id = after
+            query = query.where(or_(Todo.due_date > after_due, and_(Todo.due_date == after_due, Todo.id > after_id)))
+        return list(db.execute(query.order_by(Todo.due_date, Todo.id).limit(limit)))
+
+async def _emit_due(kind: str, start: datetime, end: datetime, sink: DueSink, batch_size: int) -> int:
+    emitted = 0
+    after = None
+    while True:
+        # A session per batch keeps no read transaction or pooled connection open while the sink runs
+        async with AsyncSessionLocal() as db:
+            rows = await db.run_sync(DueDateService.due_between, start, end, after, batch_size)
+        if rows:
+            await sink([DueEvent(kind, *row) for row in rows])
+            emitted += len(rows)
+        if len(rows) < batch_size:
+            return emitted
+        after = (rows[-1].due_date, rows[-1].id)
+
+async def sweep_due_dates(now: Optional[datetime] = None, sink: Optional[DueSink] = None) -> int:
+    """Emit reminders and overdue transitions for the window since the last sweep; returns the event count"""
+    now = now or datetime.utcnow()
+    sink = sink or due_sink
+    async with AsyncSessionLocal() as db:
+        window = await db.run_sync(DueDateService.claim_window, now)
+    if window is None:
+        return 0
+    start, end = window
+    batch_size = settings.DUE_SCAN_BATCH_SIZE
+    emitted = 0
+    lead = timedelta(minutes=settings.DUE_REMINDER_LEAD_MINUTES)
+    if lead:
+        # Todos whose lead time began in the window; any already past due only get the overdue event
+        emitted += await _emit_due(DueEvent.REMINDER, max(start + lead, end), end + lead, sink, batch_size)
+    emitted += await _emit_due(DueEvent.OVERDUE, start, end, sink, batch_size)
+    return emitted
+
+due_sink = create_due_sink()
@@ -0,0 +1,299 @@
+import bisect
+import math
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import bindparam, select, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session
+
+from ..models.todo import Todo, SubTask
+from ..utils.cache import LRUCache
+from ..utils.config import settings
+
+# Field weights shared by both backends: title matches outrank description, then subtasks
+FIELD_WEIGHTS = {"text": 10.0, "description": 5.0, "subtasks": 2.0}
+
+# Upper bound on vocabulary terms a single prefix may expand to in the in-process index
+MAX_PREFIX_EXPANSIONS = 64
+
+_TOKEN = re.compile(r"\w+")
+
+def tokenize(value: str) -> List[str]:
+    return _TOKEN.findall(value.lower()) if value else []
+
+def _chunks(ids: List[int], size: int = 500) -> Iterable[List[int]]:
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+def _changed_ids(changes: Dict[int, Dict[str, Set[int]]], kind: str) -> Set[int]:
+    return {todo_id for change in changes.values() for todo_id in change[kind]}
+
+class FTS5SearchIndex:
+    """SQLite FTS5 index kept in sync inside each mutating transaction"""
+
+    name = "fts5"
+
+    _DOCUMENTS = """
+        SELECT t.id, 'u' || t.user_id, t.text, coalesce(t.description, ''),
+               coalesce((SELECT group_concat(s.text, ' ') FROM subtasks s WHERE s.todo_id = t.id), '')
+        FROM todos t
+    """
+
+    def ensure_schema(self, bind: Engine) -> None:
+        with bind.begin() as conn:
+            conn.execute(text(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS todo_search "
+                "USING fts5(owner, text, description, subtasks, tokenize='unicode61')"
+            ))
+            # Probe one row: count(*) on an FTS5 table reads the whole index on every boot
+            if conn.execute(text("SELECT rowid FROM todo_search LIMIT 1")).first() is None:
+                conn.execute(text(
+                    f"INSERT INTO todo_search (rowid, owner, text, description, subtasks) {self._DOCUMENTS}"
+                ))
+
+    def apply(self, db: Session, changes: Dict[int, Dict[str, Set[int]]]) -> None:
+        upserted = _changed_ids(changes, "upserted")
+        stale = list(upserted | _changed_ids(changes, "deleted"))
+        for ids in _chunks(stale):
+            db.execute(
+                text("DELETE FROM todo_search WHERE rowid IN :ids").bindparams(bindparam("ids", expanding=True)),
+                {"ids": ids},
+            )
+        for ids in _chunks(list(upserted)):
+            db.execute(
+                text(
+                    f"INSERT INTO todo_search (rowid, owner, text, description, subtasks) "
+                    f"{self._DOCUMENTS} WHERE t.id IN :ids"
+                ).bindparams(bindparam("ids", expanding=True)),
+                {"ids": ids},
+            )
+
+    def committed(self, changes: Dict[int, Dict[str, Set[int]]]) -> None:
+        pass
+
+    def search(
+        self, db: Session, user_id: int, query: str, prefix: bool, limit: int, offset: int
+    ) -> List[int]:
+        terms = tokenize(query)
+        if not terms:
+            return []
+        quoted = [f'"{term}"' for term in terms]
+        if prefix:
+            quoted[-1] += "*"
+        # The owner column turns the per-user filter into one more posting-list intersection
+        match = f'owner:"u{user_id}" AND ' + " AND ".join(quoted)
+        weights = ", ".join(str(FIELD_WEIGHTS[field]) for field in ("text", "description", "subtasks"))
+        rows = db.execute(
+            text(
+                f"SELECT rowid FROM todo_search WHERE todo_search MATCH :match "
+                f"ORDER BY bm25(todo_search, 0.0, {weights}) LIMIT :limit OFFSET :offset"
+            ),
+            {"match": match, "limit": limit, "offset": offset},
+        )
+        return [row[0] for row in rows]
+
+class _UserIndex:
+    def __init__(self):
+        self.postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self.doc_terms: Dict[int, Dict[str, float]] = {}
+        self.doc_lengths: Dict[int, float] = {}
+        self.dirty: Set[int] = set()
+        self.patching: Set[int] = set()
+        self._vocabulary: List[str] = []
+        self._vocabulary_stale = True
+
+    def remove(self, todo_id: int) -> None:
+        for term in self.doc_terms.pop(todo_id, {}):
+            postings = self.postings[term]
+            postings.pop(todo_id, None)
+            if not postings:
+                del self.postings[term]
+                self._vocabulary_stale = True
+        self.doc_lengths.pop(todo_id, None)
+
+    def add(self, todo_id: int, fields: Dict[str, str]) -> None:
+        self.remove(todo_id)
+        weighted: Dict[str, float] = defaultdict(float)
+        for field, value in fields.items():
+            for term in tokenize(value):
+                weighted[term] += FIELD_WEIGHTS[field]
+        for term, weight in weighted.items():
+            if term not in self.postings:
+                self._vocabulary_stale = True
+            self.postings[term][todo_id] = weight
+        self.doc_terms[todo_id] = weighted
+        self.doc_lengths[todo_id] = sum(weighted.values())
+
+    def expand(self, term: str) -> List[str]:
+        if self._vocabulary_stale:
+            self._vocabulary = sorted(self.postings)
+            self._vocabulary_stale = False
+        start = bisect.bisect_left(self._vocabulary, term)
+        matches = []
+        for candidate in self._vocabulary[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not candidate.startswith(term):
+                break
+            matches.append(candidate)
+        return matches
+
+    def search(self, terms: List[str], prefix: bool) -> List[Tuple[int, float]]:
+        documents = len(self.doc_terms)
+        if not documents:
+            return []
+        average_length = sum(self.doc_lengths.values()) / documents
+        k1, b = 1.2, 0.75
+        scores: Dict[int, float] = {}
+        for position, term in enumerate(terms):
+            variants = self.expand(term) if prefix and position == len(terms) - 1 else [term]
+            # Like FTS5, a prefix counts as one term whose postings are the union of its expansions
+            postings: Dict[int, float] = defaultdict(float)
+            for variant in variants:
+                for todo_id, frequency in self.postings.get(variant, {}).items():
+                    postings[todo_id] += frequency
+            idf = math.log(1 + (documents - len(postings) + 0.5) / (len(postings) + 0.5))
+            term_scores: Dict[int, float] = {}
+            for todo_id, frequency in postings.items():
+                norm = k1 * (1 - b + b * self.doc_lengths[todo_id] / average_length)
+                term_scores[todo_id] = idf * frequency * (k1 + 1) / (frequency + norm)
+            # Every term must match, as with FTS5's implicit AND
+            if position == 0:
+                scores = term_scores
+            else:
+                scores = {todo_id: scores[todo_id] + score for todo_id, score in term_scores.items() if todo_id in scores}
+            if not scores:
+                return []
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+class MemorySearchIndex:
+    """In-process inverted index, built per user on first search and patched from committed changes.
+
+    Searches run on the event loop through AsyncSession.run_sync, so the
+    lock is only ever held for in-memory work: rows are read before it is
+    taken, and ids committed while a load is reading are recorded so the
+    loaded index does not miss them.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_users: int):
+        self._users = LRUCache(max_users)
+        self._lock = threading.Lock()
+        # user_id -> one set per full load in progress, collecting ids committed meanwhile
+        self._loading: Dict[int, List[Set[int]]] = defaultdict(list)
+
+    def ensure_schema(self, bind: Engine) -> None:
+        pass
+
+    def apply(self, db: Session, changes: Dict[int, Dict[str, Set[int]]]) -> None:
+        pass
+
+    def committed(self, changes: Dict[int, Dict[str, Set[int]]]) -> None:
+        with self._lock:
+            for user_id, change in changes.items():
+                ids = change["upserted"] | change["deleted"]
+                index = self._users.get(user_id)
+                if index is not None:
+                    index.dirty.update(ids)
+                for missed in self._loading.get(user_id, ()):
+                    missed.update(ids)
+
+    @staticmethod
+    def _fetch(db: Session, user_id: int, todo_ids: Optional[List[int]] = None) -> Dict[int, Dict[str, str]]:
+        documents: Dict[int, Dict[str, str]] = {}
+        subtasks: Dict[int, List[str]] = defaultdict(list)
+        batches = _chunks(todo_ids) if todo_ids is not None else [None]
+        for ids in batches:
+            query = select(Todo.id, Todo.text, Todo.description).where(Todo.user_id == user_id)
+            subtask_query = select(SubTask.todo_id, SubTask.text).join(Todo, Todo.id == SubTask.todo_id)
+            subtask_query = subtask_query.where(Todo.user_id == user_id)
+            if ids is not None:
+                query = query.where(Todo.id.in_(ids))
+                subtask_query = subtask_query.where(SubTask.todo_id.in_(ids))
+            for todo_id, todo_text, description in db.execute(query):
+                documents[todo_id] = {"text": todo_text, "description": description or ""}
+            for todo_id, subtask_text in db.execute(subtask_query):
+                subtasks[todo_id].append(subtask_text)
+        for todo_id, fields in documents.items():
+            fields["subtasks"] = " ".join(subtasks[todo_id])
+        return documents
+
+    @staticmethod
+    def _patch(index: _UserIndex, documents: Dict[int, Dict[str, str]], todo_ids: Iterable[int] = ()) -> None:
+        for todo_id in todo_ids:
+            if todo_id not in documents:
+                index.remove(todo_id)
+        for todo_id, fields in documents.items():
+            index.add(todo_id, fields)
+
+    def _build(self, db: Session, user_id: int) -> _UserIndex:
+        missed: Set[int] = set()
+        with self._lock:
+            self._loading[user_id].append(missed)
+        try:
+            index = _UserIndex()
+            self._patch(index, self._fetch(db, user_id))
+        finally:
+            with self._lock:
+                self._loading[user_id].remove(missed)
+                if not self._loading[user_id]:
+                    del self._loading[user_id]
+        with self._lock:
+            current = self._users.get(user_id)
+            if current is not None:
+                # A concurrent search cached its index first; that one is already being kept current
+                return current
+            index.dirty.update(missed)
+            self._users.set(user_id, index)
+            return index
+
+    def search(
+        self, db: Session, user_id: int, query: str, prefix: bool, limit: int, offset: int
+    ) -> List[int]:
+        terms = tokenize(query)
+        if not terms:
+            return []
+        with self._lock:
+            index = self._users.get(user_id)
+            dirty: Set[int] = set()
+            if index is not None:
+                # Ids another search is still patching are reloaded here too, so this search sees them
+                dirty = index.dirty | index.patching
+                index.patching |= index.dirty
+                index.dirty = set()
+        if index is None:
+            index = self._build(db, user_id)
+        elif dirty:
+            try:
+                documents = self._fetch(db, user_id, list(dirty))
+            except Exception:
+                with self._lock:
+                    index.patching -= dirty
+                    index.dirty |= dirty
+                raise
+            with self._lock:
+                self._patch(index, documents, dirty)
+                index.patching -= dirty
+        with self._lock:
+            ranked = index.search(terms, prefix)
+        return [todo_id for todo_id, _ in ranked[offset:offset + limit]]
+
+def _fts5_available() -> bool:
+    import sqlite3
+    try:
+        sqlite3.connect(":memory:").execute("CREATE VIRTUAL TABLE probe USING fts5(body)")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+def create_search_index():
+    backend = settings.SEARCH_BACKEND
+    if backend == "auto":
+        sqlite = make_url(settings.DATABASE_URL).get_backend_name() == "sqlite"
+        backend = "fts5" if sqlite and _fts5_available() else "memory"
+    if backend == "fts5":
+        return FTS5SearchIndex()
+    return MemorySearchIndex(settings.SEARCH_MEMORY_MAX_USERS)
+
+search_index = create_search_index()
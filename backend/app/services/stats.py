@@ -0,0 +1,180 @@
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, Mapping, Optional, Tuple
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..database.base import AsyncSessionLocal
+from ..database.upsert import insert_ignore
+from ..models.todo import Todo, TodoStat, StageEnum, PriorityEnum, CategoryEnum
+
+logger = logging.getLogger(__name__)
+
+# Every (field, value) counter a user has; rows are created up front so deltas are plain UPDATEs
+STAT_DOMAIN = {
+    "total": ["all"],
+    "stage": [stage.value for stage in StageEnum],
+    "priority": [priority.value for priority in PriorityEnum],
+    "category": [category.value for category in CategoryEnum],
+    "completed": ["true", "false"],
+}
+STAT_FIELDS = ("stage", "priority", "category", "completed")
+
+StatKey = Tuple[str, str]
+
+def _stat_value(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return getattr(value, "value", value)
+
+def stat_keys(values: Mapping[str, Any]) -> Dict[str, Optional[str]]:
+    """Counter values of a todo given as column values; absent columns take their insert default"""
+    keys = {}
+    for field in STAT_FIELDS:
+        value = values[field] if field in values else Todo.__table__.c[field].default.arg
+        keys[field] = _stat_value(value)
+    return keys
+
+def record_stat_delta(
+    db: Session, user_id: int, before: Optional[Mapping[str, Any]], after: Optional[Mapping[str, Any]]
+) -> None:
+    """Queue the counter changes for one todo going from before to after (None = absent)"""
+    deltas: Counter = db.info.setdefault("todo_stat_deltas", {}).setdefault(user_id, Counter())
+    for values, sign in ((before, -1), (after, 1)):
+        if values is None:
+            continue
+        deltas[("total", "all")] += sign
+        for field, value in stat_keys(values).items():
+            if value is not None:
+                deltas[(field, value)] += sign
+
+class StatsService:
+    _INCREMENT = (
+        update(TodoStat.__table__)
+        .where(
+            TodoStat.__table__.c.user_id == bindparam("b_user_id"),
+            TodoStat.__table__.c.field == bindparam("b_field"),
+            TodoStat.__table__.c.value == bindparam("b_value"),
+        )
+        .values(count=TodoStat.__table__.c.count + bindparam("b_delta"))
+    )
+
+    @staticmethod
+    def apply_deltas(db: Session, deltas: Dict[int, Counter]) -> None:
+        # Users whose counters were never built match no rows; they are built on first read
+        rows = [
+            {"b_user_id": user_id, "b_field": field, "b_value": value, "b_delta": delta}
+            for user_id, counter in deltas.items()
+            for (field, value), delta in sorted(counter.items())
+            if delta
+        ]
+        if rows:
+            db.execute(StatsService._INCREMENT, rows)
+
+    @staticmethod
+    def _actual_counts(db: Session, user_id: int) -> Dict[StatKey, int]:
+        counts: Dict[StatKey, int] = {
+            (field, value): 0 for field, values in STAT_DOMAIN.items() for value in values
+        }
+        counts[("total", "all")] = db.scalar(select(func.count()).where(Todo.user_id == user_id))
+        for field in STAT_FIELDS:
+            column = getattr(Todo, field)
+            for value, count in db.execute(
+                select(column, func.count()).where(Todo.user_id == user_id).group_by(column)
+            ):
+                value = _stat_value(value)
+                if value is not None:
+                    counts[(field, value)] = count
+        return counts
+
+    @staticmethod
+    def rebuild(db: Session, user_id: int) -> int:
+        """Recount a user's counters from todos and fix any that drifted; returns how many changed"""
+        db.execute(
+            insert_ignore(db, TodoStat),
+            [
+                {"user_id": user_id, "field": field, "value": value, "count": 0}
+                for field, values in STAT_DOMAIN.items()
+                for value in values
+            ],
+        )
+        # Write-lock the user's counters before counting, so concurrent deltas queue behind the recount
+        db.execute(update(TodoStat).where(TodoStat.user_id == user_id).values(count=TodoStat.count))
+        stored = {
+            (field, value): count
+            for field, value, count in db.execute(
+                select(TodoStat.field, TodoStat.value, TodoStat.count).where(TodoStat.user_id == user_id)
+            )
+        }
+        actual = StatsService._actual_counts(db, user_id)
+        drifted = [
+            {"b_user_id": user_id, "b_field": field, "b_value": value, "b_delta": count - stored.get((field, value), 0)}
+            for (field, value), count in actual.items()
+            if count != stored.get((field, value), 0)
+        ]
+        if drifted:
+            db.execute(StatsService._INCREMENT, drifted)
+        db.commit()
+        return len(drifted)
+
+    @staticmethod
+    def get_stats(db: Session, user_id: int, now: Optional[datetime] = None) -> Dict[str, Any]:
+        query = select(TodoStat.field, TodoStat.value, TodoStat.count).where(TodoStat.user_id == user_id)
+        rows = db.execute(query).all()
+        if not rows:
+            StatsService.rebuild(db, user_id)
+            rows = db.execute(query).all()
+        counters: Dict[str, Dict[str, int]] = {field: {} for field in STAT_DOMAIN}
+        for field, value, count in rows:
+            counters[field][value] = count
+        # Clock-relative windows can't be kept as deltas; both are range counts on one index
+        now = now or datetime.utcnow()
+        open_due = select(func.count()).where(Todo.user_id == user_id, Todo.completed == False)
+        overdue = db.scalar(open_due.where(Todo.due_date < now))
+        due_this_week = db.scalar(open_due.where(Todo.due_date >= now, Todo.due_date < now + timedelta(days=7)))
+        return {
+            "total": counters["total"].get("all", 0),
+            "completed": counters["completed"].get("true", 0),
+            "by_stage": counters["stage"],
+            "by_priority": counters["priority"],
+            "by_category": counters["category"],
+            "overdue": overdue,
+            "due_this_week": due_this_week,
+        }
+
+    @staticmethod
+    def reconcile(db: Session, after_user_id: int = 0, batch_size: int = 500) -> Tuple[int, int]:
+        """Rebuild the counters of up to batch_size users; returns (last user id, users corrected)"""
+        user_ids = db.scalars(
+            select(TodoStat.user_id)
+            .where(TodoStat.user_id > after_user_id)
+            .group_by(TodoStat.user_id)
+            .order_by(TodoStat.user_id)
+            .limit(batch_size)
+        ).all()
+        db.rollback()
+        corrected = 0
+        for user_id in user_ids:
+            drifted = StatsService.rebuild(db, user_id)
+            if drifted:
+                corrected += 1
+                logger.warning("Corrected %d drifted stat counters for user %d", drifted, user_id)
+        return (user_ids[-1] if user_ids else 0), corrected
+
+class AsyncStatsService:
+    @staticmethod
+    async def get_stats(db: AsyncSession, user_id: int) -> Dict[str, Any]:
+        return await db.run_sync(StatsService.get_stats, user_id)
+
+async def reconcile_all_stats() -> None:
+    """Recount every built user's counters to repair drift, one batch of users per session"""
+    after_user_id = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            after_user_id, _ = await db.run_sync(StatsService.reconcile, after_user_id)
+        if not after_user_id:
+            return
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Set
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from ..database.base import AsyncSessionLocal
+from ..models.todo import Todo, TodoTombstone
+from ..models.user import User
+from ..utils.config import settings
+
+def _chunks(ids: List[int], size: int = 500) -> Iterable[List[int]]:
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+class SyncService:
+    @staticmethod
+    def stamp_changes(db: Session, changes: Dict[int, Dict[str, Set[int]]]) -> Dict[int, int]:
+        """Stamp each user's changes in this transaction with the next value of that user's version;
+        returns the versions stamped"""
+        users = User.__table__
+        todos = Todo.__table__
+        now = datetime.utcnow()
+        versions = {}
+        # Sorted so concurrent commits lock user rows in the same order
+        for user_id in sorted(changes):
+            change = changes[user_id]
+            if not change["upserted"] and not change["deleted"]:
+                continue
+            # The row lock taken here is held until commit, so a user's versions become visible in order
+            db.execute(
+                users.update()
+                .where(users.c.id == user_id)
+                .values(todo_version=users.c.todo_version + 1, updated_at=users.c.updated_at)
+            )
+            version = versions[user_id] = db.scalar(select(users.c.todo_version).where(users.c.id == user_id))
+            for ids in _chunks(sorted(change["upserted"])):
+                db.execute(
+                    todos.update()
+                    .where(todos.c.user_id == user_id, todos.c.id.in_(ids))
+                    .values(version=version, updated_at=todos.c.updated_at)
+                )
+            if change["deleted"]:
+                db.execute(insert(TodoTombstone.__table__), [
+                    {"user_id": user_id, "todo_id": todo_id, "version": version, "deleted_at": now}
+                    for todo_id in sorted(change["deleted"])
+                ])
+        return versions
+
+    @staticmethod
+    def purge_tombstones(db: Session, older_than: datetime) -> int:
+        """Drop tombstones deleted before older_than; clients synced before them must resync from scratch"""
+        newest = db.execute(
+            select(TodoTombstone.user_id, func.max(TodoTombstone.version))
+            .where(TodoTombstone.deleted_at < older_than)
+            .group_by(TodoTombstone.user_id)
+        ).all()
+        purged = 0
+        for user_id, version in newest:
+            db.execute(
+                User.__table__.update()
+                .where(User.id == user_id, User.todo_purged_version < version)
+                .values(todo_purged_version=version, updated_at=User.__table__.c.updated_at)
+            )
+            purged += db.execute(
+                delete(TodoTombstone).where(TodoTombstone.user_id == user_id, TodoTombstone.version <= version)
+            ).rowcount
+        db.commit()
+        return purged
+
+async def purge_expired_tombstones() -> None:
+    older_than = datetime.utcnow() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    async with AsyncSessionLocal() as db:
+        await db.run_sync(SyncService.purge_tombstones, older_than)
@@ -1,96 +1,769 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from datetime import datetime
-
-from ..models.todo import Todo, SubTask, Tag, TodoTags
-from ..schemas.todo import TodoCreate, TodoUpdate, SubTaskCreate, TagCreate
-
-class TodoService:
-    @staticmethod
-    def get_todos(db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[Todo]:
-        return db.query(Todo).filter(Todo.user_id == user_id).offset(skip).limit(limit).all()
-
-    @staticmethod
-    def get_todo(db: Session, todo_id: int, user_id: int) -> Optional[Todo]:
-        return db.query(Todo).filter(Todo.id == todo_id, Todo.user_id == user_id).first()
-
-    @staticmethod
-    def create_todo(db: Session, todo: TodoCreate, user_id: int) -> Todo:
-        db_todo = Todo(**todo.model_dump(), user_id=user_id)
-        db.add(db_todo)
-        db.commit()
-        db.refresh(db_todo)
-        return db_todo
-
-    @staticmethod
-    def update_todo(db: Session, todo_id: int, todo_update: TodoUpdate, user_id: int) -> Optional[Todo]:
-        db_todo = TodoService.get_todo(db, todo_id, user_id)
-        if db_todo:
-            update_data = todo_update.model_dump(exclude_unset=True)
-            for field, value in update_data.items():
-                setattr(db_todo, field, value)
-            db_todo.updated_at = datetime.utcnow()
-            db.commit()
-            db.refresh(db_todo)
-        return db_todo
-
-    @staticmethod
-    def delete_todo(db: Session, todo_id: int, user_id: int) -> bool:
-        db_todo = TodoService.get_todo(db, todo_id, user_id)
-        if db_todo:
-            db.delete(db_todo)
-            db.commit()
-            return True
-        return False
-
-    @staticmethod
-    def create_subtask(db: Session, todo_id: int, subtask: SubTaskCreate, user_id: int) -> Optional[SubTask]:
-        db_todo = TodoService.get_todo(db, todo_id, user_id)
-        if db_todo:
-            db_subtask = SubTask(**subtask.model_dump(), todo_id=todo_id)
-            db.add(db_subtask)
-            db.commit()
-            db.refresh(db_subtask)
-            return db_subtask
-        return None
-
-    @staticmethod
-    def add_tag_to_todo(db: Session, todo_id: int, tag: TagCreate, user_id: int) -> Optional[Tag]:
-        db_todo = TodoService.get_todo(db, todo_id, user_id)
-        if not db_todo:
-            return None
-
-        # Get or create tag
-        db_tag = db.query(Tag).filter(Tag.name == tag.name).first()
-        if not db_tag:
-            db_tag = Tag(**tag.model_dump())
-            db.add(db_tag)
-            db.commit()
-            db.refresh(db_tag)
-
-        # Add association if it doesn't exist
-        if not db.query(TodoTags).filter_by(todo_id=todo_id, tag_id=db_tag.id).first():
-            db.execute(TodoTags.__table__.insert().values(todo_id=todo_id, tag_id=db_tag.id))
-            db.commit()
-
-        return db_tag
-
-    @staticmethod
-    def remove_tag_from_todo(db: Session, todo_id: int, tag_id: int, user_id: int) -> bool:
-        db_todo = TodoService.get_todo(db, todo_id, user_id)
-        if not db_todo:
-            return False
-
-        db.query(TodoTags).filter_by(todo_id=todo_id, tag_id=tag_id).delete()
-        db.commit()
-        return True
-
-    @staticmethod
-    def get_todos_by_tag(db: Session, tag_name: str, user_id: int) -> List[Todo]:
-        return (
-            db.query(Todo)
-            .join(TodoTags)
-            .join(Tag)
-            .filter(Tag.name == tag_name, Todo.user_id == user_id)
-            .all()
-        ) 
\ No newline at end of file
+from sqlalchemy import String, and_, or_, case, cast, exists, func, select, insert, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, Query, selectinload
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+from datetime import datetime
+
+from ..database.base import AsyncSessionLocal
+from ..database.upsert import insert_ignore, supports_upsert_returning, upsert_returning
+from ..models.todo import Todo, SubTask, Tag, TodoTags, TodoTombstone
+from ..models.user import User
+from .changes import record_change
+from .coalesce import write_coalescer
+from .rebalance import RankRebalancer, rank_rebalancer
+from .search import search_index
+from .stats import STAT_FIELDS, record_stat_delta
+from ..schemas.todo import (
+    StageEnum, TodoCreate, TodoUpdate, TodoMove, SubTaskCreate, SubTaskUpdate, TagCreate,
+    TodoFilter, TodoSortEnum, SortOrderEnum, TodoBatchUpdateItem, TodoImport,
+)
+from ..utils.metrics import record_rows
+from ..utils.pagination import decode_cursor, decode_token, encode_token
+from ..utils.ranking import key_after, rank_between
+
+# In schemas.todo.Todo field order, so an encoded record is byte-identical to Pydantic's output
+TODO_RECORD_COLUMNS = (
+    Todo.text, Todo.description, Todo.category, Todo.priority, Todo.stage, Todo.due_date,
+    Todo.id, Todo.completed, Todo.created_at, Todo.updated_at, Todo.user_id, Todo.rank,
+)
+
+class TodoService:
+    @staticmethod
+    def _with_relations(query: Query) -> Query:
+        # One extra SELECT ... IN per relationship for the whole page instead of one per row
+        return query.options(selectinload(Todo.subtasks), selectinload(Todo.tags))
+
+    @staticmethod
+    def _todo_records(db: Session, rows: Iterable[Any], chunk_size: int = 500) -> List[Dict[str, Any]]:
+        """Turn TODO_RECORD_COLUMNS rows into response dicts, loading subtasks and tags per chunk of ids.
+
+        Skips ORM identity-map bookkeeping and Pydantic revalidation, which dominate
+        CPU time when serializing large pages of todos.
+        """
+        records = {row.id: {**row._asdict(), "subtasks": [], "tags": []} for row in rows}
+        ids = list(records)
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            subtasks = db.execute(
+                select(SubTask.text, SubTask.completed, SubTask.id, SubTask.todo_id, SubTask.created_at)
+                .where(SubTask.todo_id.in_(chunk))
+                .order_by(SubTask.id)
+            )
+            for subtask in subtasks:
+                records[subtask.todo_id]["subtasks"].append(subtask._asdict())
+            tags = db.execute(
+                select(TodoTags.todo_id, Tag.name, Tag.id, Tag.created_at)
+                .join(Tag, Tag.id == TodoTags.tag_id)
+                .where(TodoTags.todo_id.in_(chunk))
+                .order_by(TodoTags.todo_id, TodoTags.tag_id)
+            )
+            for todo_id, name, tag_id, created_at in tags:
+                records[todo_id]["tags"].append({"name": name, "id": tag_id, "created_at": created_at})
+        # Column rows bypass the ORM load event that feeds the per-request row count
+        record_rows(sum(1 + len(record["subtasks"]) + len(record["tags"]) for record in records.values()))
+        return list(records.values())
+
+    @staticmethod
+    def _get_owned_todo(db: Session, todo_id: int, user_id: int) -> Optional[Todo]:
+        return db.query(Todo).filter(Todo.id == todo_id, Todo.user_id == user_id).first()
+
+    @staticmethod
+    def _stat_values(todo: Todo) -> Dict[str, Any]:
+        return {field: getattr(todo, field) for field in STAT_FIELDS}
+
+    @staticmethod
+    def _stage_value(stage: Any) -> str:
+        return StageEnum(stage or StageEnum.todo).value
+
+    @staticmethod
+    def _append_ranks(db: Session, user_id: int, stages: List[Any]) -> List[str]:
+        """Ranks placing todos entering these stages, in order, at the bottom of their columns"""
+        stages = [TodoService._stage_value(stage) for stage in stages]
+        tails = {
+            TodoService._stage_value(stage): rank
+            for stage, rank in db.execute(
+                select(Todo.stage, func.max(Todo.rank))
+                .where(Todo.user_id == user_id, Todo.stage.in_(set(stages)))
+                .group_by(Todo.stage)
+            )
+        }
+        ranks = []
+        for stage in stages:
+            tails[stage] = key_after(tails.get(stage))
+            ranks.append(tails[stage])
+        return ranks
+
+    @staticmethod
+    def _move_bounds(
+        db: Session, user_id: int, stage: str, todo_id: int, move: TodoMove
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """Ranks of the cards the todo lands between in the target column; None for an open end"""
+        column = (Todo.user_id == user_id, Todo.stage == stage, Todo.id != todo_id)
+        anchor_id = move.after_id if move.after_id is not None else move.before_id
+        if anchor_id is None:
+            return db.scalar(select(func.max(Todo.rank)).where(*column)), None
+        anchor = db.scalar(select(Todo.rank).where(*column, Todo.id == anchor_id))
+        if anchor is None:
+            raise ValueError(f"Todo {anchor_id} is not another todo in the {stage} column")
+        if move.after_id is not None:
+            upper = db.scalar(
+                select(Todo.rank)
+                .where(*column, or_(Todo.rank > anchor, and_(Todo.rank == anchor, Todo.id > anchor_id)))
+                .order_by(Todo.rank, Todo.id)
+                .limit(1)
+            )
+            return anchor, upper
+        lower = db.scalar(
+            select(Todo.rank)
+            .where(*column, or_(Todo.rank < anchor, and_(Todo.rank == anchor, Todo.id < anchor_id)))
+            .order_by(Todo.rank.desc(), Todo.id.desc())
+            .limit(1)
+        )
+        return lower, anchor
+
+    @staticmethod
+    def _apply_filters(query: Query, filters: Optional[TodoFilter]) -> Query:
+        if filters is None:
+            return query
+        if filters.stage is not None:
+            query = query.filter(Todo.stage == filters.stage)
+        if filters.priority is not None:
+            query = query.filter(Todo.priority == filters.priority)
+        if filters.category is not None:
+            query = query.filter(Todo.category == filters.category)
+        if filters.completed is not None:
+            query = query.filter(Todo.completed == filters.completed)
+        if filters.due_after is not None:
+            query = query.filter(Todo.due_date >= filters.due_after)
+        if filters.due_before is not None:
+            query = query.filter(Todo.due_date < filters.due_before)
+        return query
+
+    @staticmethod
+    def _apply_cursor(query: Query, cursor: str, sort: TodoSortEnum, order: SortOrderEnum) -> Query:
+        value, last_id = decode_cursor(cursor, sort.value, order.value)
+        column = getattr(Todo, sort.value)
+        ascending = order == SortOrderEnum.asc
+        if sort == TodoSortEnum.id:
+            return query.filter(Todo.id > last_id if ascending else Todo.id < last_id)
+        # NULLs sort first ascending and last descending, as on SQLite and MySQL
+        if ascending:
+            if value is None:
+                condition = or_(and_(column.is_(None), Todo.id > last_id), column.isnot(None))
+            else:
+                condition = or_(column > value, and_(column == value, Todo.id > last_id))
+        else:
+            if value is None:
+                condition = and_(column.is_(None), Todo.id < last_id)
+            else:
+                condition = or_(
+                    column < value,
+                    and_(column == value, Todo.id < last_id),
+                    column.is_(None),
+                )
+        return query.filter(condition)
+
+    @staticmethod
+    def get_todos(
+        db: Session,
+        user_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        filters: Optional[TodoFilter] = None,
+        sort: TodoSortEnum = TodoSortEnum.id,
+        order: SortOrderEnum = SortOrderEnum.asc,
+        cursor: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        query = db.query(*TODO_RECORD_COLUMNS).filter(Todo.user_id == user_id)
+        query = TodoService._apply_filters(query, filters)
+        if cursor:
+            query = TodoService._apply_cursor(query, cursor, sort, order)
+        columns = [Todo.id] if sort == TodoSortEnum.id else [getattr(Todo, sort.value), Todo.id]
+        if order == SortOrderEnum.asc:
+            query = query.order_by(*(column.asc() for column in columns))
+        else:
+            query = query.order_by(*(column.desc() for column in columns))
+        if not cursor and skip:
+            query = query.offset(skip)
+        return TodoService._todo_records(db, query.limit(limit))
+
+    @staticmethod
+    def get_todo(db: Session, todo_id: int, user_id: int) -> Optional[Todo]:
+        return (
+            TodoService._with_relations(db.query(Todo))
+            .filter(Todo.id == todo_id, Todo.user_id == user_id)
+            .first()
+        )
+
+    @staticmethod
+    def create_todo(db: Session, todo: TodoCreate, user_id: int) -> Todo:
+        rank = TodoService._append_ranks(db, user_id, [todo.stage])[0]
+        db_todo = Todo(**todo.model_dump(), user_id=user_id, rank=rank)
+        db.add(db_todo)
+        db.flush()
+        record_change(db, user_id, [db_todo.id])
+        record_stat_delta(db, user_id, None, todo.model_dump())
+        db.commit()
+        return TodoService.get_todo(db, db_todo.id, user_id)
+
+    @staticmethod
+    def stage_todo_update(db: Session, todo_id: int, todo_update: TodoUpdate, user_id: int) -> Optional[Todo]:
+        """Apply an update without committing; the updated todo, or None if the user has no such todo"""
+        db_todo = TodoService._get_owned_todo(db, todo_id, user_id)
+        if db_todo is None:
+            return None
+        before = TodoService._stat_values(db_todo)
+        update_data = todo_update.model_dump(exclude_unset=True)
+        if update_data.get("stage") is not None and update_data["stage"] != db_todo.stage:
+            update_data["rank"] = TodoService._append_ranks(db, user_id, [update_data["stage"]])[0]
+        for field, value in update_data.items():
+            setattr(db_todo, field, value)
+        db_todo.updated_at = datetime.utcnow()
+        record_change(db, user_id, [todo_id])
+        record_stat_delta(db, user_id, before, TodoService._stat_values(db_todo))
+        db.flush()
+        return TodoService.get_todo(db, todo_id, user_id)
+
+    @staticmethod
+    def stage_todo_move(db: Session, todo_id: int, move: TodoMove, user_id: int) -> Optional[Todo]:
+        """Drop a todo between two cards of a stage column without committing; only its own row is
+        written. The moved todo, or None if the user has no such todo; ValueError for a bad neighbour"""
+        db_todo = TodoService._get_owned_todo(db, todo_id, user_id)
+        if db_todo is None:
+            return None
+        if move.after_id is not None and move.before_id is not None:
+            raise ValueError("Give after_id or before_id, not both")
+        target = move.stage or db_todo.stage
+        stage = TodoService._stage_value(target)
+        try:
+            rank = rank_between(*TodoService._move_bounds(db, user_id, stage, todo_id, move))
+        except ValueError:
+            # No room between tied neighbours (concurrent moves, never-ranked rows) or keys at full
+            # length: respread the column in this transaction, which keeps its order, and try again
+            RankRebalancer.respread(db, user_id, stage)
+            rank = rank_between(*TodoService._move_bounds(db, user_id, stage, todo_id, move))
+        before = TodoService._stat_values(db_todo)
+        db_todo.stage = target
+        db_todo.rank = rank
+        db_todo.updated_at = datetime.utcnow()
+        record_change(db, user_id, [todo_id])
+        record_stat_delta(db, user_id, before, TodoService._stat_values(db_todo))
+        db.flush()
+        return TodoService.get_todo(db, todo_id, user_id)
+
+    @staticmethod
+    def move_todo(db: Session, todo_id: int, move: TodoMove, user_id: int) -> Optional[Todo]:
+        db_todo = TodoService.stage_todo_move(db, todo_id, move, user_id)
+        if db_todo:
+            db.commit()
+        return db_todo
+
+    @staticmethod
+    def update_todo(db: Session, todo_id: int, todo_update: TodoUpdate, user_id: int) -> Optional[Todo]:
+        db_todo = TodoService.stage_todo_update(db, todo_id, todo_update, user_id)
+        if db_todo:
+            db.commit()
+        return db_todo
+
+    @staticmethod
+    def delete_todo(db: Session, todo_id: int, user_id: int) -> bool:
+        db_todo = TodoService._get_owned_todo(db, todo_id, user_id)
+        if db_todo:
+            record_stat_delta(db, user_id, TodoService._stat_values(db_todo), None)
+            db.delete(db_todo)
+            record_change(db, user_id, [todo_id], deleted=True)
+            db.commit()
+            return True
+        return False
+
+    @staticmethod
+    def _owned_ids(db: Session, todo_ids: List[int], user_id: int) -> Set[int]:
+        return set(db.scalars(select(Todo.id).where(Todo.user_id == user_id, Todo.id.in_(set(todo_ids)))))
+
+    @staticmethod
+    def _owned_stat_values(db: Session, todo_ids: List[int], user_id: int) -> Dict[int, Dict[str, Any]]:
+        """Counted field values of the given todos owned by user_id, keyed by id"""
+        rows = db.execute(
+            select(Todo.id, *(getattr(Todo, field) for field in STAT_FIELDS))
+            .where(Todo.user_id == user_id, Todo.id.in_(set(todo_ids)))
+        )
+        return {row[0]: dict(zip(STAT_FIELDS, row[1:])) for row in rows}
+
+    @staticmethod
+    def create_todos(db: Session, todos: List[TodoCreate], user_id: int) -> List[int]:
+        ranks = TodoService._append_ranks(db, user_id, [todo.stage for todo in todos])
+        rows = [{**todo.model_dump(), "user_id": user_id, "rank": rank} for todo, rank in zip(todos, ranks)]
+        # Multi-row INSERT ... RETURNING in one transaction; ids come back in input order
+        ids = list(db.scalars(insert(Todo).returning(Todo.id, sort_by_parameter_order=True), rows))
+        record_change(db, user_id, ids)
+        for row in rows:
+            record_stat_delta(db, user_id, None, row)
+        db.commit()
+        return ids
+
+    @staticmethod
+    def update_todos(db: Session, items: List[TodoBatchUpdateItem], user_id: int) -> List[bool]:
+        owned = TodoService._owned_stat_values(db, [item.id for item in items], user_id)
+        now = datetime.utcnow()
+        rows = [
+            {**item.model_dump(exclude_unset=True), "id": item.id, "updated_at": now}
+            for item in items
+            if item.id in owned
+        ]
+        # Todos changing stage go to the bottom of their new column
+        moved = [row for row in rows if row.get("stage") is not None and row["stage"] != owned[row["id"]]["stage"]]
+        for row, rank in zip(moved, TodoService._append_ranks(db, user_id, [row["stage"] for row in moved])):
+            row["rank"] = rank
+        if rows:
+            # ORM bulk UPDATE by primary key, executed as executemany per distinct column set
+            db.execute(update(Todo), rows)
+            record_change(db, user_id, [row["id"] for row in rows])
+            for row in rows:
+                before = owned[row["id"]]
+                after = {**before, **{field: row[field] for field in STAT_FIELDS if field in row}}
+                # The same id may appear twice in a batch; chain its deltas
+                owned[row["id"]] = after
+                record_stat_delta(db, user_id, before, after)
+        db.commit()
+        return [item.id in owned for item in items]
+
+    @staticmethod
+    def delete_todos(db: Session, todo_ids: List[int], user_id: int) -> Set[int]:
+        owned = TodoService._owned_stat_values(db, todo_ids, user_id)
+        if owned:
+            # Bulk deletes skip ORM cascades, so children go first explicitly
+            db.execute(delete(SubTask).where(SubTask.todo_id.in_(owned)))
+            db.execute(delete(TodoTags).where(TodoTags.todo_id.in_(owned)))
+            db.execute(delete(Todo).where(Todo.id.in_(owned)))
+            record_change(db, user_id, owned, deleted=True)
+            for values in owned.values():
+                record_stat_delta(db, user_id, values, None)
+        db.commit()
+        return set(owned)
+
+    @staticmethod
+    def _upsert_tags(db: Session, names: Iterable[str]) -> Dict[str, int]:
+        # Sorted so concurrent upserts take row locks in the same order
+        rows = [{"name": name} for name in sorted(set(names))]
+        if not rows:
+            return {}
+        if supports_upsert_returning(db):
+            # One statement both creates missing tags and returns ids of existing ones
+            return dict(db.execute(upsert_returning(db, Tag, Tag.name, Tag.name, Tag.id).values(rows)).all())
+        db.execute(insert_ignore(db, Tag), rows)
+        return dict(db.execute(select(Tag.name, Tag.id).where(Tag.name.in_([row["name"] for row in rows]))).all())
+
+    @staticmethod
+    def import_todos(db: Session, todos: List[TodoImport], user_id: int) -> int:
+        ranks = TodoService._append_ranks(db, user_id, [todo.stage for todo in todos])
+        rows = [
+            {**todo.model_dump(exclude={"subtasks", "tags"}), "user_id": user_id, "rank": rank}
+            for todo, rank in zip(todos, ranks)
+        ]
+        ids = list(db.scalars(insert(Todo).returning(Todo.id, sort_by_parameter_order=True), rows))
+        subtask_rows = [
+            {**subtask.model_dump(), "todo_id": todo_id}
+            for todo_id, todo in zip(ids, todos)
+            for subtask in todo.subtasks
+        ]
+        if subtask_rows:
+            db.execute(insert(SubTask), subtask_rows)
+        tag_ids = TodoService._upsert_tags(db, (name for todo in todos for name in todo.tags))
+        link_rows = [
+            {"todo_id": todo_id, "tag_id": tag_ids[name], "user_id": user_id}
+            for todo_id, todo in zip(ids, todos)
+            for name in set(todo.tags)
+        ]
+        if link_rows:
+            db.execute(insert(TodoTags), link_rows)
+        record_change(db, user_id, ids)
+        for row in rows:
+            record_stat_delta(db, user_id, None, row)
+        db.commit()
+        return len(ids)
+
+    @staticmethod
+    def stage_subtask_create(db: Session, todo_id: int, subtask: SubTaskCreate, user_id: int) -> Optional[SubTask]:
+        """Add a subtask without committing; None if the user has no such todo"""
+        db_todo = TodoService._get_owned_todo(db, todo_id, user_id)
+        if db_todo is None:
+            return None
+        db_subtask = SubTask(**subtask.model_dump(), todo_id=todo_id)
+        db.add(db_subtask)
+        record_change(db, user_id, [todo_id])
+        db.flush()
+        return db_subtask
+
+    @staticmethod
+    def create_subtask(db: Session, todo_id: int, subtask: SubTaskCreate, user_id: int) -> Optional[SubTask]:
+        db_subtask = TodoService.stage_subtask_create(db, todo_id, subtask, user_id)
+        if db_subtask:
+            db.commit()
+            db.refresh(db_subtask)
+        return db_subtask
+
+    @staticmethod
+    def _get_owned_subtask(db: Session, todo_id: int, subtask_id: int, user_id: int) -> Optional[SubTask]:
+        return (
+            db.query(SubTask)
+            .join(Todo, Todo.id == SubTask.todo_id)
+            .filter(SubTask.id == subtask_id, SubTask.todo_id == todo_id, Todo.user_id == user_id)
+            .first()
+        )
+
+    @staticmethod
+    def stage_subtask_update(
+        db: Session, todo_id: int, subtask_id: int, subtask_update: SubTaskUpdate, user_id: int
+    ) -> Optional[SubTask]:
+        """Update a subtask without committing; None if the user's todo has no such subtask"""
+        db_subtask = TodoService._get_owned_subtask(db, todo_id, subtask_id, user_id)
+        if db_subtask is None:
+            return None
+        for field, value in subtask_update.model_dump(exclude_unset=True).items():
+            setattr(db_subtask, field, value)
+        record_change(db, user_id, [todo_id])
+        db.flush()
+        return db_subtask
+
+    @staticmethod
+    def stage_subtask_toggle(db: Session, todo_id: int, subtask_id: int, user_id: int) -> Optional[SubTask]:
+        """Flip a subtask's completed flag without committing; None if the user's todo has no such subtask"""
+        db_subtask = TodoService._get_owned_subtask(db, todo_id, subtask_id, user_id)
+        if db_subtask is None:
+            return None
+        db_subtask.completed = not db_subtask.completed
+        record_change(db, user_id, [todo_id])
+        db.flush()
+        return db_subtask
+
+    @staticmethod
+    def update_subtask(
+        db: Session, todo_id: int, subtask_id: int, subtask_update: SubTaskUpdate, user_id: int
+    ) -> Optional[SubTask]:
+        db_subtask = TodoService.stage_subtask_update(db, todo_id, subtask_id, subtask_update, user_id)
+        if db_subtask:
+            db.commit()
+        return db_subtask
+
+    @staticmethod
+    def toggle_subtask(db: Session, todo_id: int, subtask_id: int, user_id: int) -> Optional[SubTask]:
+        db_subtask = TodoService.stage_subtask_toggle(db, todo_id, subtask_id, user_id)
+        if db_subtask:
+            db.commit()
+        return db_subtask
+
+    @staticmethod
+    def update_tags(
+        db: Session, todo_id: int, add: List[str], remove: List[int], user_id: int
+    ) -> Optional[Dict[str, int]]:
+        """Detach tag ids and attach tag names (creating them as needed) in one transaction"""
+        if not TodoService._owned_ids(db, [todo_id], user_id):
+            return None
+        if remove:
+            db.execute(delete(TodoTags).where(TodoTags.todo_id == todo_id, TodoTags.tag_id.in_(remove)))
+        tag_ids = TodoService._upsert_tags(db, add)
+        if tag_ids:
+            db.execute(
+                insert_ignore(db, TodoTags),
+                [{"todo_id": todo_id, "tag_id": tag_id, "user_id": user_id} for tag_id in tag_ids.values()],
+            )
+        record_change(db, user_id, [todo_id])
+        db.commit()
+        return tag_ids
+
+    @staticmethod
+    def add_tag_to_todo(db: Session, todo_id: int, tag: TagCreate, user_id: int) -> Optional[int]:
+        tag_ids = TodoService.update_tags(db, todo_id, [tag.name], [], user_id)
+        return None if tag_ids is None else tag_ids[tag.name]
+
+    @staticmethod
+    def remove_tag_from_todo(db: Session, todo_id: int, tag_id: int, user_id: int) -> bool:
+        return TodoService.update_tags(db, todo_id, [], [tag_id], user_id) is not None
+
+    @staticmethod
+    def get_todos_by_tag(db: Session, tag_name: str, user_id: int) -> List[Dict[str, Any]]:
+        # tags.name (unique) -> todo_tags(tag_id, user_id) -> todos by primary key
+        rows = (
+            db.query(*TODO_RECORD_COLUMNS)
+            .join(TodoTags, TodoTags.todo_id == Todo.id)
+            .join(Tag, Tag.id == TodoTags.tag_id)
+            .filter(Tag.name == tag_name, TodoTags.user_id == user_id)
+            .order_by(TodoTags.todo_id)
+        )
+        return TodoService._todo_records(db, rows)
+
+    @staticmethod
+    def get_board(db: Session, user_id: int) -> Dict[str, Any]:
+        """Every todo as compact per-stage column arrays for a kanban board.
+
+        Subtask progress and tag ids are aggregated per todo in the same query,
+        so no subtask, tag or ORM row is materialized; tags are dictionary-encoded
+        as indexes into one list of names.
+        """
+        subtask_counts = (
+            select(
+                SubTask.todo_id,
+                func.count().label("total"),
+                func.sum(case((SubTask.completed, 1), else_=0)).label("done"),
+            )
+            .join(Todo, Todo.id == SubTask.todo_id)
+            .where(Todo.user_id == user_id)
+            .group_by(SubTask.todo_id)
+            .subquery()
+        )
+        tag_ids = (
+            select(TodoTags.todo_id, func.aggregate_strings(cast(TodoTags.tag_id, String), ",").label("tag_ids"))
+            .where(TodoTags.user_id == user_id)
+            .group_by(TodoTags.todo_id)
+            .subquery()
+        )
+        rows = db.execute(
+            select(
+                Todo.id, Todo.stage, Todo.text, Todo.priority, Todo.due_date,
+                subtask_counts.c.total, subtask_counts.c.done, tag_ids.c.tag_ids,
+            )
+            .outerjoin(subtask_counts, subtask_counts.c.todo_id == Todo.id)
+            .outerjoin(tag_ids, tag_ids.c.todo_id == Todo.id)
+            .where(Todo.user_id == user_id)
+            .order_by(Todo.stage, Todo.rank, Todo.id)
+        ).all()
+        columns = {
+            stage.value: {
+                "ids": [], "texts": [], "priorities": [], "due_dates": [],
+                "tags": [], "subtasks_done": [], "subtasks_total": [],
+            }
+            for stage in StageEnum
+        }
+        tag_index: Dict[int, int] = {}
+        for row in rows:
+            column = columns[(row.stage or StageEnum.todo).value]
+            column["ids"].append(row.id)
+            column["texts"].append(row.text)
+            column["priorities"].append(row.priority)
+            column["due_dates"].append(row.due_date)
+            column["subtasks_done"].append(row.done or 0)
+            column["subtasks_total"].append(row.total or 0)
+            column["tags"].append(sorted(
+                tag_index.setdefault(int(tag_id), len(tag_index)) for tag_id in row.tag_ids.split(",")
+            ) if row.tag_ids else [])
+        names = dict(db.execute(select(Tag.id, Tag.name).where(Tag.id.in_(tag_index))).all()) if tag_index else {}
+        record_rows(len(rows))
+        return {"columns": columns, "tags": [names.get(tag_id, "") for tag_id in tag_index]}
+
+    @staticmethod
+    def search_todos(
+        db: Session, user_id: int, query: str, limit: int = 20, offset: int = 0, prefix: bool = True
+    ) -> List[Todo]:
+        ids = search_index.search(db, user_id, query, prefix, limit, offset)
+        if not ids:
+            return []
+        todos = {
+            todo.id: todo
+            for todo in TodoService._with_relations(db.query(Todo)).filter(Todo.id.in_(ids), Todo.user_id == user_id)
+        }
+        return [todos[todo_id] for todo_id in ids if todo_id in todos]
+
+    @staticmethod
+    def get_changes(
+        db: Session, user_id: int, since: int = 0, limit: int = 500, cursor: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Todos changed and ids deleted after version since (0: everything), or None if since is too old.
+
+        Pages are keyed by (version, id) up to the user's version when the first
+        page was read, so changes made while paging land in the next sync.
+        """
+        if cursor:
+            payload = decode_token(cursor)
+            try:
+                until, after_version, after_id = int(payload["u"]), int(payload["v"]), int(payload["i"])
+            except (KeyError, TypeError, ValueError):
+                raise ValueError("Malformed cursor")
+            if payload.get("s") != since:
+                raise ValueError("Cursor does not match since")
+        else:
+            until, purged = db.execute(
+                select(User.todo_version, User.todo_purged_version).where(User.id == user_id)
+            ).one()
+            # Deletes after since may have been purged; the client has to start over
+            if since and since < purged:
+                return None
+        query = TodoService._with_relations(db.query(Todo)).filter(Todo.user_id == user_id, Todo.version <= until)
+        if since:
+            query = query.filter(Todo.version > since)
+        if cursor:
+            query = query.filter(
+                or_(Todo.version > after_version, and_(Todo.version == after_version, Todo.id > after_id))
+            )
+        todos = query.order_by(Todo.version, Todo.id).limit(limit).all()
+        deleted: List[int] = []
+        if since and not cursor:
+            # A reused id that is live again at a later version is reported as a todo, not a delete
+            recreated = exists().where(Todo.id == TodoTombstone.todo_id, Todo.version > TodoTombstone.version)
+            deleted = sorted(set(db.scalars(
+                select(TodoTombstone.todo_id).where(
+                    TodoTombstone.user_id == user_id,
+                    TodoTombstone.version > since,
+                    TodoTombstone.version <= until,
+                    ~recreated,
+                )
+            )))
+        next_cursor = None
+        if len(todos) == limit:
+            last = todos[-1]
+            next_cursor = encode_token({"s": since, "u": until, "v": last.version, "i": last.id})
+        return {"version": until, "todos": todos, "deleted": deleted, "next_cursor": next_cursor}
+
+class AsyncTodoService:
+    """TodoService over an AsyncSession; queries run in the session's greenlet on the async driver"""
+
+    @staticmethod
+    async def get_todos(
+        db: AsyncSession,
+        user_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        filters: Optional[TodoFilter] = None,
+        sort: TodoSortEnum = TodoSortEnum.id,
+        order: SortOrderEnum = SortOrderEnum.asc,
+        cursor: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        return await db.run_sync(TodoService.get_todos, user_id, skip, limit, filters, sort, order, cursor)
+
+    @staticmethod
+    async def get_todo(db: AsyncSession, todo_id: int, user_id: int) -> Optional[Todo]:
+        return await db.run_sync(TodoService.get_todo, todo_id, user_id)
+
+    @staticmethod
+    async def create_todo(db: AsyncSession, todo: TodoCreate, user_id: int) -> Todo:
+        return await db.run_sync(TodoService.create_todo, todo, user_id)
+
+    @staticmethod
+    async def update_todo(db: AsyncSession, todo_id: int, todo_update: TodoUpdate, user_id: int) -> Optional[Todo]:
+        if write_coalescer.enabled:
+            return await write_coalescer.submit(TodoService.stage_todo_update, todo_id, todo_update, user_id)
+        return await db.run_sync(TodoService.update_todo, todo_id, todo_update, user_id)
+
+    @staticmethod
+    async def move_todo(db: AsyncSession, todo_id: int, move: TodoMove, user_id: int) -> Optional[Todo]:
+        if write_coalescer.enabled:
+            db_todo = await write_coalescer.submit(TodoService.stage_todo_move, todo_id, move, user_id)
+        else:
+            db_todo = await db.run_sync(TodoService.move_todo, todo_id, move, user_id)
+        if db_todo is not None and rank_rebalancer.needed(db_todo.rank):
+            rank_rebalancer.schedule(user_id, TodoService._stage_value(db_todo.stage))
+        return db_todo
+
+    @staticmethod
+    async def delete_todo(db: AsyncSession, todo_id: int, user_id: int) -> bool:
+        return await db.run_sync(TodoService.delete_todo, todo_id, user_id)
+
+    @staticmethod
+    async def create_todos(db: AsyncSession, todos: List[TodoCreate], user_id: int) -> List[int]:
+        return await db.run_sync(TodoService.create_todos, todos, user_id)
+
+    @staticmethod
+    async def update_todos(db: AsyncSession, items: List[TodoBatchUpdateItem], user_id: int) -> List[bool]:
+        return await db.run_sync(TodoService.update_todos, items, user_id)
+
+    @staticmethod
+    async def delete_todos(db: AsyncSession, todo_ids: List[int], user_id: int) -> Set[int]:
+        return await db.run_sync(TodoService.delete_todos, todo_ids, user_id)
+
+    @staticmethod
+    async def import_todos(db: AsyncSession, todos: List[TodoImport], user_id: int) -> int:
+        return await db.run_sync(TodoService.import_todos, todos, user_id)
+
+    @staticmethod
+    async def iter_todo_records(user_id: int, chunk_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield a user's todos as plain dicts with subtasks and tags inline, chunk_size rows at a time.
+
+        Todos stream from a server-side cursor on one session while each chunk's
+        subtasks and tags are fetched on a second, so memory stays bounded by
+        chunk_size regardless of account size.
+        """
+        todo_columns = select(
+            Todo.id, Todo.text, Todo.description, Todo.completed, Todo.stage, Todo.category,
+            Todo.priority, Todo.due_date, Todo.created_at, Todo.updated_at,
+        )
+        async with AsyncSessionLocal() as cursor_db, AsyncSessionLocal() as db:
+            result = await cursor_db.stream(
+                todo_columns
+                .where(Todo.user_id == user_id)
+                .order_by(Todo.id)
+                .execution_options(yield_per=chunk_size)
+            )
+            async for rows in result.partitions():
+                records = {row.id: {**row._asdict(), "subtasks": [], "tags": []} for row in rows}
+                subtasks = await db.execute(
+                    select(SubTask.todo_id, SubTask.id, SubTask.text, SubTask.completed, SubTask.created_at)
+                    .where(SubTask.todo_id.in_(records))
+                    .order_by(SubTask.id)
+                )
+                for subtask in subtasks:
+                    record = subtask._asdict()
+                    records[record.pop("todo_id")]["subtasks"].append(record)
+                tags = await db.execute(
+                    select(TodoTags.todo_id, Tag.name)
+                    .join(Tag, Tag.id == TodoTags.tag_id)
+                    .where(TodoTags.todo_id.in_(records))
+                    .order_by(Tag.name)
+                )
+                for todo_id, name in tags:
+                    records[todo_id]["tags"].append(name)
+                yield list(records.values())
+
+    @staticmethod
+    async def create_subtask(db: AsyncSession, todo_id: int, subtask: SubTaskCreate, user_id: int) -> Optional[SubTask]:
+        if write_coalescer.enabled:
+            return await write_coalescer.submit(TodoService.stage_subtask_create, todo_id, subtask, user_id)
+        return await db.run_sync(TodoService.create_subtask, todo_id, subtask, user_id)
+
+    @staticmethod
+    async def update_subtask(
+        db: AsyncSession, todo_id: int, subtask_id: int, subtask_update: SubTaskUpdate, user_id: int
+    ) -> Optional[SubTask]:
+        if write_coalescer.enabled:
+            return await write_coalescer.submit(
+                TodoService.stage_subtask_update, todo_id, subtask_id, subtask_update, user_id
+            )
+        return await db.run_sync(TodoService.update_subtask, todo_id, subtask_id, subtask_update, user_id)
+
+    @staticmethod
+    async def toggle_subtask(db: AsyncSession, todo_id: int, subtask_id: int, user_id: int) -> Optional[SubTask]:
+        if write_coalescer.enabled:
+            return await write_coalescer.submit(TodoService.stage_subtask_toggle, todo_id, subtask_id, user_id)
+        return await db.run_sync(TodoService.toggle_subtask, todo_id, subtask_id, user_id)
+
+    @staticmethod
+    async def update_tags(
+        db: AsyncSession, todo_id: int, add: List[str], remove: List[int], user_id: int
+    ) -> Optional[Dict[str, int]]:
+        return await db.run_sync(TodoService.update_tags, todo_id, add, remove, user_id)
+
+    @staticmethod
+    async def add_tag_to_todo(db: AsyncSession, todo_id: int, tag: TagCreate, user_id: int) -> Optional[int]:
+        return await db.run_sync(TodoService.add_tag_to_todo, todo_id, tag, user_id)
+
+    @staticmethod
+    async def remove_tag_from_todo(db: AsyncSession, todo_id: int, tag_id: int, user_id: int) -> bool:
+        return await db.run_sync(TodoService.remove_tag_from_todo, todo_id, tag_id, user_id)
+
+    @staticmethod
+    async def get_todos_by_tag(db: AsyncSession, tag_name: str, user_id: int) -> List[Dict[str, Any]]:
+        return await db.run_sync(TodoService.get_todos_by_tag, tag_name, user_id)
+
+    @staticmethod
+    async def get_board(db: AsyncSession, user_id: int) -> Dict[str, Any]:
+        return await db.run_sync(TodoService.get_board, user_id)
+
+    @staticmethod
+    async def get_changes(
+        db: AsyncSession, user_id: int, since: int = 0, limit: int = 500, cursor: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        return await db.run_sync(TodoService.get_changes, user_id, since, limit, cursor)
+
+    @staticmethod
+    async def search_todos(
+        db: AsyncSession, user_id: int, query: str, limit: int = 20, offset: int = 0, prefix: bool = True
+    ) -> List[Todo]:
+        return await db.run_sync(TodoService.search_todos, user_id, query, limit, offset, prefix)
@@ -1,81 +1,226 @@
-from sqlalchemy.orm import Session
-from typing import Optional
-from datetime import datetime, timedelta
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-from ..models.user import User
-from ..schemas.user import UserCreate, UserUpdate, TokenData
-from ..utils.config import settings
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-class UserService:
-    @staticmethod
-    def get_user_by_email(db: Session, email: str) -> Optional[User]:
-        return db.query(User).filter(User.email == email).first()
-
-    @staticmethod
-    def get_user_by_username(db: Session, username: str) -> Optional[User]:
-        return db.query(User).filter(User.username == username).first()
-
-    @staticmethod
-    def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
-        return db.query(User).filter(User.id == user_id).first()
-
-    @staticmethod
-    def create_user(db: Session, user: UserCreate) -> User:
-        hashed_password = pwd_context.hash(user.password)
-        db_user = User(
-            email=user.email,
-            username=user.username,
-            hashed_password=hashed_password
-        )
-        db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
-        return db_user
-
-    @staticmethod
-    def update_user(db: Session, user_id: int, user_update: UserUpdate) -> Optional[User]:
-        db_user = UserService.get_user_by_id(db, user_id)
-        if db_user:
-            update_data = user_update.model_dump(exclude_unset=True)
-            if "password" in update_data:
-                update_data["hashed_password"] = pwd_context.hash(update_data.pop("password"))
-            for field, value in update_data.items():
-                setattr(db_user, field, value)
-            db_user.updated_at = datetime.utcnow()
-            db.commit()
-            db.refresh(db_user)
-        return db_user
-
-    @staticmethod
-    def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
-        user = UserService.get_user_by_username(db, username)
-        if not user:
-            return None
-        if not pwd_context.verify(password, user.hashed_password):
-            return None
-        return user
-
-    @staticmethod
-    def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
-        to_encode = data.copy()
-        if expires_delta:
-            expire = datetime.utcnow() + expires_delta
-        else:
-            expire = datetime.utcnow() + timedelta(minutes=15)
-        to_encode.update({"exp": expire})
-        encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-        return encoded_jwt
-
-    @staticmethod
-    def verify_token(token: str) -> Optional[TokenData]:
-        try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-            username: str = payload.get("sub")
-            if username is None:
-                return None
-            return TokenData(username=username)
-        except JWTError:
-            return None 
\ No newline at end of file
+import hashlib
+import time
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Optional, Tuple
+from datetime import datetime, timedelta
+from jose import JWTError, jwt
+from ..models.user import User
+from ..schemas.user import UserCreate, UserUpdate, TokenData
+from ..utils.cache import LRUCache
+from ..utils.config import settings
+from ..utils.hashing import (
+    hash_password, verify_password, hash_password_async, verify_password_async,
+)
+from .channel import invalidation_channel
+
+# Authenticated users keyed by token subject (username), see utils.auth.get_current_user
+principal_cache = LRUCache(settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL_SECONDS)
+
+# Access tokens whose signature already checked out, each kept until its own exp
+token_cache = LRUCache(settings.TOKEN_CACHE_SIZE)
+
+def _password_fingerprint(hashed_password: str) -> str:
+    # What refresh tokens issued before users.password_version carry in their "pwd" claim
+    return hashlib.sha256(hashed_password.encode()).hexdigest()[:16]
+
+def _invalidate_principals(user_id: int, version: Optional[int], payload: Dict[str, Any]) -> None:
+    for username in payload["usernames"]:
+        principal_cache.invalidate(username)
+
+invalidation_channel.on(invalidation_channel.PRINCIPAL, _invalidate_principals)
+
+class UserService:
+    @staticmethod
+    def get_user_by_email(db: Session, email: str) -> Optional[User]:
+        return db.query(User).filter(User.email == email).first()
+
+    @staticmethod
+    def get_user_by_username(db: Session, username: str) -> Optional[User]:
+        return db.query(User).filter(User.username == username).first()
+
+    @staticmethod
+    def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
+        return db.query(User).filter(User.id == user_id).first()
+
+    @staticmethod
+    def _insert_user(db: Session, user: UserCreate, hashed_password: str) -> User:
+        db_user = User(
+            email=user.email,
+            username=user.username,
+            hashed_password=hashed_password
+        )
+        db.add(db_user)
+        db.commit()
+        db.refresh(db_user)
+        return db_user
+
+    @staticmethod
+    def _apply_user_update(db: Session, user_id: int, update_data: Dict[str, Any]) -> Optional[User]:
+        db_user = UserService.get_user_by_id(db, user_id)
+        if db_user:
+            previous_username = db_user.username
+            for field, value in update_data.items():
+                setattr(db_user, field, value)
+            if "hashed_password" in update_data:
+                # Revokes refresh tokens issued under the old password
+                db_user.password_version = User.password_version + 1
+            db_user.updated_at = datetime.utcnow()
+            usernames = sorted({previous_username, db_user.username})
+            invalidation_channel.append(db, invalidation_channel.PRINCIPAL, user_id, {"usernames": usernames})
+            db.commit()
+            db.refresh(db_user)
+            _invalidate_principals(user_id, None, {"usernames": usernames})
+        return db_user
+
+    @staticmethod
+    def _store_password_hash(db: Session, user: User, hashed_password: str) -> None:
+        user.hashed_password = hashed_password
+        db.commit()
+        db.refresh(user)
+
+    @staticmethod
+    def create_user(db: Session, user: UserCreate) -> User:
+        return UserService._insert_user(db, user, hash_password(user.password))
+
+    @staticmethod
+    def update_user(db: Session, user_id: int, user_update: UserUpdate) -> Optional[User]:
+        update_data = user_update.model_dump(exclude_unset=True)
+        if "password" in update_data:
+            update_data["hashed_password"] = hash_password(update_data.pop("password"))
+        return UserService._apply_user_update(db, user_id, update_data)
+
+    @staticmethod
+    def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
+        user = UserService.get_user_by_username(db, username)
+        if not user:
+            return None
+        verified, new_hash = verify_password(password, user.hashed_password)
+        if not verified:
+            return None
+        if new_hash:
+            # Cost factor changed since this hash was made; upgrade it transparently
+            UserService._store_password_hash(db, user, new_hash)
+        return user
+
+    @staticmethod
+    def _signing_key() -> Tuple[Optional[str], str]:
+        kid = settings.JWT_ACTIVE_KID
+        if kid is None:
+            return None, settings.SECRET_KEY
+        if kid not in settings.JWT_SIGNING_KEYS:
+            raise RuntimeError(f"JWT_ACTIVE_KID {kid!r} is not in JWT_SIGNING_KEYS")
+        return kid, settings.JWT_SIGNING_KEYS[kid]
+
+    @staticmethod
+    def _encode(claims: Dict[str, Any], expires_delta: timedelta) -> str:
+        kid, key = UserService._signing_key()
+        to_encode = {**claims, "exp": datetime.utcnow() + expires_delta}
+        headers = {"kid": kid} if kid is not None else None
+        return jwt.encode(to_encode, key, algorithm=settings.ALGORITHM, headers=headers)
+
+    @staticmethod
+    def _decode(token: str, token_type: str) -> Optional[Dict[str, Any]]:
+        """Verify signature, expiry and token type, picking the key named by the kid header"""
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+            key = settings.SECRET_KEY if kid is None else settings.JWT_SIGNING_KEYS.get(kid)
+            if key is None:
+                return None
+            payload = jwt.decode(token, key, algorithms=[settings.ALGORITHM])
+        except JWTError:
+            return None
+        # Tokens issued before refresh tokens existed carry no typ and are access tokens
+        if payload.get("typ", "access") != token_type or payload.get("sub") is None:
+            return None
+        return payload
+
+    @staticmethod
+    def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+        return UserService._encode(data, expires_delta or timedelta(minutes=15))
+
+    @staticmethod
+    def create_refresh_token(user: User) -> str:
+        claims = {"sub": user.username, "typ": "refresh", "pwv": user.password_version}
+        return UserService._encode(claims, timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS))
+
+    @staticmethod
+    def issue_tokens(user: User) -> Dict[str, Any]:
+        expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        return {
+            "access_token": UserService.create_access_token({"sub": user.username}, expires),
+            "refresh_token": UserService.create_refresh_token(user),
+            "token_type": "bearer",
+            "expires_in": int(expires.total_seconds()),
+        }
+
+    @staticmethod
+    def verify_token(token: str) -> Optional[TokenData]:
+        token_data = token_cache.get(token)
+        if token_data is not None:
+            return token_data
+        payload = UserService._decode(token, "access")
+        if payload is None:
+            return None
+        token_data = TokenData(username=payload["sub"])
+        if "exp" in payload:
+            token_cache.set(token, token_data, ttl=payload["exp"] - time.time())
+        return token_data
+
+    @staticmethod
+    def authenticate_refresh_token(db: Session, token: str) -> Optional[User]:
+        """Return the user a refresh token was issued to, unless their password changed since"""
+        payload = UserService._decode(token, "refresh")
+        if payload is None:
+            return None
+        user = UserService.get_user_by_username(db, payload["sub"])
+        if user is None:
+            return None
+        if "pwv" in payload:
+            current = payload["pwv"] == user.password_version
+        else:
+            current = payload.get("pwd") == _password_fingerprint(user.hashed_password)
+        return user if current else None
+
+class AsyncUserService:
+    """UserService over an AsyncSession; hashing is awaited on the process pool, never run in the event loop"""
+
+    @staticmethod
+    async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
+        return await db.run_sync(UserService.get_user_by_email, email)
+
+    @staticmethod
+    async def get_user_by_username(db: AsyncSession, username: str) -> Optional[User]:
+        return await db.run_sync(UserService.get_user_by_username, username)
+
+    @staticmethod
+    async def get_user_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
+        return await db.run_sync(UserService.get_user_by_id, user_id)
+
+    @staticmethod
+    async def create_user(db: AsyncSession, user: UserCreate) -> User:
+        hashed_password = await hash_password_async(user.password)
+        return await db.run_sync(UserService._insert_user, user, hashed_password)
+
+    @staticmethod
+    async def update_user(db: AsyncSession, user_id: int, user_update: UserUpdate) -> Optional[User]:
+        update_data = user_update.model_dump(exclude_unset=True)
+        if "password" in update_data:
+            update_data["hashed_password"] = await hash_password_async(update_data.pop("password"))
+        return await db.run_sync(UserService._apply_user_update, user_id, update_data)
+
+    @staticmethod
+    async def authenticate_user(db: AsyncSession, username: str, password: str) -> Optional[User]:
+        user = await AsyncUserService.get_user_by_username(db, username)
+        if not user:
+            return None
+        verified, new_hash = await verify_password_async(password, user.hashed_password)
+        if not verified:
+            return None
+        if new_hash:
+            await db.run_sync(UserService._store_password_hash, user, new_hash)
+        return user
+
+    @staticmethod
+    async def authenticate_refresh_token(db: AsyncSession, token: str) -> Optional[User]:
+        return await db.run_sync(UserService.authenticate_refresh_token, token)
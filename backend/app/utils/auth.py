@@ -1,27 +1,54 @@
-from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from ..database.base import get_db
-from ..services.user_service import UserService
-
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
-
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    
-    token_data = UserService.verify_token(token)
-    if token_data is None:
-        raise credentials_exception
-    
-    user = UserService.get_user_by_username(db, token_data.username)
-    if user is None:
-        raise credentials_exception
-    
-    return user 
\ No newline at end of file
+from fastapi import Depends, HTTPException, Query, status
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from ..database.base import AsyncSessionLocal, get_async_db
+from ..services.user_service import UserService, AsyncUserService, principal_cache
+from ..schemas.user import User
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login", auto_error=False)
+
+def credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+async def resolve_user(token: str, db: Optional[AsyncSession] = None) -> User:
+    """Validate a bearer token and return its user; without db, a cache miss uses a short-lived session"""
+    token_data = UserService.verify_token(token)
+    if token_data is None:
+        raise credentials_exception()
+    
+    user = principal_cache.get(token_data.username)
+    if user is not None:
+        return user
+
+    if db is None:
+        async with AsyncSessionLocal() as session:
+            db_user = await AsyncUserService.get_user_by_username(session, token_data.username)
+    else:
+        db_user = await AsyncUserService.get_user_by_username(db, token_data.username)
+    if db_user is None:
+        raise credentials_exception()
+
+    user = User.model_validate(db_user)
+    principal_cache.set(token_data.username, user)
+    return user
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await resolve_user(token, db)
+
+async def get_stream_user(
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    access_token: Optional[str] = Query(None, description="Bearer token for clients that cannot set headers (EventSource)")
+):
+    """get_current_user for long-lived responses, which must not hold a pooled session open"""
+    if not token and not access_token:
+        raise credentials_exception()
+    return await resolve_user(token or access_token)
@@ -1,24 +1,137 @@
-from pydantic_settings import BaseSettings
-from functools import lru_cache
-
-class Settings(BaseSettings):
-    PROJECT_NAME: str = "Todo App API"
-    VERSION: str = "1.0.0"
-    API_V1_STR: str = "/api/v1"
-    
-    # Database settings
-    DATABASE_URL: str = "sqlite:///./todo_app.db?check_same_thread=False"
-    
-    # JWT settings
-    SECRET_KEY: str = "your-secret-key-here"  # Change in production
-    ALGORITHM: str = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
-    
-    class Config:
-        env_file = ".env"
-
-@lru_cache()
-def get_settings():
-    return Settings()
-
+from pydantic_settings import BaseSettings
+from functools import lru_cache
+from typing import Dict, Optional
+
+class Settings(BaseSettings):
+    PROJECT_NAME: str = "Todo App API"
+    VERSION: str = "1.0.0"
+    API_V1_STR: str = "/api/v1"
+    
+    # Database settings
+    DATABASE_URL: str = "sqlite:///./todo_app.db?check_same_thread=False"
+    # Async driver URL; derived from DATABASE_URL (aiosqlite/asyncpg/aiomysql) when unset
+    ASYNC_DATABASE_URL: Optional[str] = None
+
+    # Apply pending Alembic migrations at startup; turn off when `alembic upgrade head` runs as a deploy step
+    DB_AUTO_MIGRATE: bool = True
+
+    # Connection pool (ignored for in-memory SQLite)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+
+    # Pragmas applied to every SQLite connection
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 268435456
+    
+    # JWT settings
+    SECRET_KEY: str = "your-secret-key-here"  # Change in production
+    ALGORITHM: str = "HS256"
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 14
+    # Signing-key rotation: {kid: secret}. New tokens are signed with JWT_ACTIVE_KID and verified by
+    # their kid header; tokens without one (and all tokens while JWT_ACTIVE_KID is unset) use SECRET_KEY
+    JWT_SIGNING_KEYS: Dict[str, str] = {}
+    JWT_ACTIVE_KID: Optional[str] = None
+    # Verified access tokens kept in process until they expire (0 disables)
+    TOKEN_CACHE_SIZE: int = 10000
+
+    # Largest number of items accepted by a /todos/batch request
+    BATCH_MAX_ITEMS: int = 5000
+
+    # Group commit for todo edits and subtask writes: writes arriving within this many ms of each other
+    # share one transaction, up to WRITE_COALESCE_MAX_BATCH per commit (0 commits every write on its own)
+    WRITE_COALESCE_WINDOW_MS: int = 0
+    WRITE_COALESCE_MAX_BATCH: int = 100
+
+    # Drag-and-drop order: a move that leaves a rank key longer than this respreads its column in the
+    # background (0 only respreads when a move finds no room)
+    TODO_RANK_REBALANCE_LENGTH: int = 16
+
+    # Several workers: "local" keeps todo versions, change feeds and caches per process; "database" also
+    # logs each commit's changes to a shared table that every worker tails every CACHE_CHANNEL_POLL_MS,
+    # keeping rows for CACHE_CHANNEL_RETENTION_SECONDS (serve.py picks it when starting several workers).
+    # An id skipped by the tail is awaited for CACHE_CHANNEL_GAP_SECONDS in case its transaction commits late
+    CACHE_CHANNEL: str = "local"
+    CACHE_CHANNEL_POLL_MS: int = 50
+    CACHE_CHANNEL_RETENTION_SECONDS: int = 600
+    CACHE_CHANNEL_GAP_SECONDS: int = 30
+
+    # Rows fetched per server-side cursor batch on export / inserted per transaction on import
+    EXPORT_CHUNK_SIZE: int = 1000
+    IMPORT_CHUNK_SIZE: int = 1000
+    IMPORT_MAX_ERRORS: int = 100
+    # Longest import line (and CSV record) kept in memory; longer ones are reported and skipped
+    IMPORT_MAX_LINE_LENGTH: int = 1048576
+
+    # Serialized GET /todos bodies kept in process, keyed by ETag (0 disables)
+    RESPONSE_CACHE_SIZE: int = 1024
+
+    # Full-text search: "fts5" (SQLite), "memory" (in-process index) or "auto"
+    SEARCH_BACKEND: str = "auto"
+    SEARCH_MEMORY_MAX_USERS: int = 1000
+
+    # /todos/stream: events kept per user for resume, users kept in memory, keepalive interval
+    STREAM_HISTORY_SIZE: int = 256
+    STREAM_MAX_CHANNELS: int = 10000
+    STREAM_HEARTBEAT_SECONDS: int = 15
+
+    # Seconds between recounts of the incrementally maintained /todos/stats counters (0 disables)
+    STATS_RECONCILE_INTERVAL_SECONDS: int = 3600
+
+    # Delta sync: how long deletes stay visible to GET /todos/changes, and how often old ones are purged
+    SYNC_TOMBSTONE_RETENTION_DAYS: int = 30
+    SYNC_PURGE_INTERVAL_SECONDS: int = 3600
+
+    # Due-date scheduler: seconds between sweeps (0 disables), how early reminders fire, rows per
+    # batch, and where events go ("log", "memory" or a "package.module:factory" path)
+    DUE_SCAN_INTERVAL_SECONDS: int = 60
+    DUE_REMINDER_LEAD_MINUTES: int = 60
+    DUE_SCAN_BATCH_SIZE: int = 1000
+    DUE_EVENT_SINK: str = "log"
+
+    # Prometheus-text /metrics endpoint, and an opt-in log of requests slower than this with their SQL
+    METRICS_ENABLED: bool = True
+    SLOW_REQUEST_LOG_MS: Optional[int] = None
+
+    # Token-bucket rate limits: requests per second and burst per client address and per user, and per
+    # address per minute on /login, /register and /refresh (a rate of 0 disables that limit). Buckets
+    # live in RATE_LIMIT_STORE: "memory" (this process) or a "package.module:factory" path
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_STORE: str = "memory"
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    RATE_LIMIT_IP_PER_SECOND: float = 50
+    RATE_LIMIT_IP_BURST: int = 100
+    RATE_LIMIT_USER_PER_SECOND: float = 20
+    RATE_LIMIT_USER_BURST: int = 40
+    RATE_LIMIT_AUTH_PER_MINUTE: float = 10
+    RATE_LIMIT_AUTH_BURST: int = 5
+
+    # Admission control: requests served at once per process (0 disables), and how many more may wait
+    # and for how long before being shed with a 503
+    MAX_CONCURRENT_REQUESTS: int = 64
+    MAX_QUEUED_REQUESTS: int = 64
+    QUEUE_TIMEOUT_MS: int = 500
+
+    # Authenticated principal cache
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+
+    # Password hashing: bcrypt cost factor and a dedicated process pool
+    # (PASSWORD_HASH_WORKERS=0 hashes inline, None uses one worker per CPU)
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: Optional[int] = None
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    
+    class Config:
+        env_file = ".env"
+
+@lru_cache()
+def get_settings():
+    return Settings()
+
 settings = get_settings() 
\ No newline at end of file
@@ -0,0 +1,75 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+from passlib.context import CryptContext
+from .config import settings
+
+# Pinning min/max rounds to the configured cost makes verify_and_update flag
+# hashes created under any other cost factor, so they are upgraded on login.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+_pending = threading.BoundedSemaphore(max(settings.PASSWORD_HASH_MAX_PENDING, 1))
+_async_pending: Optional[asyncio.Semaphore] = None
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(password, hashed_password)
+
+def _get_executor() -> Optional[ProcessPoolExecutor]:
+    global _executor
+    workers = settings.PASSWORD_HASH_WORKERS
+    if workers == 0:
+        return None
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(max_workers=workers or os.cpu_count())
+    return _executor
+
+def _run(fn, *args):
+    executor = _get_executor()
+    if executor is None:
+        return fn(*args)
+    # Bound the backlog so a login burst waits here instead of queueing without limit
+    with _pending:
+        return executor.submit(fn, *args).result()
+
+async def _run_async(fn, *args):
+    global _async_pending
+    if _async_pending is None:
+        _async_pending = asyncio.Semaphore(max(settings.PASSWORD_HASH_MAX_PENDING, 1))
+    async with _async_pending:
+        # With PASSWORD_HASH_WORKERS=0 this falls back to the loop's default thread pool
+        return await asyncio.get_running_loop().run_in_executor(_get_executor(), fn, *args)
+
+def hash_password(password: str) -> str:
+    return _run(_hash, password)
+
+def verify_password(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Return whether the password matches and, if the hash is outdated, a replacement hash"""
+    return _run(_verify_and_update, password, hashed_password)
+
+async def hash_password_async(password: str) -> str:
+    return await _run_async(_hash, password)
+
+async def verify_password_async(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return await _run_async(_verify_and_update, password, hashed_password)
+
+def shutdown_hash_pool() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
@@ -0,0 +1,37 @@
+import hashlib
+from typing import Awaitable, Callable, Dict, Tuple
+from fastapi import Request, Response
+from .cache import LRUCache
+from .config import settings
+
+# Serialized response bodies keyed by ETag; a new version means a new key, so nothing is ever stale
+response_cache = LRUCache(settings.RESPONSE_CACHE_SIZE)
+
+def compute_etag(request: Request, user_id: int, epoch: str, version: int) -> str:
+    query = "&".join(f"{key}={value}" for key, value in sorted(request.query_params.multi_items()))
+    digest = hashlib.blake2b(f"{request.url.path}?{query}".encode(), digest_size=8).hexdigest()
+    return f'"{epoch}-{user_id}-{version}-{digest}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+async def conditional_response(
+    request: Request,
+    etag: str,
+    build: Callable[[], Awaitable[Tuple[bytes, Dict[str, str]]]],
+) -> Response:
+    """Answer with 304, a cached body or a freshly built one, all carrying the same ETag"""
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    cached = response_cache.get(etag)
+    if cached is None:
+        cached = await build()
+        response_cache.set(etag, cached)
+    body, extra_headers = cached
+    return Response(content=body, media_type="application/json", headers={**headers, **extra_headers})
@@ -0,0 +1,214 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+from fastapi.responses import JSONResponse
+from .encoding import encode_json
+
+logger = logging.getLogger("app.slow_requests")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Statements kept per request for the slow-request log
+MAX_LOGGED_STATEMENTS = 100
+
+class RequestStats:
+    """Work attributed to the request running in the current context"""
+
+    __slots__ = ("queries", "query_seconds", "rows", "serialize_seconds", "statements")
+
+    def __init__(self, capture_sql: bool = False):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.rows = 0
+        self.serialize_seconds = 0.0
+        self.statements: Optional[List[Tuple[float, str]]] = [] if capture_sql else None
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+def record_query(statement: str, seconds: float, rows: int = 0) -> None:
+    stats = current_request.get()
+    if stats is None:
+        return
+    stats.queries += 1
+    stats.query_seconds += seconds
+    stats.rows += rows
+    if stats.statements is not None and len(stats.statements) < MAX_LOGGED_STATEMENTS:
+        stats.statements.append((seconds, statement))
+
+def record_rows(rows: int) -> None:
+    stats = current_request.get()
+    if stats is not None:
+        stats.rows += rows
+
+@contextmanager
+def serialization_timer() -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = current_request.get()
+        if stats is not None:
+            stats.serialize_seconds += time.perf_counter() - started
+
+class TimedJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        with serialization_timer():
+            return encode_json(content)
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class _RouteMetrics:
+    def __init__(self):
+        self.statuses: Dict[int, int] = {}
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.query_seconds = 0.0
+        self.rows = 0
+        self.serialize_seconds = 0.0
+
+def _labels(**labels: str) -> str:
+    escaped = (
+        name + '="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in labels.items()
+    )
+    return "{" + ",".join(escaped) + "}"
+
+def _format(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class MetricsRegistry:
+    """Per-route request metrics, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._routes: Dict[Tuple[str, str], _RouteMetrics] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+        with self._lock:
+            metrics = self._routes.get((method, route))
+            if metrics is None:
+                metrics = self._routes[(method, route)] = _RouteMetrics()
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+            metrics.latency.observe(seconds)
+            metrics.queries.observe(stats.queries)
+            metrics.query_seconds += stats.query_seconds
+            metrics.rows += stats.rows
+            metrics.serialize_seconds += stats.serialize_seconds
+
+    def _histogram(self, lines: List[str], name: str, labels: Dict[str, str], histogram: Histogram) -> None:
+        cumulative = 0
+        for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else _format(bound)
+            lines.append(f"{name}_bucket{_labels(**labels, le=le)} {cumulative}")
+        lines.append(f"{name}_sum{_labels(**labels)} {_format(histogram.sum)}")
+        lines.append(f"{name}_count{_labels(**labels)} {histogram.count}")
+
+    def render(self) -> str:
+        with self._lock:
+            routes = sorted(self._routes.items())
+            sections = {
+                "http_requests_total": ("counter", "Requests by route and status", []),
+                "http_request_duration_seconds": ("histogram", "Time to the last response byte", []),
+                "http_request_db_queries": ("histogram", "SQL statements executed per request", []),
+                "http_request_db_seconds_total": ("counter", "Time spent executing SQL", []),
+                "http_request_db_rows_total": ("counter", "ORM rows loaded plus rows written", []),
+                "http_request_serialization_seconds_total": ("counter", "Time spent encoding response bodies", []),
+            }
+            for (method, route), metrics in routes:
+                labels = {"method": method, "route": route}
+                for status, count in sorted(metrics.statuses.items()):
+                    sections["http_requests_total"][2].append(
+                        f"http_requests_total{_labels(**labels, status=str(status))} {count}"
+                    )
+                self._histogram(sections["http_request_duration_seconds"][2], "http_request_duration_seconds", labels, metrics.latency)
+                self._histogram(sections["http_request_db_queries"][2], "http_request_db_queries", labels, metrics.queries)
+                for name, value in (
+                    ("http_request_db_seconds_total", metrics.query_seconds),
+                    ("http_request_db_rows_total", metrics.rows),
+                    ("http_request_serialization_seconds_total", metrics.serialize_seconds),
+                ):
+                    sections[name][2].append(f"{name}{_labels(**labels)} {_format(value)}")
+        lines = []
+        for name, (kind, help_text, samples) in sections.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+metrics_registry = MetricsRegistry()
+
+def route_label(scope) -> str:
+    """The full path template a request matched, e.g. /api/v1/todos/{todo_id}, or "unmatched".
+
+    Templates keep ids from exploding label cardinality. A route's own path may
+    lack the prefixes it was included or mounted under (newer FastAPI keeps the
+    router-relative route in scope), so the prefix is taken from the request
+    path: every segment before the ones the template itself matched. No route
+    here uses a {name:path} parameter, which could span several segments.
+    """
+    template = getattr(scope.get("route"), "path", None)
+    if template is None:
+        return "unmatched"
+    segments = scope["path"].split("/")
+    return "/".join(segments[:len(segments) - template.count("/")]) + template
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streamed responses are timed to their last byte and never buffered"""
+
+    def __init__(self, app, registry: MetricsRegistry = metrics_registry, slow_request_ms: Optional[int] = None):
+        self.app = app
+        self.registry = registry
+        self.slow_request_ms = slow_request_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats(capture_sql=self.slow_request_ms is not None)
+        token = current_request.set(stats)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_request.reset(token)
+            self.registry.observe(scope["method"], route_label(scope), status, elapsed, stats)
+            if self.slow_request_ms is not None and elapsed * 1000 >= self.slow_request_ms:
+                self._log_slow(scope, status, elapsed, stats)
+
+    @staticmethod
+    def _log_slow(scope, status: int, elapsed: float, stats: RequestStats) -> None:
+        lines = [
+            f"{scope['method']} {scope['path']} -> {status} took {elapsed * 1000:.1f} ms: "
+            f"{stats.queries} queries in {stats.query_seconds * 1000:.1f} ms, {stats.rows} rows, "
+            f"serialization {stats.serialize_seconds * 1000:.1f} ms"
+        ]
+        for seconds, statement in stats.statements or ():
+            lines.append(f"  [{seconds * 1000:.2f} ms] {' '.join(statement.split())}")
+        if stats.queries > len(stats.statements or ()):
+            lines.append(f"  ... {stats.queries - len(stats.statements or ())} more")
+        logger.warning("\n".join(lines))
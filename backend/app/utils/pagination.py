@@ -0,0 +1,39 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+def encode_token(payload: Dict[str, Any]) -> str:
+    data = json.dumps(payload, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+def decode_token(token: str) -> Dict[str, Any]:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except ValueError:
+        raise ValueError("Malformed cursor")
+    if not isinstance(payload, dict):
+        raise ValueError("Malformed cursor")
+    return payload
+
+def encode_cursor(sort: str, order: str, value: Any, last_id: int) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    elif hasattr(value, "value"):
+        value = value.value
+    return encode_token({"s": sort, "o": order, "v": value, "i": last_id})
+
+def decode_cursor(cursor: str, sort: str, order: str) -> Tuple[Optional[Any], int]:
+    """Decode a cursor issued for the same sort/order, raising ValueError otherwise"""
+    payload = decode_token(cursor)
+    try:
+        last_id = int(payload["i"])
+        value = payload["v"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Malformed cursor")
+    if payload.get("s") != sort or payload.get("o") != order:
+        raise ValueError("Cursor does not match the requested sort order")
+    if value is not None and sort in ("created_at", "updated_at", "due_date"):
+        value = datetime.fromisoformat(value)
+    return value, last_id
@@ -0,0 +1,16 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+async def run_periodically(interval: float, job: Callable[[], Awaitable[Any]], name: str) -> None:
+    """Await job every interval seconds until cancelled; a failed run is logged and retried next time"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await job()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("%s failed", name)
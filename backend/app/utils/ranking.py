@@ -0,0 +1,102 @@
+"""Lexicographic rank keys for ordering todos within a board column.
+
+Keys are strings of base-36 digits (0-9, a-z) compared as plain strings,
+which every collation orders the same way for this alphabet. A key never
+ends in "0", so there is always room for another key between two distinct
+keys. Empty ranks (rows that predate ranking) sort first and have no room
+below them; callers respread the column when a key cannot be made.
+"""
+from typing import List, Optional
+
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+# todos.rank column width
+MAX_KEY_LENGTH = 64
+# Appends and prepends step by one unit in the last of at least this many digits, so columns built
+# by adding cards at either end keep short keys instead of halving the open end every time
+STEP_WIDTH = 4
+
+_VALUES = {digit: value for value, digit in enumerate(DIGITS)}
+
+def _format(value: int, width: int) -> str:
+    digits = []
+    for _ in range(width):
+        value, digit = divmod(value, BASE)
+        digits.append(DIGITS[digit])
+    return "".join(reversed(digits))
+
+def _checked(key: str) -> str:
+    if len(key) > MAX_KEY_LENGTH:
+        raise ValueError("Rank keys exhausted; respread the column")
+    return key
+
+def key_between(lower: Optional[str], upper: Optional[str]) -> str:
+    """The shortest key strictly between lower and upper; None leaves that side open"""
+    lower = lower or ""
+    if upper is not None and lower >= upper:
+        raise ValueError("No rank key fits between tied or out-of-order neighbours")
+    digits = []
+    position = 0
+    while True:
+        low = _VALUES[lower[position]] if position < len(lower) else 0
+        if upper is None:
+            high = BASE
+        elif position < len(upper):
+            high = _VALUES[upper[position]]
+        else:
+            # upper is lower followed only by zeros
+            raise ValueError("No rank key fits between tied or out-of-order neighbours")
+        if high - low > 1:
+            digits.append(DIGITS[(low + high) // 2])
+            return _checked("".join(digits))
+        digits.append(DIGITS[low])
+        if high > low:
+            # Already below upper at this digit; any longer key starting here is too
+            upper = None
+        position += 1
+
+def key_after(lower: Optional[str]) -> str:
+    """A key after lower, for appending to the end of a column whose last key is lower"""
+    if lower is None:
+        return key_between(None, None)
+    width = max(len(lower), STEP_WIDTH)
+    value = int(lower.ljust(width, "0"), BASE) + 1
+    if value % BASE == 0:
+        value += 1
+    if value >= BASE ** width:
+        return key_between(lower, None)
+    return _format(value, width)
+
+def key_before(upper: Optional[str]) -> str:
+    """A key before upper, for prepending to a column whose first key is upper"""
+    if upper is None:
+        return key_between(None, None)
+    width = max(len(upper), STEP_WIDTH)
+    value = int(upper.ljust(width, "0"), BASE) - 1
+    if value % BASE == 0:
+        value -= 1
+    if value <= 0:
+        return key_between(None, upper)
+    return _format(value, width)
+
+def rank_between(lower: Optional[str], upper: Optional[str]) -> str:
+    """A key for a card dropped between neighbours with these keys; None for an open end"""
+    if upper is None:
+        return key_after(lower)
+    if lower is None:
+        return key_before(upper)
+    return key_between(lower, upper)
+
+def spread_keys(count: int) -> List[str]:
+    """count ascending keys of equal length, evenly spaced with room on both ends"""
+    width = STEP_WIDTH
+    while BASE ** width < (count + 1) * BASE:
+        width += 1
+    step = BASE ** width // (count + 1)
+    keys = []
+    for position in range(1, count + 1):
+        value = position * step
+        if value % BASE == 0:
+            value += 1
+        keys.append(_format(value, width))
+    return keys
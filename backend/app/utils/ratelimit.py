@@ -0,0 +1,173 @@
+import asyncio
+import importlib
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Tuple
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+from .config import settings
+
+class RateLimit:
+    __slots__ = ("rate", "burst")
+
+    def __init__(self, rate: float, burst: float):
+        # Tokens added per second, and bucket capacity
+        self.rate = rate
+        self.burst = max(burst, 1)
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+class BucketStore(ABC):
+    """Where token buckets live; implement take() to share them between processes (e.g. Redis)"""
+
+    @abstractmethod
+    async def take(self, key: str, limit: RateLimit) -> float:
+        """Take one token from key's bucket: 0 if granted, else seconds until a token is available"""
+
+class MemoryBucketStore(BucketStore):
+    """Buckets in this process; the least recently used are dropped (i.e. refilled) past max_keys"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, limit: RateLimit) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (limit.burst, now))
+            tokens = min(limit.burst, tokens + (now - updated) * limit.rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / limit.rate
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+def create_bucket_store() -> BucketStore:
+    store = settings.RATE_LIMIT_STORE
+    if store == "memory":
+        return MemoryBucketStore(settings.RATE_LIMIT_MAX_KEYS)
+    module, _, factory = store.partition(":")
+    bucket_store = getattr(importlib.import_module(module), factory)()
+    if not isinstance(bucket_store, BucketStore):
+        raise TypeError(f"RATE_LIMIT_STORE {store} returned {type(bucket_store).__name__}, not a BucketStore")
+    return bucket_store
+
+def _reject(status_code: int, detail: str, retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        {"detail": detail}, status_code=status_code, headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+def _user_key(headers: Headers) -> Optional[str]:
+    authorization = headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    from ..services.user_service import UserService
+    # Verified, so a forged token cannot drain someone else's bucket; verify_token is cached
+    token_data = UserService.verify_token(token)
+    return token_data.username if token_data else None
+
+class RateLimitMiddleware:
+    """Token-bucket limits per client address, per authenticated user and, tighter, per address on
+    the credential endpoints. Requests outside path_prefix and CORS preflights are not limited.
+
+    The address is the ASGI client; behind a proxy run uvicorn with --proxy-headers.
+    """
+
+    def __init__(
+        self,
+        app,
+        store: BucketStore,
+        per_ip: RateLimit,
+        per_user: RateLimit,
+        auth_per_ip: RateLimit,
+        auth_paths: Iterable[str] = (),
+        path_prefix: str = "",
+    ):
+        self.app = app
+        self.store = store
+        self.per_ip = per_ip
+        self.per_user = per_user
+        self.auth_per_ip = auth_per_ip
+        self.auth_paths = frozenset(auth_paths)
+        self.path_prefix = path_prefix
+
+    def _limits(self, scope) -> List[Tuple[str, RateLimit]]:
+        ip = scope["client"][0] if scope.get("client") else "unknown"
+        limits = [("ip:" + ip, self.per_ip)]
+        if scope["path"] in self.auth_paths:
+            limits.append(("auth:" + ip, self.auth_per_ip))
+        elif self.per_user.enabled:
+            user = _user_key(Headers(scope=scope))
+            if user is not None:
+                limits.append(("user:" + user, self.per_user))
+        return limits
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+        for key, limit in self._limits(scope):
+            if not limit.enabled:
+                continue
+            wait = await self.store.take(key, limit)
+            if wait:
+                await _reject(429, "Too many requests", wait)(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+class ConcurrencyLimitMiddleware:
+    """Admission control: at most max_concurrent requests run at once; up to max_queued more wait
+    up to queue_timeout_ms for a slot. Anything beyond is shed with a 503 straight away, so an
+    overload shows up as fast rejections instead of every request's latency growing without bound.
+    Long-lived responses (event streams) belong in exempt_paths, or they would hold slots for good.
+    """
+
+    def __init__(
+        self, app, max_concurrent: int, max_queued: int, queue_timeout_ms: int, exempt_paths: Iterable[str] = ()
+    ):
+        self.app = app
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout_ms / 1000
+        self.exempt_paths = frozenset(exempt_paths)
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._queued = 0
+
+    async def _admit(self) -> bool:
+        if not self._slots.locked():
+            await self._slots.acquire()
+            return True
+        if self._queued >= self.max_queued:
+            return False
+        self._queued += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._queued -= 1
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+        if not await self._admit():
+            await _reject(503, "Server busy, retry shortly", 1)(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._slots.release()
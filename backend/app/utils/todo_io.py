@@ -0,0 +1,140 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, List, Tuple, Union
+from .encoding import encode_json
+
+EXPORT_COLUMNS = [
+    "id", "text", "description", "completed", "stage", "category", "priority",
+    "due_date", "created_at", "updated_at", "subtasks", "tags",
+]
+
+def dumps(value: Any) -> str:
+    return encode_json(value).decode()
+
+def format_ndjson(records: Iterable[Dict[str, Any]]) -> bytes:
+    return b"".join(encode_json(record) + b"\n" for record in records)
+
+def format_csv(records: Iterable[Dict[str, Any]], header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    for record in records:
+        row = []
+        for column in EXPORT_COLUMNS:
+            value = record.get(column)
+            if column in ("subtasks", "tags"):
+                value = dumps(value)
+            elif isinstance(value, datetime):
+                value = value.isoformat()
+            elif value is None:
+                value = ""
+            row.append(value)
+        writer.writerow(row)
+    return buffer.getvalue()
+
+def _decode_line(line: bytes) -> Union[str, ValueError]:
+    try:
+        return line.decode("utf-8").rstrip("\r")
+    except UnicodeDecodeError as e:
+        return ValueError(f"Line is not valid UTF-8: {e.reason} at byte {e.start}")
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes], max_length: int
+) -> AsyncIterator[Tuple[int, Union[str, ValueError]]]:
+    """Split a byte stream into numbered text lines without buffering the whole body;
+    a line that is not valid UTF-8 or longer than max_length bytes comes back as a
+    ValueError to report against its number, and an overlong line is skipped, not buffered"""
+    pending = bytearray()
+    line_no = 0
+    # Inside an overlong line that was already reported: drop bytes up to its newline
+    skipping = False
+    async for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end < 0:
+                break
+            line_no += 1
+            if skipping:
+                skipping = False
+            elif len(pending) + end - start > max_length:
+                yield line_no, ValueError(f"Line is longer than {max_length} bytes")
+            else:
+                pending += chunk[start:end]
+                yield line_no, _decode_line(bytes(pending))
+            pending.clear()
+            start = end + 1
+        if skipping:
+            continue
+        if len(pending) + len(chunk) - start > max_length:
+            yield line_no + 1, ValueError(f"Line is longer than {max_length} bytes")
+            pending.clear()
+            skipping = True
+        else:
+            pending += chunk[start:]
+    if pending:
+        yield line_no + 1, _decode_line(bytes(pending))
+
+async def parse_ndjson(chunks: AsyncIterator[bytes], max_length: int) -> AsyncIterator[Tuple[int, Any]]:
+    async for line_no, line in iter_lines(chunks, max_length):
+        if isinstance(line, ValueError):
+            yield line_no, line
+            continue
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except ValueError as e:
+            yield line_no, e
+
+def _parse_csv_record(columns: List[str], text: str) -> Dict[str, Any]:
+    values = next(csv.reader(io.StringIO(text)))
+    record: Dict[str, Any] = {}
+    for column, value in zip(columns, values):
+        if column in ("subtasks", "tags"):
+            record[column] = json.loads(value) if value else []
+        elif value != "":
+            record[column] = value
+    return record
+
+async def parse_csv(chunks: AsyncIterator[bytes], max_length: int) -> AsyncIterator[Tuple[int, Any]]:
+    """Records may span lines inside quoted fields; one longer than max_length characters
+    is reported and dropped, and parsing resumes at the next line"""
+    columns = None
+    record_lines: List[str] = []
+    record_length = 0
+    quotes = 0
+    start_line = 0
+    async for line_no, line in iter_lines(chunks, max_length):
+        if isinstance(line, ValueError):
+            # Drop the record the line belongs to and resume at the next line
+            yield (start_line if record_lines else line_no), line
+            record_lines, record_length, quotes = [], 0, 0
+            continue
+        if not record_lines:
+            start_line = line_no
+        record_lines.append(line)
+        record_length += len(line) + 1
+        quotes += line.count('"')
+        # A quoted field may span lines; the record is complete once quotes balance
+        if quotes % 2:
+            if record_length > max_length:
+                yield start_line, ValueError(f"Record is longer than {max_length} characters")
+                record_lines, record_length, quotes = [], 0, 0
+            continue
+        text = "\n".join(record_lines)
+        record_lines, record_length, quotes = [], 0, 0
+        if not text.strip():
+            continue
+        if columns is None:
+            columns = next(csv.reader(io.StringIO(text)))
+            continue
+        try:
+            yield start_line, _parse_csv_record(columns, text)
+        except ValueError as e:
+            yield start_line, e
+    if record_lines:
+        yield start_line, ValueError("Unterminated quoted field")
@@ -0,0 +1,308 @@
+"""API load benchmark and regression gate.
+
+Seeds a SQLite database with --users x --todos todos (each with --subtasks
+subtasks and --tags tags), then drives every scenario with --concurrency
+concurrent clients, in-process through httpx's ASGI transport and/or
+against uvicorn over real sockets. Each mode starts from an identical copy
+of the seeded database. Prints throughput and p50/p95/p99 per scenario as
+JSON; with --baseline, exits 1 if any scenario regressed beyond
+--max-regression.
+
+    cd backend
+    python benchmarks/bench_api.py --users 20 --todos 500 --mode both --output run.json
+    python benchmarks/bench_api.py --users 20 --todos 500 --baseline run.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import time
+from datetime import datetime, timedelta
+
+from common import inprocess_client, latency_summary, sqlite_url, use_temp_database, uvicorn_server
+
+PASSWORD = "benchmark-password"
+API = "/api/v1"
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--todos", type=int, default=1000, help="Todos per user")
+    parser.add_argument("--subtasks", type=int, default=2, help="Subtasks per todo")
+    parser.add_argument("--tags", type=int, default=2, help="Tags per todo")
+    parser.add_argument("--tag-vocabulary", type=int, default=200)
+    parser.add_argument("--mode", choices=["inprocess", "uvicorn", "both"], default="inprocess")
+    parser.add_argument("--scenarios", default=",".join(DEFAULT_SCENARIOS),
+                        help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=500, help="Measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--baseline", help="Report from an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.10,
+                        help="Allowed fractional p95 increase / throughput drop versus --baseline")
+    return parser.parse_args()
+
+def words(rng, count):
+    return " ".join(f"word{rng.randrange(2000)}" for _ in range(count))
+
+def seed_database(args):
+    """Bulk-insert the dataset with Core statements; returns {username: [todo ids]}"""
+    from sqlalchemy import insert, text
+    from app.database.base import get_engine
+    from app.database.migrations import upgrade_schema
+    from app.models.todo import Todo, SubTask, Tag, TodoTags, StageEnum, PriorityEnum, CategoryEnum
+    from app.models.user import User
+    from app.utils.hashing import hash_password
+
+    rng = random.Random(args.seed)
+    engine = get_engine()
+    upgrade_schema(engine)
+    hashed = hash_password(PASSWORD)
+    now = datetime.utcnow()
+    owned = {}
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": u + 1, "email": f"bench{u}@example.com", "username": f"bench{u}", "hashed_password": hashed}
+            for u in range(args.users)
+        ])
+        conn.execute(insert(Tag), [{"id": t + 1, "name": f"tag{t}"} for t in range(args.tag_vocabulary)])
+        todo_id = 0
+        for u in range(args.users):
+            todos, subtasks, links = [], [], []
+            for _ in range(args.todos):
+                todo_id += 1
+                created = now - timedelta(minutes=rng.randrange(525600))
+                todos.append({
+                    "id": todo_id, "user_id": u + 1, "text": words(rng, 4), "description": words(rng, 12),
+                    "completed": rng.random() < 0.3, "stage": rng.choice(list(StageEnum)),
+                    "category": rng.choice(list(CategoryEnum)), "priority": rng.choice(list(PriorityEnum)),
+                    "due_date": created + timedelta(days=rng.randrange(60)) if rng.random() < 0.5 else None,
+                    "created_at": created, "updated_at": created,
+                })
+                subtasks.extend(
+                    {"todo_id": todo_id, "text": words(rng, 3), "completed": rng.random() < 0.5, "created_at": created}
+                    for _ in range(args.subtasks)
+                )
+                links.extend(
+                    {"todo_id": todo_id, "tag_id": tag_id, "user_id": u + 1}
+                    for tag_id in rng.sample(range(1, args.tag_vocabulary + 1), min(args.tags, args.tag_vocabulary))
+                )
+            conn.execute(insert(Todo), todos)
+            if subtasks:
+                conn.execute(insert(SubTask), subtasks)
+            if links:
+                conn.execute(insert(TodoTags), links)
+            owned[f"bench{u}"] = [todo["id"] for todo in todos]
+    with engine.connect() as conn:
+        conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+    engine.dispose()
+    return owned
+
+class Context:
+    def __init__(self, args, owned):
+        from app.services.user_service import UserService
+
+        self.args = args
+        self.owned = owned
+        # Minted directly: only the login scenario should pay for bcrypt
+        self.headers = {
+            username: {"Authorization": "Bearer " + UserService.create_access_token(
+                data={"sub": username}, expires_delta=timedelta(hours=6),
+            )}
+            for username in owned
+        }
+
+    def pick(self, rng):
+        username = rng.choice(list(self.owned))
+        return username, self.headers[username], rng.choice(self.owned[username])
+
+async def scenario_login(client, ctx, rng):
+    username, _, _ = ctx.pick(rng)
+    return await client.post(f"{API}/login", data={"username": username, "password": PASSWORD})
+
+async def scenario_list(client, ctx, rng):
+    _, headers, _ = ctx.pick(rng)
+    skip = rng.randrange(max(1, ctx.args.todos // 50)) * 50
+    return await client.get(f"{API}/todos/", params={"limit": 50, "skip": skip}, headers=headers)
+
+async def scenario_get(client, ctx, rng):
+    _, headers, todo_id = ctx.pick(rng)
+    return await client.get(f"{API}/todos/{todo_id}", headers=headers)
+
+async def scenario_create(client, ctx, rng):
+    _, headers, _ = ctx.pick(rng)
+    return await client.post(f"{API}/todos/", json={
+        "text": words(rng, 4), "description": words(rng, 12), "category": "work", "priority": "high",
+    }, headers=headers)
+
+async def scenario_update(client, ctx, rng):
+    _, headers, todo_id = ctx.pick(rng)
+    return await client.put(f"{API}/todos/{todo_id}", json={
+        "completed": rng.random() < 0.5, "stage": rng.choice(["todo", "in_progress", "done"]),
+    }, headers=headers)
+
+async def scenario_move(client, ctx, rng):
+    _, headers, todo_id = ctx.pick(rng)
+    # To the bottom of a column: the neighbour lookup is one index seek whatever the column size
+    return await client.post(f"{API}/todos/{todo_id}/move", json={
+        "stage": rng.choice(["todo", "in_progress", "done"]),
+    }, headers=headers)
+
+async def scenario_tags(client, ctx, rng):
+    _, headers, todo_id = ctx.pick(rng)
+    name = f"tag{rng.randrange(ctx.args.tag_vocabulary)}"
+    return await client.post(f"{API}/todos/{todo_id}/tags", json={"name": name}, headers=headers)
+
+async def scenario_todos_by_tag(client, ctx, rng):
+    _, headers, _ = ctx.pick(rng)
+    return await client.get(f"{API}/todos/tags/tag{rng.randrange(ctx.args.tag_vocabulary)}", headers=headers)
+
+async def scenario_subtasks(client, ctx, rng):
+    _, headers, todo_id = ctx.pick(rng)
+    return await client.post(f"{API}/todos/{todo_id}/subtasks", json={"text": words(rng, 3)}, headers=headers)
+
+async def scenario_search(client, ctx, rng):
+    _, headers, _ = ctx.pick(rng)
+    return await client.get(f"{API}/todos/search", params={"q": f"word{rng.randrange(2000)}"}, headers=headers)
+
+async def scenario_stats(client, ctx, rng):
+    _, headers, _ = ctx.pick(rng)
+    return await client.get(f"{API}/todos/stats", headers=headers)
+
+async def scenario_changes(client, ctx, rng):
+    _, headers, _ = ctx.pick(rng)
+    return await client.get(f"{API}/todos/changes", params={"limit": 100}, headers=headers)
+
+SCENARIOS = {
+    "login": scenario_login,
+    "list": scenario_list,
+    "get": scenario_get,
+    "create": scenario_create,
+    "update": scenario_update,
+    "move": scenario_move,
+    "tags": scenario_tags,
+    "todos_by_tag": scenario_todos_by_tag,
+    "subtasks": scenario_subtasks,
+    "search": scenario_search,
+    "stats": scenario_stats,
+    "changes": scenario_changes,
+}
+DEFAULT_SCENARIOS = ["login", "list", "get", "create", "update", "tags", "todos_by_tag", "subtasks"]
+
+async def drive(client, ctx, scenario, requests, concurrency, rng):
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker(worker_rng):
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await scenario(client, ctx, worker_rng)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(random.Random(rng.random())) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 1),
+        **latency_summary(latencies),
+    }
+
+async def run_mode(client, ctx, names):
+    args = ctx.args
+    rng = random.Random(args.seed)
+    results = {}
+    for name in names:
+        scenario = SCENARIOS[name]
+        await drive(client, ctx, scenario, args.warmup, min(args.concurrency, max(1, args.warmup)), rng)
+        # Login is bcrypt-bound by design; fewer requests keep the run short without hiding regressions
+        requests = max(args.concurrency, args.requests // 10) if name == "login" else args.requests
+        results[name] = await drive(client, ctx, scenario, requests, args.concurrency, rng)
+    return results
+
+async def run_inprocess(ctx, names):
+    async with inprocess_client(timeout=None) as client:
+        return await run_mode(client, ctx, names)
+
+async def run_uvicorn(ctx, names, port):
+    import httpx
+
+    limits = httpx.Limits(max_connections=ctx.args.concurrency, max_keepalive_connections=ctx.args.concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None, limits=limits) as client:
+        return await run_mode(client, ctx, names)
+
+def compare(report, baseline, tolerance):
+    regressions = []
+    for mode, scenarios in report["results"].items():
+        for name, result in scenarios.items():
+            before = baseline.get("results", {}).get(mode, {}).get(name)
+            if not before:
+                continue
+            if result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{mode}/{name}: p95 {before['p95_ms']} -> {result['p95_ms']} ms")
+            if result["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+                regressions.append(
+                    f"{mode}/{name}: throughput {before['throughput_rps']} -> {result['throughput_rps']} rps"
+                )
+    return regressions
+
+def main():
+    args = parse_args()
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(unknown)}")
+
+    workdir = use_temp_database("bench-api-")
+    os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    started = time.perf_counter()
+    owned = seed_database(args)
+    seed_seconds = time.perf_counter() - started
+    pristine = os.path.join(workdir, "seed.db")
+    shutil.copy(os.path.join(workdir, "bench.db"), pristine)
+    ctx = Context(args, owned)
+
+    results = {}
+    if args.mode in ("uvicorn", "both"):
+        database = os.path.join(workdir, "uvicorn.db")
+        shutil.copy(pristine, database)
+        with uvicorn_server({"DATABASE_URL": sqlite_url(database)}) as server:
+            results["uvicorn"] = asyncio.run(run_uvicorn(ctx, names, server.port))
+    if args.mode in ("inprocess", "both"):
+        results["inprocess"] = asyncio.run(run_inprocess(ctx, names))
+
+    report = {
+        "config": {
+            key: getattr(args, key)
+            for key in ("users", "todos", "subtasks", "tags", "tag_vocabulary", "requests", "concurrency",
+                        "bcrypt_rounds", "seed")
+        },
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "seed_seconds": round(seed_seconds, 2),
+        "results": results,
+    }
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            report["regressions"] = compare(report, json.load(baseline), args.max_regression)
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as target:
+            target.write(output + "\n")
+    if report.get("regressions"):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
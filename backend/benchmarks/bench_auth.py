@@ -0,0 +1,92 @@
+"""Per-request authentication overhead benchmark.
+
+Measures, in-process, what authenticating a request costs: full JWT
+verification versus the verified-token cache, the whole resolve_user
+dependency on a warm principal cache, and renewing a session through
+POST /refresh versus POST /login (bcrypt). Prints JSON.
+
+    cd backend
+    python benchmarks/bench_auth.py --iterations 20000
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from common import inprocess_client, latency_summary, use_temp_database
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000, help="Token verifications per measurement")
+    parser.add_argument("--renewals", type=int, default=50, help="Sequential /login and /refresh calls")
+    parser.add_argument("--rounds", type=int, default=12, help="BCRYPT_ROUNDS")
+    return parser.parse_args()
+
+def micro_summary(samples):
+    """latency_summary in microseconds, for calls far below a millisecond"""
+    summary = latency_summary([sample * 1000 for sample in samples])
+    return {key.replace("_ms", "_us"): value for key, value in summary.items()}
+
+def per_call(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return {**micro_summary(samples), "calls_per_s": round(iterations / sum(samples))}
+
+async def run(args):
+    from app.services.user_service import UserService, token_cache
+    from app.utils.auth import resolve_user
+
+    async with inprocess_client() as client:
+        await client.post("/api/v1/register", json={
+            "email": "bench@example.com", "username": "bench", "password": "benchmark-password",
+        })
+        response = await client.post("/api/v1/login", data={"username": "bench", "password": "benchmark-password"})
+        tokens = response.json()
+        access_token = tokens["access_token"]
+
+        def uncached():
+            token_cache.invalidate(access_token)
+            UserService.verify_token(access_token)
+
+        results = {
+            "verify_uncached": per_call(uncached, args.iterations),
+            "verify_cached": per_call(lambda: UserService.verify_token(access_token), args.iterations),
+        }
+
+        await resolve_user(access_token)
+        samples = []
+        for _ in range(args.iterations):
+            started = time.perf_counter()
+            await resolve_user(access_token)
+            samples.append(time.perf_counter() - started)
+        results["resolve_user_warm"] = micro_summary(samples)
+
+        for name, call in (
+            ("login", lambda: client.post(
+                "/api/v1/login", data={"username": "bench", "password": "benchmark-password"})),
+            ("refresh", lambda: client.post(
+                "/api/v1/refresh", json={"refresh_token": tokens["refresh_token"]})),
+        ):
+            samples = []
+            for _ in range(args.renewals):
+                started = time.perf_counter()
+                response = await call()
+                samples.append(time.perf_counter() - started)
+                response.raise_for_status()
+            results[name] = latency_summary(samples)
+
+    return {"iterations": args.iterations, "bcrypt_rounds": args.rounds, **results}
+
+def main():
+    args = parse_args()
+    use_temp_database("bench-auth-")
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    os.environ["PASSWORD_HASH_WORKERS"] = "0"
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Batch write benchmark.
+
+Creates, updates and deletes the same number of todos through the
+single-item endpoints and through /todos/batch, then prints rows per
+second for each path as JSON.
+
+    cd backend
+    python benchmarks/bench_batch.py --rows 2000 --batch-size 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from common import inprocess_client, use_temp_database
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    return parser.parse_args()
+
+def todo_payload(i):
+    return {"text": f"bench todo {i}", "category": "work", "priority": "medium"}
+
+def chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+async def timed(coro):
+    started = time.perf_counter()
+    result = await coro
+    return result, time.perf_counter() - started
+
+async def run(args):
+    async with inprocess_client() as client:
+        await client.post("/api/v1/register", json={
+            "email": "bench@example.com", "username": "bench", "password": "benchmark-password",
+        })
+        token = (await client.post("/api/v1/login", data={
+            "username": "bench", "password": "benchmark-password",
+        })).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        async def single_path():
+            ids = []
+            for i in range(args.rows):
+                response = await client.post("/api/v1/todos/", json=todo_payload(i), headers=headers)
+                ids.append(response.json()["id"])
+            started = time.perf_counter()
+            for todo_id in ids:
+                await client.put(f"/api/v1/todos/{todo_id}", json={"completed": True}, headers=headers)
+            update_elapsed = time.perf_counter() - started
+            started = time.perf_counter()
+            for todo_id in ids:
+                await client.delete(f"/api/v1/todos/{todo_id}", headers=headers)
+            return update_elapsed, time.perf_counter() - started
+
+        async def batch_path():
+            ids = []
+            for items in chunks([todo_payload(i) for i in range(args.rows)], args.batch_size):
+                response = await client.post("/api/v1/todos/batch", json={"items": items}, headers=headers)
+                ids.extend(result["id"] for result in response.json()["results"])
+            started = time.perf_counter()
+            for batch in chunks(ids, args.batch_size):
+                await client.patch("/api/v1/todos/batch", json={
+                    "items": [{"id": todo_id, "completed": True} for todo_id in batch],
+                }, headers=headers)
+            update_elapsed = time.perf_counter() - started
+            started = time.perf_counter()
+            for batch in chunks(ids, args.batch_size):
+                await client.request("DELETE", "/api/v1/todos/batch", json={"ids": batch}, headers=headers)
+            return update_elapsed, time.perf_counter() - started
+
+        (single_update, single_delete), single_total = await timed(single_path())
+        (batch_update, batch_delete), batch_total = await timed(batch_path())
+
+    def rate(elapsed):
+        return round(args.rows / elapsed, 1)
+
+    return {
+        "rows": args.rows,
+        "batch_size": args.batch_size,
+        "single": {
+            "create_rows_per_s": rate(single_total - single_update - single_delete),
+            "update_rows_per_s": rate(single_update),
+            "delete_rows_per_s": rate(single_delete),
+        },
+        "batch": {
+            "create_rows_per_s": rate(batch_total - batch_update - batch_delete),
+            "update_rows_per_s": rate(batch_update),
+            "delete_rows_per_s": rate(batch_delete),
+        },
+    }
+
+def main():
+    args = parse_args()
+    use_temp_database("bench-batch-")
+    os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+if __name__ == "__main__":
+    main()
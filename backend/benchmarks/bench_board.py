@@ -0,0 +1,70 @@
+"""Kanban board benchmark.
+
+Seeds one user's todos (with subtasks and tags) and compares loading the
+whole board as every todo from GET /todos against the columnar
+GET /todos/board: response bytes, raw and gzip-compressed, and request
+latency, best of --repeat in-process requests. Prints JSON.
+
+    cd backend
+    python benchmarks/bench_board.py --todos 5000
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import time
+
+from common import inprocess_client, use_temp_database
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--todos", type=int, default=5000)
+    parser.add_argument("--subtasks", type=int, default=3, help="Subtasks per todo")
+    parser.add_argument("--tags", type=int, default=2, help="Tags per todo")
+    parser.add_argument("--repeat", type=int, default=10)
+    return parser.parse_args()
+
+async def measure(todos, repeat):
+    from app.services.user_service import UserService
+
+    headers = {"Authorization": "Bearer " + UserService.create_access_token({"sub": "bench0"})}
+    endpoints = {"list": ("/api/v1/todos/", {"limit": todos}), "board": ("/api/v1/todos/board", {})}
+    results = {}
+    async with inprocess_client() as client:
+        for name, (path, params) in endpoints.items():
+            response = await client.get(path, params=params, headers=headers)
+            response.raise_for_status()
+            best = None
+            for _ in range(repeat):
+                started = time.perf_counter()
+                (await client.get(path, params=params, headers=headers)).raise_for_status()
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            results[name] = {
+                "bytes": len(response.content),
+                "gzip_bytes": len(gzip.compress(response.content)),
+                "best_ms": round(best * 1000, 2),
+            }
+    results["board_vs_list"] = {
+        key: round(results["board"][key] / results["list"][key], 3) for key in ("bytes", "gzip_bytes", "best_ms")
+    }
+    return results
+
+def main():
+    args = parse_args()
+    use_temp_database("bench-board-")
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+    # Every request must build its body; a cached one would measure nothing
+    os.environ["RESPONSE_CACHE_SIZE"] = "0"
+    from bench_api import seed_database
+
+    seed_database(argparse.Namespace(
+        users=1, todos=args.todos, subtasks=args.subtasks, tags=args.tags, tag_vocabulary=50, seed=1,
+    ))
+    report = {"todos": args.todos, "subtasks": args.subtasks, "tags": args.tags}
+    report.update(asyncio.run(measure(args.todos, args.repeat)))
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
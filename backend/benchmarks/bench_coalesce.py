@@ -0,0 +1,92 @@
+"""Write coalescing benchmark.
+
+Seeds --users users with a todo holding --subtasks subtasks each, then runs
+--concurrency clients that toggle subtasks (and every tenth write, edit the
+todo) as fast as they can, once committing every write on its own and once
+with WRITE_COALESCE_WINDOW_MS=--window-ms. Prints writes per second and
+latency for each mode as JSON.
+
+Commit cost depends on SQLite durability, so compare both settings:
+
+    cd backend
+    python benchmarks/bench_coalesce.py --writes 4000 --concurrency 32
+    SQLITE_SYNCHRONOUS=FULL python benchmarks/bench_coalesce.py --writes 4000 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from common import inprocess_client, latency_summary, use_temp_database
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--subtasks", type=int, default=20, help="Subtasks on each user's todo")
+    parser.add_argument("--writes", type=int, default=4000, help="Writes per mode")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--window-ms", type=int, default=5)
+    return parser.parse_args()
+
+async def seed(client, args):
+    """Register the users; returns (headers, todo id, subtask ids) per user"""
+    accounts = []
+    for i in range(args.users):
+        credentials = {"username": f"bench{i}", "password": "benchmark-password"}
+        await client.post("/api/v1/register", json={**credentials, "email": f"bench{i}@example.com"})
+        token = (await client.post("/api/v1/login", data=credentials)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        todo_id = (await client.post("/api/v1/todos/", json={"text": "checklist", "category": "work"}, headers=headers)).json()["id"]
+        for n in range(args.subtasks):
+            todo = (await client.post(f"/api/v1/todos/{todo_id}/subtasks", json={"text": f"item {n}"}, headers=headers)).json()
+        accounts.append((headers, todo_id, [subtask["id"] for subtask in todo["subtasks"]]))
+    return accounts
+
+async def run_mode(client, accounts, args):
+    latencies = []
+    counter = iter(range(args.writes))
+
+    async def worker(worker_id):
+        headers, todo_id, subtask_ids = accounts[worker_id % len(accounts)]
+        for n in counter:
+            started = time.perf_counter()
+            if n % 10 == 9:
+                response = await client.put(f"/api/v1/todos/{todo_id}", json={"text": f"checklist {n}"}, headers=headers)
+            else:
+                subtask_id = subtask_ids[n % len(subtask_ids)]
+                response = await client.post(f"/api/v1/todos/{todo_id}/subtasks/{subtask_id}/toggle", headers=headers)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    return {"writes_per_s": round(args.writes / elapsed, 1), **latency_summary(latencies)}
+
+async def run(args):
+    from app.services.coalesce import write_coalescer
+
+    report = {
+        "writes": args.writes,
+        "concurrency": args.concurrency,
+        "users": args.users,
+        "sqlite_synchronous": os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+    }
+    async with inprocess_client() as client:
+        accounts = await seed(client, args)
+        for name, window_ms in (("per_write_commit", 0), ("coalesced", args.window_ms)):
+            write_coalescer.window = window_ms / 1000
+            report[name] = {"window_ms": window_ms, **await run_mode(client, accounts, args)}
+    report["speedup"] = round(report["coalesced"]["writes_per_s"] / report["per_write_commit"]["writes_per_s"], 2)
+    return report
+
+def main():
+    args = parse_args()
+    use_temp_database("bench-coalesce-")
+    os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Login throughput benchmark.
+
+Seeds a throwaway SQLite database, then fires concurrent POST /login requests
+at the app in-process and prints throughput and p50/p99 latency as JSON.
+
+    cd backend
+    python benchmarks/bench_login.py --concurrency 32 --requests 256 --hash-workers 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+from common import inprocess_client, percentile, use_temp_database
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--hash-workers", type=int, default=None,
+                        help="PASSWORD_HASH_WORKERS (0 hashes inline on the request thread)")
+    parser.add_argument("--rounds", type=int, default=12, help="BCRYPT_ROUNDS")
+    return parser.parse_args()
+
+async def run(args):
+    async with inprocess_client() as client:
+        for i in range(args.users):
+            await client.post("/api/v1/register", json={
+                "email": f"bench{i}@example.com",
+                "username": f"bench{i}",
+                "password": "benchmark-password",
+            })
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+        latencies = []
+
+        async def login(i):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post("/api/v1/login", data={
+                    "username": f"bench{i % args.users}",
+                    "password": "benchmark-password",
+                })
+                latencies.append(time.perf_counter() - started)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(login(i) for i in range(args.requests)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "hash_workers": args.hash_workers,
+        "bcrypt_rounds": args.rounds,
+        "throughput_rps": round(args.requests / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 2),
+    }
+
+def main():
+    args = parse_args()
+    use_temp_database("bench-login-")
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    if args.hash_workers is not None:
+        os.environ["PASSWORD_HASH_WORKERS"] = str(args.hash_workers)
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+if __name__ == "__main__":
+    main()
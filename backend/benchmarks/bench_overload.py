@@ -0,0 +1,138 @@
+"""Overload benchmark for admission control.
+
+Seeds one user with --todos todos, starts uvicorn, measures the capacity of
+GET /todos?limit=--page-size with a short closed loop, then offers an
+open-loop load of --overload times that capacity for --duration seconds:
+requests arrive on schedule whether or not earlier ones have finished, as
+they would from many independent clients. This runs once with admission
+control off and once with MAX_CONCURRENT_REQUESTS=--max-concurrent.
+
+Without it, the backlog grows for the whole run and so does everyone's
+latency, until requests time out waiting for a pooled connection; with it,
+excess requests are shed with 503 and the ones admitted keep a bounded
+p99. Prints JSON.
+
+    cd backend
+    python benchmarks/bench_overload.py --overload 2 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import time
+from urllib.parse import urlencode
+
+from common import latency_summary, use_temp_database, uvicorn_server
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--todos", type=int, default=2000)
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--overload", type=float, default=2.0, help="Offered load as a multiple of capacity")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of offered load per mode")
+    parser.add_argument("--max-concurrent", type=int, default=16)
+    parser.add_argument("--max-queued", type=int, default=16)
+    parser.add_argument("--queue-timeout-ms", type=int, default=250)
+    return parser.parse_args()
+
+def client(port):
+    import httpx
+
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=1000)
+    return httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None, limits=limits)
+
+async def capacity(port, params, headers, seconds=3.0, concurrency=8):
+    """Requests per second the server sustains with a few clients in a closed loop"""
+    completed = 0
+    async with client(port) as http:
+        deadline = time.perf_counter() + seconds
+
+        async def worker():
+            nonlocal completed
+            while time.perf_counter() < deadline:
+                (await http.get("/api/v1/todos/", params=params, headers=headers)).raise_for_status()
+                completed += 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return completed / seconds
+
+async def raw_get(port, target, headers):
+    """One GET on a fresh connection; returns the status. httpx's pool bookkeeping slows
+    down with thousands of concurrent connections and would make the client the bottleneck"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        lines = [f"GET {target} HTTP/1.1", f"Host: 127.0.0.1:{port}", "Connection: close"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode())
+        status = int((await reader.readline()).split()[1])
+        while await reader.read(65536):
+            pass
+        return status
+    finally:
+        writer.close()
+
+async def offer(port, params, headers, rate, duration):
+    target = "/api/v1/todos/?" + urlencode(params)
+    ok, shed, failed = [], [], []
+
+    async def one():
+        started = time.perf_counter()
+        try:
+            status = await raw_get(port, target, headers)
+        except OSError:
+            status = None
+        outcome = ok if status == 200 else shed if status in (429, 503) else failed
+        outcome.append(time.perf_counter() - started)
+
+    tasks = []
+    started = time.perf_counter()
+    for n in range(int(rate * duration)):
+        delay = started + n / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one()))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    return {
+        "offered": len(tasks),
+        "ok": len(ok),
+        "shed": len(shed),
+        "failed": len(failed),
+        "goodput_rps": round(len(ok) / elapsed, 1),
+        "ok_latency": latency_summary(ok),
+        "shed_latency": latency_summary(shed),
+        "failed_latency": latency_summary(failed),
+    }
+
+def main():
+    args = parse_args()
+    use_temp_database("bench-overload-")
+    from bench_api import seed_database
+    from app.services.user_service import UserService
+
+    seed_database(argparse.Namespace(users=1, todos=args.todos, subtasks=2, tags=2, tag_vocabulary=50, seed=1))
+    headers = {"Authorization": "Bearer " + UserService.create_access_token({"sub": "bench0"})}
+    params = {"limit": args.page_size}
+    # Every request builds its page; a cached body would hide the overload
+    base_env = {
+        "RESPONSE_CACHE_SIZE": "0",
+        "STATS_RECONCILE_INTERVAL_SECONDS": "0", "SYNC_PURGE_INTERVAL_SECONDS": "0", "DUE_SCAN_INTERVAL_SECONDS": "0",
+    }
+    modes = {
+        "unlimited": {"MAX_CONCURRENT_REQUESTS": "0"},
+        "admission_control": {
+            "MAX_CONCURRENT_REQUESTS": str(args.max_concurrent),
+            "MAX_QUEUED_REQUESTS": str(args.max_queued),
+            "QUEUE_TIMEOUT_MS": str(args.queue_timeout_ms),
+        },
+    }
+    report = {"todos": args.todos, "page_size": args.page_size, "overload": args.overload, "duration_s": args.duration}
+    with uvicorn_server({**base_env, **modes["unlimited"]}) as server:
+        report["capacity_rps"] = round(asyncio.run(capacity(server.port, params, headers)), 1)
+    rate = report["capacity_rps"] * args.overload
+    for name, env in modes.items():
+        with uvicorn_server({**base_env, **env}) as server:
+            report[name] = {**env, **asyncio.run(offer(server.port, params, headers, rate, args.duration))}
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Full-text search benchmark.
+
+Seeds one user with --todos todos (through /todos/batch, so the index is
+maintained the same way as in production), then runs --queries searches
+and prints p50/p99 latency as JSON. Run once per backend:
+
+    cd backend
+    python benchmarks/bench_search.py --todos 100000 --backend fts5
+    python benchmarks/bench_search.py --todos 100000 --backend memory
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+from common import inprocess_client, percentile, use_temp_database
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--todos", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--vocabulary", type=int, default=5000)
+    parser.add_argument("--backend", choices=["fts5", "memory"], default="fts5")
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+async def run(args):
+    rng = random.Random(args.seed)
+    words = [f"word{i}" for i in range(args.vocabulary)]
+
+    def sentence(low, high):
+        return " ".join(rng.choice(words) for _ in range(rng.randint(low, high)))
+
+    async with inprocess_client(timeout=None) as client:
+        await client.post("/api/v1/register", json={
+            "email": "bench@example.com", "username": "bench", "password": "benchmark-password",
+        })
+        token = (await client.post("/api/v1/login", data={
+            "username": "bench", "password": "benchmark-password",
+        })).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        started = time.perf_counter()
+        for start in range(0, args.todos, 5000):
+            items = [
+                {"text": sentence(3, 8), "description": sentence(5, 20), "category": "work"}
+                for _ in range(min(5000, args.todos - start))
+            ]
+            (await client.post("/api/v1/todos/batch", json={"items": items}, headers=headers)).raise_for_status()
+        seed_elapsed = time.perf_counter() - started
+
+        async def search(params):
+            started = time.perf_counter()
+            response = await client.get("/api/v1/todos/search", params=params, headers=headers)
+            response.raise_for_status()
+            return time.perf_counter() - started
+
+        first_query = await search({"q": rng.choice(words)})
+        exact = [await search({"q": rng.choice(words), "prefix": "false"}) for _ in range(args.queries)]
+        prefixed = [await search({"q": rng.choice(words)[:6]}) for _ in range(args.queries)]
+        multi = [
+            await search({"q": f"{rng.choice(words)} {rng.choice(words)[:7]}"}) for _ in range(args.queries)
+        ]
+
+    def summary(samples):
+        return {
+            "p50_ms": round(percentile(samples, 50) * 1000, 2),
+            "p99_ms": round(percentile(samples, 99) * 1000, 2),
+        }
+
+    return {
+        "backend": args.backend,
+        "todos": args.todos,
+        "seed_rows_per_s": round(args.todos / seed_elapsed, 1),
+        "first_query_ms": round(first_query * 1000, 2),
+        "exact_term": summary(exact),
+        "prefix_term": summary(prefixed),
+        "two_terms": summary(multi),
+    }
+
+def main():
+    args = parse_args()
+    use_temp_database("bench-search-")
+    os.environ["SEARCH_BACKEND"] = args.backend
+    os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+    os.environ.setdefault("BATCH_MAX_ITEMS", "5000")
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""List serialization benchmark.
+
+Seeds one user's todos (with subtasks and tags) and measures the CPU time
+per item to load and encode pages of GET /todos, comparing:
+
+  orm_pydantic  ORM entities with selectinload, revalidated into
+                schemas.todo.Todo and dumped by Pydantic (the old path)
+  rows_stdlib   column-selected rows turned into plain dicts, stdlib json
+  rows_orjson   the same rows encoded with orjson (the default path)
+
+Every path produces the same bytes; that is checked before timing. Also
+times a full in-process GET /todos request per page. Prints JSON.
+
+    cd backend
+    python benchmarks/bench_serialization.py --todos 5000 --page-sizes 100,500
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import List
+
+from common import inprocess_client, use_temp_database
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--todos", type=int, default=5000)
+    parser.add_argument("--subtasks", type=int, default=3, help="Subtasks per todo")
+    parser.add_argument("--tags", type=int, default=2, help="Tags per todo")
+    parser.add_argument("--page-sizes", default="100,500")
+    parser.add_argument("--repeat", type=int, default=20, help="Pages loaded per measurement")
+    return parser.parse_args()
+
+def cpu_per_item(fn, items, repeat):
+    """Process CPU time per item in microseconds, best of three rounds"""
+    fn()
+    best = None
+    for _ in range(3):
+        started = time.process_time()
+        for _ in range(repeat):
+            fn()
+        elapsed = time.process_time() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best / (repeat * items) * 1e6, 2)
+
+def measure_paths(page_size, repeat):
+    from pydantic import TypeAdapter
+    from sqlalchemy.orm import selectinload
+    from app.database.base import SessionLocal
+    from app.models.todo import Todo as TodoModel
+    from app.schemas.todo import Todo
+    from app.services.todo_service import TodoService
+    from app.utils import encoding
+
+    todo_list = TypeAdapter(List[Todo])
+    orjson = encoding.orjson
+    db = SessionLocal()
+
+    def orm_pydantic():
+        db.expunge_all()
+        todos = (
+            db.query(TodoModel)
+            .options(selectinload(TodoModel.subtasks), selectinload(TodoModel.tags))
+            .filter(TodoModel.user_id == 1)
+            .order_by(TodoModel.id)
+            .limit(page_size)
+            .all()
+        )
+        return todo_list.dump_json(todo_list.validate_python(todos, from_attributes=True))
+
+    def rows(encoder):
+        def run():
+            encoding.orjson = encoder
+            try:
+                return encoding.encode_json(TodoService.get_todos(db, 1, limit=page_size))
+            finally:
+                encoding.orjson = orjson
+        return run
+
+    paths = {"orm_pydantic": orm_pydantic, "rows_stdlib": rows(None), "rows_orjson": rows(orjson)}
+    outputs = {name: fn() for name, fn in paths.items()}
+    assert len(set(outputs.values())) == 1, "serialization paths disagree"
+    try:
+        return {f"{name}_us_per_item": cpu_per_item(fn, page_size, repeat) for name, fn in paths.items()}
+    finally:
+        db.close()
+
+async def measure_requests(page_sizes, repeat):
+    from app.services.user_service import UserService
+
+    headers = {"Authorization": "Bearer " + UserService.create_access_token({"sub": "bench0"})}
+    results = {}
+    async with inprocess_client() as client:
+        for page_size in page_sizes:
+            params = {"limit": page_size}
+            (await client.get("/api/v1/todos/", params=params, headers=headers)).raise_for_status()
+            started = time.process_time()
+            for _ in range(repeat):
+                (await client.get("/api/v1/todos/", params=params, headers=headers)).raise_for_status()
+            results[page_size] = round((time.process_time() - started) / (repeat * page_size) * 1e6, 2)
+    return results
+
+def main():
+    args = parse_args()
+    use_temp_database("bench-serialization-")
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+    # Every request must build its body; a cached one would measure nothing
+    os.environ["RESPONSE_CACHE_SIZE"] = "0"
+    from bench_api import seed_database
+
+    seed_database(argparse.Namespace(
+        users=1, todos=args.todos, subtasks=args.subtasks, tags=args.tags, tag_vocabulary=50, seed=1,
+    ))
+    page_sizes = [int(size) for size in args.page_sizes.split(",")]
+    report = {"todos": args.todos, "subtasks": args.subtasks, "tags": args.tags, "pages": {}}
+    requests = asyncio.run(measure_requests(page_sizes, args.repeat))
+    for page_size in page_sizes:
+        report["pages"][page_size] = {
+            **measure_paths(page_size, args.repeat),
+            "get_todos_request_us_per_item": requests[page_size],
+        }
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
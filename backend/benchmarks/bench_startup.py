@@ -0,0 +1,82 @@
+"""Worker cold-start benchmark.
+
+Seeds a SQLite database with --todos todos (schema, search index and all),
+then starts --runs fresh interpreters that import main and run the app's
+startup, and prints the median import and startup times as JSON.
+
+    cd backend
+    python benchmarks/bench_startup.py --todos 200000 --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+
+from common import BACKEND_DIR, use_temp_database
+
+PROBE = """
+import asyncio, json, time
+started = time.perf_counter()
+from main import app
+imported = time.perf_counter()
+
+async def startup():
+    async with app.router.lifespan_context(app):
+        return time.perf_counter()
+
+ready = asyncio.run(startup())
+print(json.dumps({"import_ms": (imported - started) * 1000, "startup_ms": (ready - imported) * 1000}))
+"""
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--todos", type=int, default=200000)
+    parser.add_argument("--runs", type=int, default=10)
+    return parser.parse_args()
+
+def seed_database(todos):
+    from sqlalchemy import insert
+    from app.database.base import get_engine
+    from app.database.migrations import upgrade_schema
+    from app.models.todo import Todo
+    from app.models.user import User
+    from app.services.search import search_index
+
+    engine = get_engine()
+    upgrade_schema(engine)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": 1, "email": "bench@example.com", "username": "bench", "hashed_password": "x"}])
+        for start in range(0, todos, 10000):
+            conn.execute(insert(Todo), [
+                {"user_id": 1, "text": f"todo {i}", "description": f"description {i}", "created_at": now, "updated_at": now}
+                for i in range(start, min(start + 10000, todos))
+            ])
+    search_index.ensure_schema(engine)
+    engine.dispose()
+
+def main():
+    args = parse_args()
+    use_temp_database("bench-startup-")
+    seed_database(args.todos)
+    env = {**os.environ, "STATS_RECONCILE_INTERVAL_SECONDS": "0", "SYNC_PURGE_INTERVAL_SECONDS": "0",
+           "DUE_SCAN_INTERVAL_SECONDS": "0"}
+    samples = []
+    for _ in range(args.runs):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE], cwd=BACKEND_DIR, env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    print(json.dumps({
+        "todos": args.todos,
+        "runs": args.runs,
+        "import_ms": round(statistics.median(s["import_ms"] for s in samples), 1),
+        "startup_ms": round(statistics.median(s["startup_ms"] for s in samples), 1),
+        "total_ms": round(statistics.median(s["import_ms"] + s["startup_ms"] for s in samples), 1),
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
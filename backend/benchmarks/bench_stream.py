@@ -0,0 +1,116 @@
+"""Change-feed load test.
+
+Starts uvicorn in a subprocess on a throwaway SQLite database, opens
+--subscribers idle /todos/stream connections spread over --users users,
+then reports the server's memory per subscriber and how long one write
+takes to reach every subscriber of that user, as JSON.
+
+    cd backend
+    python benchmarks/bench_stream.py --subscribers 5000 --users 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from common import percentile, rss_bytes, sqlite_url, uvicorn_server
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--writes", type=int, default=20, help="Todos created per fan-out measurement")
+    return parser.parse_args()
+
+class Subscriber:
+    """A bare-socket SSE client; thousands of these are far lighter than HTTP client streams"""
+
+    def __init__(self, port: int, token: str):
+        self.port = port
+        self.token = token
+        self.changes = asyncio.Queue()
+        self.ready = asyncio.Event()
+
+    async def run(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        writer.write(
+            f"GET /api/v1/todos/stream?access_token={self.token} HTTP/1.1\r\n"
+            f"Host: bench\r\nAccept: text/event-stream\r\n\r\n".encode()
+        )
+        await writer.drain()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                if line.startswith(b"event: ready"):
+                    self.ready.set()
+                elif line.startswith(b"event: change"):
+                    self.changes.put_nowait(time.perf_counter())
+        finally:
+            writer.close()
+
+async def run(args, port, server_pid):
+    import httpx
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None) as client:
+        tokens = []
+        for i in range(args.users):
+            await client.post("/api/v1/register", json={
+                "email": f"bench{i}@example.com", "username": f"bench{i}", "password": "benchmark-password",
+            })
+            response = await client.post("/api/v1/login", data={
+                "username": f"bench{i}", "password": "benchmark-password",
+            })
+            tokens.append(response.json()["access_token"])
+
+        baseline_rss = rss_bytes(server_pid)
+        subscribers = [Subscriber(port, tokens[i % args.users]) for i in range(args.subscribers)]
+        tasks = [asyncio.create_task(subscriber.run()) for subscriber in subscribers]
+        started = time.perf_counter()
+        await asyncio.gather(*(subscriber.ready.wait() for subscriber in subscribers))
+        connect_elapsed = time.perf_counter() - started
+        await asyncio.sleep(1)
+        subscribed_rss = rss_bytes(server_pid)
+
+        # Fan-out: one write by user 0 must reach every one of its subscribers
+        audience = subscribers[::args.users]
+        headers = {"Authorization": f"Bearer {tokens[0]}"}
+        fanout = []
+        for i in range(args.writes):
+            sent = time.perf_counter()
+            await client.post("/api/v1/todos/", json={"text": f"fan-out {i}", "category": "work"}, headers=headers)
+            received = [await subscriber.changes.get() for subscriber in audience]
+            fanout.append(max(received) - sent)
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    return {
+        "subscribers": args.subscribers,
+        "users": args.users,
+        "connect_all_s": round(connect_elapsed, 2),
+        "server_rss_mb_idle": round(baseline_rss / 2**20, 1),
+        "server_rss_mb_subscribed": round(subscribed_rss / 2**20, 1),
+        "server_kb_per_subscriber": round((subscribed_rss - baseline_rss) / 1024 / args.subscribers, 1),
+        "subscribers_per_write": len(audience),
+        "fanout_p50_ms": round(percentile(fanout, 50) * 1000, 2),
+        "fanout_p99_ms": round(percentile(fanout, 99) * 1000, 2),
+    }
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix="bench-stream-")
+    env = {
+        "DATABASE_URL": sqlite_url(os.path.join(workdir, "bench.db")),
+        "BCRYPT_ROUNDS": "4",
+        "PASSWORD_HASH_WORKERS": "0",
+    }
+    with uvicorn_server(env, ["--backlog", str(max(2048, args.subscribers))]) as server:
+        print(json.dumps(asyncio.run(run(args, server.port, server.pid)), indent=2))
+
+if __name__ == "__main__":
+    main()
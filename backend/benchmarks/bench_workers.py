@@ -0,0 +1,168 @@
+"""Multi-worker scaling benchmark.
+
+Seeds --users users with --todos todos each, then for each worker count in
+--workers starts `serve.py --workers N` with CACHE_CHANNEL=database (plus
+one single-worker run with the local channel, to show what coherence
+costs) and drives read-heavy traffic for --duration seconds: GET /todos
+pages and single todos, with --write-ratio of requests updating a todo so
+the cross-worker invalidation path stays busy. Load comes from
+--client-processes processes with --connections keep-alive connections
+each, so the client is not the bottleneck. Prints requests per second and
+latency per worker count, with scaling relative to one worker on the
+database channel, as JSON.
+
+Scaling is bounded by the cores available to server and client together.
+
+    cd backend
+    python benchmarks/bench_workers.py --workers 1,2,4 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import time
+
+from common import BACKEND_DIR, free_port, latency_summary, use_temp_database
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--todos", type=int, default=200, help="Todos per user")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--write-ratio", type=float, default=0.05)
+    parser.add_argument("--client-processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--connections", type=int, default=16, help="Keep-alive connections per client process")
+    return parser.parse_args()
+
+class Connection:
+    """Minimal keep-alive HTTP/1.1 client; httpx costs more CPU per request than the server under test"""
+
+    def __init__(self, port):
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, target, headers, body=b""):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+        lines = [f"{method} {target} HTTP/1.1", f"Host: 127.0.0.1:{self.port}", f"Content-Length: {len(body)}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode().partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        await self.reader.readexactly(length)
+        return status
+
+async def drive(port, accounts, duration, write_ratio, connections, seed):
+    rng = random.Random(seed)
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        connection = Connection(port)
+        while time.perf_counter() < deadline:
+            token, todo_ids = rng.choice(accounts)
+            headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+            roll = rng.random()
+            started = time.perf_counter()
+            if roll < write_ratio:
+                body = json.dumps({"text": f"edit {rng.random()}"}).encode()
+                status = await connection.request("PUT", f"/api/v1/todos/{rng.choice(todo_ids)}", headers, body)
+            elif roll < 0.5:
+                status = await connection.request("GET", "/api/v1/todos/?limit=50", headers)
+            else:
+                status = await connection.request("GET", f"/api/v1/todos/{rng.choice(todo_ids)}", headers)
+            latencies.append(time.perf_counter() - started)
+            errors += status >= 400
+
+    await asyncio.gather(*(worker() for _ in range(connections)))
+    return latencies, errors
+
+def client_process(port, accounts, duration, write_ratio, connections, seed, results):
+    results.put(asyncio.run(drive(port, accounts, duration, write_ratio, connections, seed)))
+
+def seed(args):
+    from bench_api import seed_database
+    from app.services.user_service import UserService
+
+    todo_ids = seed_database(argparse.Namespace(
+        users=args.users, todos=args.todos, subtasks=2, tags=2, tag_vocabulary=50, seed=1,
+    ))
+    return [
+        (UserService.create_access_token({"sub": username}), ids)
+        for username, ids in todo_ids.items()
+    ]
+
+def run(workers, channel, accounts, args):
+    port = free_port()
+    env = {
+        **os.environ,
+        "CACHE_CHANNEL": channel,
+        "STATS_RECONCILE_INTERVAL_SECONDS": "0", "SYNC_PURGE_INTERVAL_SECONDS": "0", "DUE_SCAN_INTERVAL_SECONDS": "0",
+        "MAX_CONCURRENT_REQUESTS": "0",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "serve.py", "--workers", str(workers), "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    try:
+        for _ in range(300):
+            try:
+                asyncio.run(Connection(port).request("GET", "/", {}))
+                break
+            except OSError:
+                time.sleep(0.1)
+        # Let every worker finish its startup before measuring
+        time.sleep(1 + workers * 0.5)
+        results = multiprocessing.Queue()
+        clients = [
+            multiprocessing.Process(target=client_process, args=(
+                port, accounts, args.duration, args.write_ratio, args.connections, n, results,
+            ))
+            for n in range(args.client_processes)
+        ]
+        for client in clients:
+            client.start()
+        latencies, errors = [], 0
+        for _ in clients:
+            client_latencies, client_errors = results.get()
+            latencies += client_latencies
+            errors += client_errors
+        for client in clients:
+            client.join()
+    finally:
+        server.terminate()
+        server.wait()
+    return {"requests": len(latencies), "errors": errors, "rps": round(len(latencies) / args.duration, 1),
+            **latency_summary(latencies)}
+
+def main():
+    args = parse_args()
+    use_temp_database("bench-workers-")
+    accounts = seed(args)
+    report = {"cpus": os.cpu_count(), "users": args.users, "todos_per_user": args.todos,
+              "write_ratio": args.write_ratio, "results": {}}
+    report["results"]["1_local"] = run(1, "local", accounts, args)
+    worker_counts = [int(n) for n in args.workers.split(",")]
+    for workers in worker_counts:
+        report["results"][str(workers)] = run(workers, "database", accounts, args)
+    baseline = report["results"][str(min(worker_counts))]["rps"]
+    for workers in worker_counts:
+        result = report["results"][str(workers)]
+        result["scaling"] = round(result["rps"] / baseline, 2)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
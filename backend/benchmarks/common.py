@@ -0,0 +1,87 @@
+"""Helpers shared by the benchmark scripts in this directory."""
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def latency_summary(samples: Sequence[float]) -> Dict[str, float]:
+    """p50/p95/p99 and mean of latencies given in seconds, reported in milliseconds"""
+    if not samples:
+        return {}
+    return {
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 3),
+    }
+
+def sqlite_url(path: str) -> str:
+    return f"sqlite:///{path}?check_same_thread=False"
+
+def use_temp_database(prefix: str) -> str:
+    """Point this process's app at a fresh SQLite file and make the backend importable"""
+    workdir = tempfile.mkdtemp(prefix=prefix)
+    os.environ["DATABASE_URL"] = sqlite_url(os.path.join(workdir, "bench.db"))
+    # Benchmarks drive all their load from one address and a few users, far past any per-client limit
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    return workdir
+
+@asynccontextmanager
+async def inprocess_client(**options: Any) -> AsyncIterator[Any]:
+    """An httpx client calling main:app in this process, with the app lifespan (schema setup, jobs) running"""
+    import httpx
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", **options) as client:
+            yield client
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def rss_bytes(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+@contextmanager
+def uvicorn_server(env: Dict[str, str], extra_args: Optional[List[str]] = None) -> Iterator[subprocess.Popen]:
+    """Run main:app under uvicorn in a subprocess; the process gets a .port attribute"""
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning",
+         *(extra_args or [])],
+        cwd=BACKEND_DIR, env={**os.environ, **env},
+    )
+    server.port = port
+    try:
+        for _ in range(300):
+            if server.poll() is not None:
+                raise RuntimeError("uvicorn exited during startup")
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        yield server
+    finally:
+        server.terminate()
+        server.wait()
@@ -1,36 +1,112 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from app.routers import todo, user
-from app.database.base import Base, engine
-from app.utils.config import settings
-
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
-app = FastAPI(
-    title=settings.PROJECT_NAME,
-    version=settings.VERSION,
-    docs_url="/docs",
-    redoc_url="/redoc",
-)
-
-# CORS middleware configuration
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000"],  # Frontend URL
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Include routers
-app.include_router(user.router, prefix=settings.API_V1_STR)
-app.include_router(todo.router, prefix=settings.API_V1_STR)
-
-@app.get("/")
-def read_root():
-    return {
-        "message": "Welcome to Todo App API",
-        "docs": "/docs",
-        "redoc": "/redoc"
-    } 
\ No newline at end of file
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from fastapi.middleware.cors import CORSMiddleware
+from app.routers import todo, user
+from app.database.base import dispose_engines, get_async_engine, get_engine
+from app.database.migrations import upgrade_schema
+from app.services.channel import invalidation_channel, purge_cache_invalidations
+from app.services.coalesce import write_coalescer
+from app.services.rebalance import rank_rebalancer
+from app.services.reminders import sweep_due_dates
+from app.services.search import search_index
+from app.services.stats import reconcile_all_stats
+from app.services.sync import purge_expired_tombstones
+from app.utils.config import settings
+from app.utils.hashing import shutdown_hash_pool
+from app.utils.metrics import MetricsMiddleware, TimedJSONResponse, metrics_registry
+from app.utils.periodic import run_periodically
+from app.utils.ratelimit import ConcurrencyLimitMiddleware, RateLimit, RateLimitMiddleware, create_bucket_store
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Connections and schema work happen here, per worker, rather than as import side effects
+    engine = get_engine()
+    get_async_engine()
+    if settings.DB_AUTO_MIGRATE:
+        await asyncio.to_thread(upgrade_schema, engine)
+    await asyncio.to_thread(search_index.ensure_schema, engine)
+    jobs = [
+        (settings.STATS_RECONCILE_INTERVAL_SECONDS, reconcile_all_stats, "Stats reconciliation"),
+        (settings.SYNC_PURGE_INTERVAL_SECONDS, purge_expired_tombstones, "Tombstone purge"),
+        (settings.DUE_SCAN_INTERVAL_SECONDS, sweep_due_dates, "Due-date sweep"),
+    ]
+    if invalidation_channel.enabled:
+        jobs.append((settings.CACHE_CHANNEL_RETENTION_SECONDS, purge_cache_invalidations, "Cache invalidation purge"))
+    tasks = [
+        asyncio.create_task(run_periodically(interval, job, name))
+        for interval, job, name in jobs
+        if interval > 0
+    ]
+    if invalidation_channel.enabled:
+        tasks.append(asyncio.create_task(invalidation_channel.run()))
+    yield
+    for task in tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await write_coalescer.close()
+    await rank_rebalancer.close()
+    shutdown_hash_pool()
+    await dispose_engines()
+
+app = FastAPI(
+    title=settings.PROJECT_NAME,
+    version=settings.VERSION,
+    lifespan=lifespan,
+    default_response_class=TimedJSONResponse,
+    docs_url="/docs",
+    redoc_url="/redoc",
+)
+
+# Rate limits run before admission control (the last added middleware runs first), and both sit
+# inside CORS so that rejections still carry CORS headers
+if settings.MAX_CONCURRENT_REQUESTS > 0:
+    app.add_middleware(
+        ConcurrencyLimitMiddleware,
+        max_concurrent=settings.MAX_CONCURRENT_REQUESTS,
+        max_queued=settings.MAX_QUEUED_REQUESTS,
+        queue_timeout_ms=settings.QUEUE_TIMEOUT_MS,
+        exempt_paths=[f"{settings.API_V1_STR}/todos/stream"],
+    )
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(
+        RateLimitMiddleware,
+        store=create_bucket_store(),
+        per_ip=RateLimit(settings.RATE_LIMIT_IP_PER_SECOND, settings.RATE_LIMIT_IP_BURST),
+        per_user=RateLimit(settings.RATE_LIMIT_USER_PER_SECOND, settings.RATE_LIMIT_USER_BURST),
+        auth_per_ip=RateLimit(settings.RATE_LIMIT_AUTH_PER_MINUTE / 60, settings.RATE_LIMIT_AUTH_BURST),
+        auth_paths=[f"{settings.API_V1_STR}/{name}" for name in ("login", "register", "refresh")],
+        path_prefix=settings.API_V1_STR,
+    )
+
+# CORS middleware configuration
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["http://localhost:3000"],  # Frontend URL
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
+)
+
+# Per-route latency, SQL and serialization metrics; outermost so it times the whole stack
+app.add_middleware(MetricsMiddleware, slow_request_ms=settings.SLOW_REQUEST_LOG_MS)
+
+# Include routers
+app.include_router(user.router, prefix=settings.API_V1_STR)
+app.include_router(todo.router, prefix=settings.API_V1_STR)
+
+@app.get("/")
+def read_root():
+    return {
+        "message": "Welcome to Todo App API",
+        "docs": "/docs",
+        "redoc": "/redoc"
+    }
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
\ No newline at end of file
@@ -0,0 +1,45 @@
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+from app.database.base import Base, SQLALCHEMY_DATABASE_URL
+# Imported for their side effect of registering tables on Base.metadata (autogenerate compares against it)
+from app.models import job, todo, user  # noqa: F401
+
+config = context.config
+target_metadata = Base.metadata
+
+# The app passes its own connection (see app.database.migrations) and keeps its logging setup
+connection = config.attributes.get("connection")
+if connection is None and config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+def include_name(name, type_, parent_names) -> bool:
+    # The FTS5 search index and its shadow tables are managed by app.services.search, not by models
+    return not (type_ == "table" and name.startswith("todo_search"))
+
+def configure(**options) -> None:
+    # SQLite cannot ALTER most constraints; batch mode lets autogenerate emit table rebuilds instead
+    context.configure(target_metadata=target_metadata, render_as_batch=True, include_name=include_name, **options)
+
+def run_migrations_offline() -> None:
+    configure(url=SQLALCHEMY_DATABASE_URL, literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online() -> None:
+    if connection is not None:
+        configure(connection=connection)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+    bind = create_engine(SQLALCHEMY_DATABASE_URL, poolclass=pool.NullPool)
+    with bind.connect() as conn:
+        configure(connection=conn)
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,83 @@
+"""Baseline: the schema create_all produced before migrations were introduced
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("email", sa.String(255), nullable=False),
+        sa.Column("username", sa.String(50), nullable=False),
+        sa.Column("hashed_password", sa.String(255), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+
+    op.create_table(
+        "todos",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("text", sa.String(500), nullable=False),
+        sa.Column("description", sa.String(1000)),
+        sa.Column("completed", sa.Boolean()),
+        sa.Column("stage", sa.Enum("todo", "in_progress", "done", name="stageenum")),
+        sa.Column("category", sa.Enum("work", "personal", "shopping", "health", "other", name="categoryenum")),
+        sa.Column("priority", sa.Enum("low", "medium", "high", name="priorityenum")),
+        sa.Column("due_date", sa.DateTime()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_todos_id", "todos", ["id"])
+
+    op.create_table(
+        "subtasks",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("text", sa.String(500), nullable=False),
+        sa.Column("completed", sa.Boolean()),
+        sa.Column("todo_id", sa.Integer(), sa.ForeignKey("todos.id")),
+        sa.Column("created_at", sa.DateTime()),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_subtasks_id", "subtasks", ["id"])
+
+    op.create_table(
+        "tags",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(50)),
+        sa.Column("created_at", sa.DateTime()),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_tags_id", "tags", ["id"])
+    op.create_index("ix_tags_name", "tags", ["name"], unique=True)
+
+    op.create_table(
+        "todo_tags",
+        sa.Column("todo_id", sa.Integer(), sa.ForeignKey("todos.id"), nullable=False),
+        sa.Column("tag_id", sa.Integer(), sa.ForeignKey("tags.id"), nullable=False),
+        sa.PrimaryKeyConstraint("todo_id", "tag_id"),
+    )
+
+def downgrade() -> None:
+    op.drop_table("todo_tags")
+    op.drop_table("tags")
+    op.drop_table("subtasks")
+    op.drop_table("todos")
+    op.drop_table("users")
+    sa.Enum(name="stageenum").drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name="categoryenum").drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name="priorityenum").drop(op.get_bind(), checkfirst=True)
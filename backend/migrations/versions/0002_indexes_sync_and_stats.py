@@ -0,0 +1,127 @@
+"""Composite todo indexes, delta-sync versions and tombstones, stats counters, job watermarks
+
+Databases created by create_all after some of these objects were added to the models already have
+them, so each step checks before creating.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+TODO_INDEXES = {
+    "ix_todos_user_id_id": ["user_id", "id"],
+    "ix_todos_user_id_created_at": ["user_id", "created_at", "id"],
+    "ix_todos_user_id_updated_at": ["user_id", "updated_at", "id"],
+    "ix_todos_user_id_due_date": ["user_id", "due_date", "id"],
+    "ix_todos_user_id_stage": ["user_id", "stage", "id"],
+    "ix_todos_user_id_priority": ["user_id", "priority", "id"],
+    "ix_todos_user_id_category": ["user_id", "category", "id"],
+    "ix_todos_user_id_completed": ["user_id", "completed", "id"],
+    "ix_todos_user_id_completed_due_date": ["user_id", "completed", "due_date"],
+    "ix_todos_user_id_version": ["user_id", "version", "id"],
+    "ix_todos_completed_due_date": ["completed", "due_date", "id"],
+}
+
+def _inspector():
+    # Offline (--sql) runs have no database to inspect and emit every step
+    return None if context.is_offline_mode() else sa.inspect(op.get_bind())
+
+def _has_column(table: str, column: str) -> bool:
+    inspector = _inspector()
+    return inspector is not None and any(c["name"] == column for c in inspector.get_columns(table))
+
+def _has_table(table: str) -> bool:
+    inspector = _inspector()
+    return inspector is not None and inspector.has_table(table)
+
+def _create_index(name: str, table: str, columns, **options) -> None:
+    inspector = _inspector()
+    if inspector is None or name not in {index["name"] for index in inspector.get_indexes(table)}:
+        op.create_index(name, table, columns, **options)
+
+def _todo_tags_0001() -> sa.Table:
+    """todo_tags as created by 0001, for --sql runs where batch mode cannot reflect it"""
+    metadata = sa.MetaData()
+    for referenced in ("todos", "tags"):
+        sa.Table(referenced, metadata, sa.Column("id", sa.Integer(), primary_key=True))
+    return sa.Table(
+        "todo_tags", metadata,
+        sa.Column("todo_id", sa.Integer(), sa.ForeignKey("todos.id"), primary_key=True),
+        sa.Column("tag_id", sa.Integer(), sa.ForeignKey("tags.id"), primary_key=True),
+    )
+
+def upgrade() -> None:
+    for column in ("todo_version", "todo_purged_version"):
+        if not _has_column("users", column):
+            op.add_column("users", sa.Column(column, sa.Integer(), nullable=False, server_default="0"))
+    if not _has_column("todos", "version"):
+        op.add_column("todos", sa.Column("version", sa.Integer(), nullable=False, server_default="0"))
+
+    for name, columns in TODO_INDEXES.items():
+        _create_index(name, "todos", columns)
+    _create_index("ix_subtasks_todo_id", "subtasks", ["todo_id"])
+
+    if not _has_column("todo_tags", "user_id"):
+        # Batch mode rebuilds the table on SQLite, which cannot add a foreign key in place
+        with op.batch_alter_table("todo_tags", copy_from=_todo_tags_0001() if context.is_offline_mode() else None) as batch:
+            batch.add_column(sa.Column("user_id", sa.Integer()))
+            batch.create_foreign_key("fk_todo_tags_user_id", "users", ["user_id"], ["id"])
+    op.execute(
+        "UPDATE todo_tags SET user_id = (SELECT todos.user_id FROM todos WHERE todos.id = todo_tags.todo_id) "
+        "WHERE user_id IS NULL"
+    )
+    _create_index("ix_todo_tags_tag_id_user_id_todo_id", "todo_tags", ["tag_id", "user_id", "todo_id"])
+
+    if not _has_table("todo_stats"):
+        op.create_table(
+            "todo_stats",
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("field", sa.String(20), nullable=False),
+            sa.Column("value", sa.String(20), nullable=False),
+            sa.Column("count", sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint("user_id", "field", "value"),
+        )
+
+    if not _has_table("todo_tombstones"):
+        op.create_table(
+            "todo_tombstones",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("todo_id", sa.Integer(), nullable=False),
+            sa.Column("version", sa.Integer(), nullable=False),
+            sa.Column("deleted_at", sa.DateTime()),
+            sa.PrimaryKeyConstraint("id"),
+        )
+    _create_index("ix_todo_tombstones_deleted_at", "todo_tombstones", ["deleted_at"])
+    _create_index("ix_todo_tombstones_user_id_version", "todo_tombstones", ["user_id", "version"])
+
+    if not _has_table("job_watermarks"):
+        op.create_table(
+            "job_watermarks",
+            sa.Column("name", sa.String(50), nullable=False),
+            sa.Column("position", sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint("name"),
+        )
+
+def downgrade() -> None:
+    op.drop_table("job_watermarks")
+    op.drop_table("todo_tombstones")
+    op.drop_table("todo_stats")
+    op.drop_index("ix_todo_tags_tag_id_user_id_todo_id", table_name="todo_tags")
+    with op.batch_alter_table("todo_tags") as batch:
+        batch.drop_column("user_id")
+    op.drop_index("ix_subtasks_todo_id", table_name="subtasks")
+    for name in TODO_INDEXES:
+        op.drop_index(name, table_name="todos")
+    with op.batch_alter_table("todos") as batch:
+        batch.drop_column("version")
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("todo_purged_version")
+        batch.drop_column("todo_version")
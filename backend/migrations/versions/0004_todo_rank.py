@@ -0,0 +1,25 @@
+"""Todo rank for drag-and-drop order within a stage column
+
+Existing todos get an empty rank, which keeps their column order by id; a
+column is given real keys the first time a move needs room in it.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column("todos", sa.Column("rank", sa.String(64), nullable=False, server_default=""))
+    op.create_index("ix_todos_user_id_stage_rank", "todos", ["user_id", "stage", "rank"])
+
+def downgrade() -> None:
+    op.drop_index("ix_todos_user_id_stage_rank", table_name="todos")
+    with op.batch_alter_table("todos") as batch:
+        batch.drop_column("rank")
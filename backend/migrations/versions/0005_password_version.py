@@ -0,0 +1,24 @@
+"""Password version for refresh token revocation
+
+Refresh tokens were bound to a fingerprint of the password hash, which the
+transparent rehash on login also changes. They now carry this counter,
+bumped only when the password itself is changed.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("password_version", sa.Integer(), nullable=False, server_default="0"))
+
+def downgrade() -> None:
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("password_version")
@@ -0,0 +1,60 @@
+"""Production entry point: main:app under uvicorn with several worker processes.
+
+Migrations and the search schema are applied once here, before the workers
+start, instead of racing in every worker's startup. With more than one
+worker, CACHE_CHANNEL defaults to "database", so todo versions, ETags, the
+change stream and the principal cache stay coherent across workers. Rate
+limits with the default in-memory store apply per worker.
+
+    cd backend
+    python serve.py --workers 4 --port 8000
+"""
+import argparse
+import os
+import sys
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    parser.add_argument("--proxy-headers", action="store_true", help="Trust X-Forwarded-For/Proto from the proxy")
+    parser.add_argument("--log-level", default="info")
+    return parser.parse_args()
+
+def prepare_database() -> None:
+    from app.database.base import get_engine
+    from app.database.migrations import upgrade_schema
+    from app.services.search import search_index
+    from app.utils.config import settings
+
+    engine = get_engine()
+    if settings.DB_AUTO_MIGRATE:
+        upgrade_schema(engine)
+    search_index.ensure_schema(engine)
+    # Workers build their own engines; none of these connections may cross the fork
+    engine.dispose()
+
+def main():
+    args = parse_args()
+    if args.workers > 1:
+        # Settings are read once per process at import, so this must precede any app import
+        os.environ.setdefault("CACHE_CHANNEL", "database")
+        if os.environ["CACHE_CHANNEL"] != "database":
+            sys.exit("Several workers need CACHE_CHANNEL=database to keep their caches coherent")
+    prepare_database()
+    os.environ["DB_AUTO_MIGRATE"] = "false"
+
+    import uvicorn
+
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        proxy_headers=args.proxy_headers,
+        log_level=args.log_level,
+    )
+
+if __name__ == "__main__":
+    main()
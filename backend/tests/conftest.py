@@ -0,0 +1,17 @@
+"""Point the app at a throwaway database before any test module imports it; settings are read once at import."""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+DATABASE = Path(tempfile.mkdtemp(prefix="todo-tests-")) / "test.db"
+
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{DATABASE}",
+    RATE_LIMIT_ENABLED="false",
+    # Every request must run its queries; a cached body would make statement counts meaningless
+    RESPONSE_CACHE_SIZE="0",
+    BCRYPT_ROUNDS="4",
+)
+sys.path.insert(0, str(BACKEND_DIR))
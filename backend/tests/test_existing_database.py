@@ -0,0 +1,31 @@
+"""A database created before schema migrations, like the tracked todo_app.db, upgrades to the current models."""
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, insert, select
+
+from app.database.base import Base
+from app.database.migrations import upgrade_schema
+from app.models import job, todo, user  # noqa: F401
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+def test_pre_migration_database_upgrades(tmp_path):
+    database = tmp_path / "todo_app.db"
+    shutil.copy(BACKEND_DIR / "todo_app.db", database)
+    engine = create_engine(f"sqlite:///{database}")
+    try:
+        upgrade_schema(engine)
+        with engine.connect() as conn:
+            assert compare_metadata(MigrationContext.configure(conn), Base.metadata) == []
+        with engine.begin() as conn:
+            # Registration inserts no sync columns; the ones added since the baseline need server defaults
+            conn.execute(insert(user.User.__table__).values(
+                email="old@example.com", username="old", hashed_password="x", created_at=datetime.utcnow(),
+            ))
+            assert conn.scalar(select(user.User.todo_version).where(user.User.username == "old")) == 0
+    finally:
+        engine.dispose()
@@ -0,0 +1,56 @@
+"""The invalidation tail must not skip a row that commits after one with a higher id."""
+import json
+from datetime import datetime
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from app.models.job import CacheInvalidation
+from app.services.channel import InvalidationChannel
+
+def append(db, row_id, user_id):
+    db.execute(insert(CacheInvalidation.__table__).values(
+        id=row_id, kind="todos", user_id=user_id, version=None, payload=json.dumps({}), created_at=datetime.utcnow(),
+    ))
+    db.commit()
+
+def test_late_commit_with_lower_id_is_applied(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'channel.db'}")
+    CacheInvalidation.__table__.create(engine)
+    channel = InvalidationChannel(enabled=True, poll_ms=50, gap_seconds=30)
+    seen = []
+    channel.on("todos", lambda user_id, version, payload: seen.append(user_id))
+    try:
+        with Session(engine) as db:
+            append(db, 1, 1)
+            channel.poll(db)
+            # Ids 2 and 3 were taken by transactions still open when id 4 committed
+            append(db, 4, 4)
+            assert channel.poll(db) == 1
+            append(db, 2, 2)
+            assert channel.poll(db) == 1
+            assert channel.poll(db) == 0
+            append(db, 5, 5)
+            append(db, 3, 3)
+            assert channel.poll(db) == 2
+        assert seen == [4, 2, 3, 5]
+    finally:
+        engine.dispose()
+
+def test_gaps_expire(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'channel.db'}")
+    CacheInvalidation.__table__.create(engine)
+    channel = InvalidationChannel(enabled=True, poll_ms=50, gap_seconds=0)
+    seen = []
+    channel.on("todos", lambda user_id, version, payload: seen.append(user_id))
+    try:
+        with Session(engine) as db:
+            channel.poll(db)
+            # Id 1 rolled back; after gap_seconds it is no longer fetched
+            append(db, 2, 2)
+            channel.poll(db)
+            append(db, 1, 1)
+            assert channel.poll(db) == 0
+        assert seen == [2]
+    finally:
+        engine.dispose()
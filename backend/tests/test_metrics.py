@@ -0,0 +1,26 @@
+"""Metrics are labelled with the full route template clients call, not the router-relative one."""
+from fastapi.testclient import TestClient
+
+import main
+
+API = "/api/v1"
+
+def request_labels(client):
+    return [line for line in client.get("/metrics").text.splitlines() if line.startswith("http_requests_total{")]
+
+def test_route_labels_include_router_prefix():
+    with TestClient(main.app) as client:
+        client.get(f"{API}/todos/123")
+        client.get(f"{API}/todos/")
+        client.get("/")
+        labels = request_labels(client)
+    assert any('route="/api/v1/todos/{todo_id}"' in line for line in labels), labels
+    assert any('route="/api/v1/todos/"' in line for line in labels), labels
+    assert any('route="/"' in line for line in labels), labels
+    assert not any('route="/todos/' in line for line in labels), labels
+
+def test_route_labels_include_root_path():
+    with TestClient(main.app, root_path="/proxy") as client:
+        client.get(f"/proxy{API}/todos/board")
+        labels = request_labels(client)
+    assert any('route="/proxy/api/v1/todos/board"' in line for line in labels), labels
@@ -0,0 +1,25 @@
+"""A bucket store that cannot take tokens is rejected when it is created, not on the first request."""
+import asyncio
+
+import pytest
+
+from app.utils import ratelimit
+from app.utils.ratelimit import BucketStore, RateLimit, create_bucket_store
+
+class IncompleteStore(BucketStore):
+    pass
+
+def test_store_without_take_cannot_be_created():
+    with pytest.raises(TypeError):
+        IncompleteStore()
+
+def test_factory_must_return_a_bucket_store(monkeypatch):
+    monkeypatch.setattr(ratelimit.settings, "RATE_LIMIT_STORE", "builtins:object")
+    with pytest.raises(TypeError, match="not a BucketStore"):
+        create_bucket_store()
+
+def test_memory_store_takes_tokens():
+    store = create_bucket_store()
+    limit = RateLimit(rate=1, burst=1)
+    assert asyncio.run(store.take("k", limit)) == 0
+    assert asyncio.run(store.take("k", limit)) > 0
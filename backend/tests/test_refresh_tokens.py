@@ -0,0 +1,31 @@
+"""Refresh tokens survive the rehash-on-login that follows a BCRYPT_ROUNDS change, but not a password change."""
+from fastapi.testclient import TestClient
+from passlib.context import CryptContext
+
+import main
+from app.database.base import SessionLocal
+from app.services.user_service import UserService
+
+API = "/api/v1"
+PASSWORD = "password123"
+
+def test_refresh_token_survives_rehash_but_not_password_change():
+    with TestClient(main.app) as client:
+        client.post(f"{API}/register", json={"email": "r@example.com", "username": "r", "password": PASSWORD})
+        # The account's hash was made under an earlier cost factor, and a refresh token issued then
+        with SessionLocal() as db:
+            user = UserService.get_user_by_username(db, "r")
+            old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=5).hash(PASSWORD)
+            UserService._store_password_hash(db, user, old_hash)
+            earlier = UserService.create_refresh_token(user)
+
+        tokens = client.post(f"{API}/login", data={"username": "r", "password": PASSWORD}).json()
+        with SessionLocal() as db:
+            assert UserService.get_user_by_username(db, "r").hashed_password != old_hash
+        refreshed = client.post(f"{API}/refresh", json={"refresh_token": earlier})
+        assert refreshed.status_code == 200
+
+        headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+        assert client.put(f"{API}/me", json={"password": "another-password"}, headers=headers).status_code == 200
+        for token in (earlier, tokens["refresh_token"], refreshed.json()["refresh_token"]):
+            assert client.post(f"{API}/refresh", json={"refresh_token": token}).status_code == 401
@@ -0,0 +1,29 @@
+"""Import parsing reports overlong lines and records instead of buffering them, then resumes at the next line."""
+import asyncio
+
+from app.utils.todo_io import iter_lines, parse_csv
+
+async def stream(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+def collect(parser, *chunks, max_length=16):
+    async def run():
+        return [(line_no, value) async for line_no, value in parser(stream(*chunks), max_length)]
+    return asyncio.run(run())
+
+def test_overlong_line_is_reported_and_skipped():
+    lines = collect(iter_lines, b"short\nxxxxxxxx", b"xxxxxxxxxxxx", b"xxxx\nnext\n", b"tail")
+    assert [line_no for line_no, _ in lines] == [1, 2, 3, 4]
+    assert lines[0][1] == "short" and lines[2][1] == "next" and lines[3][1] == "tail"
+    assert isinstance(lines[1][1], ValueError) and "longer than 16 bytes" in str(lines[1][1])
+
+def test_body_without_newlines_is_not_buffered():
+    lines = collect(iter_lines, *[b"x" * 10] * 1000)
+    assert len(lines) == 1 and isinstance(lines[0][1], ValueError)
+
+def test_unbalanced_csv_quote_resyncs_at_next_line():
+    body = b'text,completed\n"open,false\nmore\nand more\n' + b"ok,true\n"
+    records = collect(parse_csv, body)
+    assert isinstance(records[0][1], ValueError) and records[0][0] == 2
+    assert records[-1] == (5, {"text": "ok", "completed": "true"})
@@ -0,0 +1,80 @@
+"""The todo list, by-tag and detail paths must cost the same number of statements at any size."""
+import json
+from contextlib import contextmanager
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import main
+from app.database.base import get_async_engine
+
+API = "/api/v1"
+SIZES = (1, 10, 100)
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = get_async_engine().sync_engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as client:
+        client.post(f"{API}/register", json={"email": "q@example.com", "username": "q", "password": "password123"})
+        token = client.post(f"{API}/login", data={"username": "q", "password": "password123"}).json()["access_token"]
+        client.headers["Authorization"] = f"Bearer {token}"
+        # One todo per size with that many subtasks, then enough todos for the largest page, each
+        # with subtasks and tags; the first todos of each tag give by-tag pages of every size
+        records = [
+            {"text": f"detail {size}", "category": "work", "subtasks": [{"text": f"s{n}"} for n in range(size)]}
+            for size in SIZES
+        ]
+        records += [
+            {
+                "text": f"todo {n}", "category": "work", "subtasks": [{"text": "a"}, {"text": "b"}],
+                "tags": [f"size{size}" for size in SIZES if n < size] + [f"other{n % 7}"],
+            }
+            for n in range(max(SIZES))
+        ]
+        body = "\n".join(json.dumps(record) for record in records).encode()
+        assert client.post(f"{API}/todos/import", content=body).json()["imported"] == len(records)
+        yield client
+
+def statements_for(client, path, params=None):
+    # Warm up once so per-process caches (principals, versions) are equally full for every size
+    client.get(path, params=params).raise_for_status()
+    with count_statements() as statements:
+        response = client.get(path, params=params)
+    response.raise_for_status()
+    return len(statements), response.json()
+
+def test_list_query_count_is_constant(client):
+    counts = {}
+    for size in SIZES:
+        counts[size], todos = statements_for(client, f"{API}/todos/", {"limit": size})
+        assert len(todos) == size
+    assert len(set(counts.values())) == 1, counts
+
+def test_todos_by_tag_query_count_is_constant(client):
+    counts = {}
+    for size in SIZES:
+        counts[size], todos = statements_for(client, f"{API}/todos/tags/size{size}")
+        assert len(todos) == size and all(todo["subtasks"] and todo["tags"] for todo in todos)
+    assert len(set(counts.values())) == 1, counts
+
+def test_detail_query_count_is_constant(client):
+    todos = client.get(f"{API}/todos/", params={"limit": len(SIZES)}).json()
+    counts = {}
+    for size, todo in zip(SIZES, todos):
+        counts[size], detail = statements_for(client, f"{API}/todos/{todo['id']}")
+        assert len(detail["subtasks"]) == size
+    assert len(set(counts.values())) == 1, counts
@@ -0,0 +1,62 @@
+"""A coalesced batch commits as one transaction: no write is visible to other connections before the group commit."""
+import asyncio
+import sqlite3
+
+from fastapi.testclient import TestClient
+from sqlalchemy import make_url
+
+import main
+from app.models.todo import Todo
+from app.services.changes import record_change
+from app.services.coalesce import WriteCoalescer
+from app.utils.config import settings
+
+API = "/api/v1"
+
+def committed(query, *params):
+    conn = sqlite3.connect(make_url(settings.DATABASE_URL).database)
+    try:
+        return conn.execute(query, params).fetchone()[0]
+    finally:
+        conn.close()
+
+def count_committed(text):
+    return committed("SELECT count(*) FROM todos WHERE text = ?", text)
+
+def add_todo(db, user_id, text):
+    todo = Todo(text=text, user_id=user_id)
+    db.add(todo)
+    db.flush()
+    record_change(db, user_id, [todo.id])
+    return todo.id
+
+def failing_write(db, user_id, text):
+    add_todo(db, user_id, text)
+    raise ValueError("rolled back alone")
+
+def peek(db, text):
+    return count_committed(text)
+
+def test_batch_commits_together():
+    with TestClient(main.app) as client:
+        client.post(f"{API}/register", json={"email": "c@example.com", "username": "c", "password": "password123"})
+        token = client.post(f"{API}/login", data={"username": "c", "password": "password123"}).json()["access_token"]
+        user_id = client.get(f"{API}/me", headers={"Authorization": f"Bearer {token}"}).json()["id"]
+
+        async def run_batch():
+            coalescer = WriteCoalescer(window_ms=50, max_batch=10)
+            return await asyncio.gather(
+                coalescer.submit(add_todo, user_id, "coalesced first"),
+                coalescer.submit(failing_write, user_id, "coalesced failed"),
+                coalescer.submit(peek, "coalesced first"),
+                coalescer.submit(add_todo, user_id, "coalesced last"),
+                return_exceptions=True,
+            )
+
+        first_id, failed, seen_mid_batch, _ = client.portal.call(run_batch)
+        assert isinstance(failed, ValueError)
+        assert seen_mid_batch == 0
+        assert count_committed("coalesced first") == count_committed("coalesced last") == 1
+        assert count_committed("coalesced failed") == 0
+        # Stamped for delta sync by the commit hook, inside the batch's transaction
+        assert committed("SELECT version FROM todos WHERE id = ?", first_id) > 0